@@ -1,7 +1,7 @@
 # -*- mode: python ; coding: utf-8 -*-
 from PyInstaller.utils.hooks import collect_all
 
-datas = [('app.py', '.')]
+datas = [('app.py', '.'), ('backtest_engine', 'backtest_engine')]
 binaries = []
 hiddenimports = []
 tmp_ret = collect_all('streamlit')
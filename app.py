@@ -1,11 +1,21 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 from datetime import datetime
 import io
-import time  # 引入 time 模組用於模擬進度
+import hashlib
+import os
+import tempfile
+import uuid
+
+from backtest_engine import (
+    CHART_MAX_POINTS, COST_DEFAULTS, JobRunner, MC_BAND_PERCENTILES, MC_CHUNK_BYTES, STREAM_MIN_BYTES, SWEEP_MODES,
+    TRADE_INPUT_COLUMNS, analyze_trades, band_step_limit, downsample, investment_grid, lttb_indices,
+    monte_carlo_units, percentile_bands, read_price_file, read_report_cached, simulate_portfolio,
+    simulate_summary_parallel, stream_trades_file, summarize_trades, sweep_costs, sweep_parameters
+)
 
 # 設定頁面配置
 st.set_page_config(page_title="3Q全球贏家 - XQ 進階回測機", layout="wide", initial_sidebar_state="collapsed")
@@ -15,17 +25,87 @@ COLOR_PROFIT = "#EF4444"  # 紅色
 COLOR_LOSS = "#10B981"  # 綠色
 COLOR_PRIMARY = "#4A9EFF"  # 藍色
 
+# 3Q 深色圖表主題 (疊加在 plotly_dark 之上)，各圖表以 template=CHART_TEMPLATE 套用
+pio.templates['3q'] = go.layout.Template(layout=dict(
+    paper_bgcolor='#0B0E14',
+    plot_bgcolor='#1A1D24',
+    font=dict(color='#E8EAED', size=12),
+    xaxis=dict(showgrid=True, gridcolor='#3A3F4B'),
+    yaxis=dict(showgrid=True, gridcolor='#3A3F4B'),
+))
+CHART_TEMPLATE = 'plotly_dark+3q'
+
+# 蒙地卡羅模擬設定
+MC_MAX_SIMULATIONS = 100000  # 側邊欄可設定的最大模擬次數
+MC_PLOT_PATHS = 200  # 圖表最多繪製的模擬曲線數
+MC_FAN_SAMPLE_PATHS = 20  # 扇形圖上疊加的樣本路徑數
+WEBGL_MIN_POINTS = 5000  # 超過此點數的曲線改用 WebGL (Scattergl) 繪製
+PNL_HISTOGRAM_BINS = 50  # 損益分佈直方圖的區間數 (在伺服器端分組，只送出各區間的次數)
+MC_METHOD_LABELS = {
+    "i.i.d. 逐筆抽樣": 'iid',
+    "移動區塊 (Moving Block)": 'block',
+    "平穩 Bootstrap (Stationary)": 'stationary',
+}
+
+ANALYSIS_CACHE_ENTRIES = 16  # 分析結果快取的最大筆數 (LRU)
+JOB_POLL_SECONDS = 0.5  # 背景工作執行中，進度區塊重新整理的間隔
+SPOOL_BLOCK_BYTES = 1024 ** 2  # 超大型報表寫入暫存檔時每次複製的大小
+SWEEP_MAX_POINTS = 200  # 參數掃描每種模式最多的投入金額網格點數
+COST_SENSITIVITY = {  # 成本敏感度分析可選的參數與數值
+    "滑價檔數": ('slippage_ticks', [0, 1, 2, 3, 4, 5]),
+    "手續費折扣": ('commission_discount', [0.2, 0.28, 0.4, 0.6, 0.8, 1.0]),
+}
+
 # 初始化 session state
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex  # 背景工作的 key 以此區分不同 session
 if 'uploaded' not in st.session_state:
     st.session_state.uploaded = False
 if 'df' not in st.session_state:
     st.session_state.df = None
+if 'file_hash' not in st.session_state:
+    st.session_state.file_hash = None
+if 'report_path' not in st.session_state:
+    st.session_state.report_path = None  # 超大型報表的暫存檔路徑 (串流摘要模式，不解析也不保留整份報表)
+if 'stream_summary' not in st.session_state:
+    st.session_state.stream_summary = None  # 串流摘要的結果與對應的參數 (stream_summary_key)
+    st.session_state.stream_summary_key = None
+    st.session_state.stream_job_key = None
 if 'params_confirmed' not in st.session_state:
     st.session_state.params_confirmed = False
 if 'mc_triggered' not in st.session_state:
     st.session_state.mc_triggered = False
 if 'mc_simulations' not in st.session_state:
     st.session_state.mc_simulations = 100
+if 'mc_seed' not in st.session_state:
+    st.session_state.mc_seed = None
+if 'mc_workers' not in st.session_state:
+    st.session_state.mc_workers = 1
+if 'mc_method' not in st.session_state:
+    st.session_state.mc_method = 'iid'
+if 'mc_block_size' not in st.session_state:
+    st.session_state.mc_block_size = 5
+if 'mc_run_id' not in st.session_state:
+    st.session_state.mc_run_id = None
+if 'mc_job_key' not in st.session_state:
+    st.session_state.mc_job_key = None
+if 'mc_summary' not in st.session_state:
+    st.session_state.mc_summary = None  # 模擬結果 (由背景工作取出) 與對應的工作 key
+    st.session_state.mc_summary_key = None
+if 'mc_by_exit_day' not in st.session_state:
+    st.session_state.mc_by_exit_day = False
+if 'sweep_params' not in st.session_state:
+    st.session_state.sweep_params = None
+if 'cost_sensitivity_param' not in st.session_state:
+    st.session_state.cost_sensitivity_param = None  # 已執行的成本敏感度參數 (None 表示尚未執行)
+if 'portfolio' not in st.session_state:
+    st.session_state.portfolio = None  # 帳戶資金限制模式的設定 (None 表示每筆固定金額)
+if 'costs' not in st.session_state:
+    st.session_state.costs = None  # 交易成本設定 (None 表示不計成本)
+if 'prices' not in st.session_state:
+    st.session_state.prices = None  # 選用的收盤價寬表 (逐日市值權益用)
+if 'prices_hash' not in st.session_state:
+    st.session_state.prices_hash = None
 
 # 自訂CSS - TradingView風格
 st.markdown(f"""
@@ -187,256 +267,927 @@ st.markdown(f"""
 ), unsafe_allow_html=True)
 
 
-# 計算函數
-def parse_csv(file):
-    """解析CSV檔案"""
-    encodings = ['big5', 'utf-8', 'gb2312', 'cp950']
+# 計算函數 (計算核心位於 backtest_engine，這裡只負責進度顯示與快取)
+@st.cache_resource
+def job_runner():
+    """背景工作執行器 (整個伺服器程序共用一個，只保留工作狀態；完成的結果以 take 取出存入各自的 session)
 
-    # 模擬解析進度
-    progress_bar = st.empty()
-    progress_bar.progress(0, text="載入檔案中...")
+    工作的 key 都包含 session_id 或每次執行的 uuid，一個 session 取消工作不影響其他 session。
+    """
+    return JobRunner()
 
-    for i, encoding in enumerate(encodings):
-        try:
-            file.seek(0)
-            df = pd.read_csv(file, encoding=encoding)
 
-            # 模擬計算時間
-            time.sleep(0.5)
-            progress_bar.progress(int((i + 1) / len(encodings) * 50), text=f"嘗試編碼: {encoding}...")
+def parse_csv(file, file_hash):
+    """在背景解析CSV檔案 (自動判斷編碼，只讀取必要欄位，並使用本機快取)，回傳 Job
 
-            required_cols = ['商品名稱', '商品代碼', '序號', '進場時間', '進場方向',
-                             '進場價格', '出場時間', '出場方向', '出場價格']
-            df = df[required_cols]
+    同一個 session 中相同內容的檔案 (file_hash) 只解析一次；完成後以 job_runner().take 取出 DataFrame，
+    格式錯誤時 Job.exception() 為 ValueError。
+    """
+    key = ('parse', st.session_state.session_id, file_hash)
+    job = job_runner().get(key)
+    if job is not None:
+        return job
+    # session 中只保留交易計算需要的欄位
+    return job_runner().submit(key, read_report_cached, io.BytesIO(file.getvalue()), file_hash,
+                               columns=TRADE_INPUT_COLUMNS)
 
-            df['進場時間'] = pd.to_datetime(df['進場時間'])
-            df['出場時間'] = pd.to_datetime(df['出場時間'])
-            df['進場價格'] = pd.to_numeric(df['進場價格'])
-            df['出場價格'] = pd.to_numeric(df['出場價格'])
 
-            progress_bar.progress(100, text="✅ 檔案解析完成!")
-            time.sleep(0.5)
-            progress_bar.empty()
+def frozen_params(params):
+    """將設定 dict (帳戶、成本) 轉為可雜湊的 tuple，作為工作與快取的鍵；None 維持 None"""
+    return tuple(sorted(params.items())) if params is not None else None
 
-            return df, None
-        except Exception as e:
-            # 錯誤不需要中斷，繼續嘗試下一個編碼
-            continue
 
-    progress_bar.empty()
-    return None, "無法解析CSV檔案，請確認檔案格式是否正確"
+def spool_upload(uploaded_file):
+    """將上傳檔分段寫入暫存檔並同時計算雜湊，回傳 (暫存檔路徑, 檔案雜湊)
 
+    超大型報表之後只以路徑串流讀取，session 中不保留上傳內容。
+    """
+    digest = hashlib.sha256()
+    uploaded_file.seek(0)
+    fd, path = tempfile.mkstemp(prefix='3q_report_', suffix='.csv')
+    with os.fdopen(fd, 'wb') as spool:
+        for block in iter(lambda: uploaded_file.read(SPOOL_BLOCK_BYTES), b''):
+            digest.update(block)
+            spool.write(block)
+    return path, digest.hexdigest()
 
-def calculate_trades(df, investment, mode):
-    # ... (計算函數保持不變) ...
-    """計算每筆交易的損益 (未考慮交易成本)"""
-    trades = []
 
-    # 這裡可以加入一個 progress bar 來追蹤計算進度
-    # 但因為計算很快，這裡先省略，保持原本的計算邏輯
+def discard_report_file():
+    """取消進行中的串流分析、清空摘要並刪除超大型報表的暫存檔"""
+    job_runner().discard(st.session_state.stream_job_key)
+    st.session_state.stream_summary = None
+    st.session_state.stream_summary_key = None
+    path, st.session_state.report_path = st.session_state.report_path, None
+    if path is not None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # 檔案仍被開啟 (例如 Windows 上尚未結束的分析) 時留給系統清理暫存目錄
 
-    for idx, row in df.iterrows():
-        entry_price = row['進場價格']
-        exit_price = row['出場價格']
 
-        if entry_price == 0:
-            continue
+def stream_summary_job(report_path, file_hash, investment, mode, costs=None):
+    """在背景以串流方式分析超大型報表的暫存檔 (不載入整份報表，也不保留逐筆交易)，回傳 Job
 
-        if mode == "整張計算":
-            shares = int(investment / (entry_price * 1000)) * 1000
-            if shares < 1000:
-                continue
-            actual_investment = (shares / 1000) * entry_price * 1000
-        else:
-            shares = investment / entry_price
-            actual_investment = shares * entry_price
-
-        # 簡單計算，未考慮費用
-        pnl = shares * (exit_price - entry_price)
-        pnl_pct = (exit_price - entry_price) / entry_price
-
-        trades.append({
-            '商品名稱': row['商品名稱'],
-            '商品代碼': row['商品代碼'],
-            '進場時間': row['進場時間'],
-            '出場時間': row['出場時間'],
-            '進場價格': entry_price,
-            '出場價格': exit_price,
-            '股數': shares,
-            '投入金額': actual_investment,
-            '損益': pnl,
-            '報酬率': pnl_pct,
-            '持有天數': (row['出場時間'] - row['進場時間']).days
-        })
-
-    return pd.DataFrame(trades)
-
-
-# ... (其餘計算函數保持不變) ...
-
-def calculate_equity_curve(trades_df):
-    """計算權益曲線，標記創新高點"""
-    if len(trades_df) == 0:
-        return pd.DataFrame()
+    完成後以 job_runner().take 取出 (None, summary)，summary 欄位見 backtest_engine.streaming.stream_trades。
+    """
+    key = ('stream', st.session_state.session_id, file_hash, investment, mode, frozen_params(costs))
+    return job_runner().submit(key, stream_trades_file, report_path, investment, mode, keep_trades=False,
+                               costs=costs)
 
-    trades_df = trades_df.sort_values('出場時間').reset_index(drop=True)
-    trades_df['累積損益'] = trades_df['損益'].cumsum()
 
-    # 標記創新高點
-    cumulative = trades_df['累積損益'].values
-    running_max = np.maximum.accumulate(cumulative)
-    trades_df['New_High'] = (cumulative == running_max) & (
-                cumulative > trades_df['累積損益'].shift(1).fillna(-np.inf).values)
-    trades_df.loc[0, 'New_High'] = True  # 第一筆交易一定是新高 (相對初始資金0)
+@st.cache_data(max_entries=ANALYSIS_CACHE_ENTRIES, show_spinner=False)
+def monte_carlo_sample_units(analysis_key, by_exit_day, _trades_df):
+    """蒙地卡羅的抽樣單位 (依 analysis_key 快取，重新執行時不重新排序與分組)"""
+    return monte_carlo_units(_trades_df, by_exit_day)
 
-    return trades_df
 
+def monte_carlo_job(units, n_simulations, seed=None, n_sample_paths=MC_PLOT_PATHS,
+                    chunk_bytes=MC_CHUNK_BYTES, n_workers=1, method='iid', block_size=5, key=None):
+    """在背景執行蒙地卡羅模擬 (串流模式，只保留每條路徑的統計量與少量樣本曲線)，回傳 Job
 
-def calculate_concurrent_holdings(trades_df):
-    """計算同時持有金額的時間序列"""
-    if len(trades_df) == 0:
-        return pd.DataFrame()
+    units 為抽樣單位 (monte_carlo_sample_units)：逐筆損益，或以出場日分組的每日損益 (保留同日出場交易的群聚)。
+    n_workers > 1 時以多個子程序平行計算，相同的 seed 與 n_workers 結果完全相同。
+    method 可為 'iid'、'block' (移動區塊) 或 'stationary' (平穩 Bootstrap)。
+    扇形圖的取樣步數依模擬次數限制在 MC_BAND_BYTES 的記憶體內 (見 band_step_limit)。
+    key 識別工作 (相同 key 沿用同一個工作)；完成後以 job_runner().take 取出結果，
+    欄位見 backtest_engine.monte_carlo.simulate_summary。
+    """
+    return job_runner().submit(
+        key, simulate_summary_parallel, units, n_simulations, seed, n_sample_paths, chunk_bytes, n_workers,
+        method=method, block_size=block_size, n_band_steps=band_step_limit(n_simulations))
 
-    # 收集所有時間點
-    all_dates = pd.date_range(
-        start=trades_df['進場時間'].min(),
-        end=trades_df['出場時間'].max(),
-        freq='D'
-    )
-
-    holdings = []
-    for date in all_dates:
-        # 找出在這個日期持有的倉位
-        holding_positions = trades_df[
-            (trades_df['進場時間'].dt.date <= date.date()) &
-            (trades_df['出場時間'].dt.date >= date.date())
-            ]
-        total_amount = holding_positions['投入金額'].sum()
-        holdings.append({'日期': date, '持有金額': total_amount})
 
-    return pd.DataFrame(holdings)
+def reset_monte_carlo():
+    """清空模擬結果，並取消、移除進行中的模擬"""
+    st.session_state.mc_triggered = False
+    st.session_state.mc_summary = None
+    st.session_state.mc_summary_key = None
+    job_runner().discard(st.session_state.mc_job_key)
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress(job_key, name, describe):
+    """背景工作的進度條與取消按鈕，每 JOB_POLL_SECONDS 秒重新整理；工作結束時重新執行頁面以顯示結果
+
+    name 用於區分不同工作的按鈕，describe(完成數, 總數) 產生進度文字。
+    """
+    job = job_runner().get(job_key)
+    if job is None or job.status != 'running':
+        st.rerun()
+
+    st.progress(int(job.progress * 100), text=describe(job.done, job.total))
+    if st.button("⏹️ 取消", key=f"{name}_cancel_button"):
+        job.cancel()
+        st.rerun()
+
+
+def scatter_class(n_points):
+    """依點數選擇繪圖方式：SVG 在數萬點以上平移縮放明顯變慢，超過 WEBGL_MIN_POINTS 改用 WebGL
+
+    只用於不降採樣的 trace (新高/新低標記、合併的模擬路徑)；降採樣後的曲線不會超過門檻。
+    """
+    return go.Scattergl if n_points > WEBGL_MIN_POINTS else go.Scatter
+
+
+def path_lines(paths, steps):
+    """將多條曲線合併為單一 trace 的 (x, y)，路徑之間以 NaN 斷開
+
+    paths 的每一欄對應 steps 的步數 (模擬結果的 sample_paths 與 path_steps，已限制在 MC_PATH_STEPS 步以內)。
+    """
+    n_paths = len(paths)
+    x = np.tile(np.append(steps.astype(float), np.nan), n_paths)
+    y = np.hstack([paths, np.full((n_paths, 1), np.nan)]).ravel()
+    return x, y
+
+
+@st.cache_data(max_entries=ANALYSIS_CACHE_ENTRIES, show_spinner="📊 分析報表中...")
+def analyze_report(file_hash, _df, investment, mode, portfolio=None, costs=None, prices_hash=None, _prices=None):
+    """執行完整的分析流程並快取結果
+
+    快取鍵為 (檔案內容雜湊, 投入金額, 計算模式, 帳戶設定, 成本設定, 收盤價檔雜湊)，
+    _df 與 _prices 不參與雜湊。結果跨重新執行與不同 session 共用，最多保留 ANALYSIS_CACHE_ENTRIES 筆 (LRU)。
+    portfolio 為 simulate_portfolio 的參數 (capital, sizing, on_shortfall)，結果另含 'account' 帳戶摘要。
+    沒有可執行的交易時只回傳 trades_df (與 account)。
+    """
+    if portfolio is None:
+        return analyze_trades(_df, investment, mode, costs=costs, prices=_prices)
+
+    trades_df, account = simulate_portfolio(_df, investment=investment, mode=mode, costs=costs, **portfolio)
+    analysis = summarize_trades(trades_df, capital=portfolio['capital'], prices=_prices)
+    analysis['account'] = account
+    return analysis
+
+
+@st.cache_data(max_entries=ANALYSIS_CACHE_ENTRIES, show_spinner="🔍 參數掃描中...")
+def sweep_report(file_hash, _df, grid, modes, costs=None):
+    """參數掃描 (結果依檔案雜湊、網格與成本設定快取)；grid 為 (起始, 結束, 間距)"""
+    return sweep_parameters(_df, investment_grid(*grid), modes, costs=costs)
+
+
+@st.cache_data(max_entries=ANALYSIS_CACHE_ENTRIES, show_spinner="💸 成本敏感度分析中...")
+def cost_sensitivity_report(file_hash, _df, investment, mode, costs, parameter, values):
+    """成本敏感度分析 (結果依檔案雜湊與參數快取)"""
+    return sweep_costs(_df, investment, mode, costs, parameter, values)
+
+
+# 圖表函數 (analysis_key 為 analyze_report 的快取鍵，圖表依此快取，底線開頭的資料參數不參與雜湊)
+@st.cache_data(max_entries=ANALYSIS_CACHE_ENTRIES, show_spinner=False)
+def pnl_distribution_figure(analysis_key, _pnl):
+    """損益分佈直方圖：以 np.histogram 分組後畫成長條圖，不把每筆損益送到瀏覽器"""
+    counts, edges = np.histogram(_pnl, bins=PNL_HISTOGRAM_BINS)
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        width=np.diff(edges),
+        customdata=np.column_stack([edges[:-1], edges[1:]]),
+        marker=dict(color=COLOR_PRIMARY, line=dict(color='#3A3F4B', width=0.5)),
+        hovertemplate='損益: $%{customdata[0]:,.0f} ~ $%{customdata[1]:,.0f}<br>次數: %{y}<extra></extra>'
+    ))
+
+    fig.add_vline(x=0, line_dash="dash", line_color="#E8EAED", line_width=2.5)
+
+    fig.update_layout(
+        height=450,
+        template=CHART_TEMPLATE,
+        xaxis_title="損益 (元)",
+        yaxis_title="交易次數",
+        bargap=0,
+        showlegend=False,
+        margin=dict(l=20, r=20, t=20, b=20)
+    )
+    return fig
 
 
-def calculate_max_concurrent_positions(trades_df):
-    """計算最大同時持有金額"""
-    if len(trades_df) == 0:
-        return 0
+@st.cache_data(max_entries=ANALYSIS_CACHE_ENTRIES, show_spinner=False)
+def price_analysis_figure(analysis_key, _price_analysis):
+    """各價格區間的總損益與平均損益"""
+    fig = make_subplots(
+        rows=1, cols=2,
+        subplot_titles=('各價格區間總損益', '各價格區間平均損益'),
+        horizontal_spacing=0.12
+    )
 
-    events = []
-    for idx, row in trades_df.iterrows():
-        events.append((row['進場時間'], row['投入金額'], 'enter'))
-        events.append((row['出場時間'], row['投入金額'], 'exit'))
+    # 修正: 根據損益正負賦予顏色 (紅色賺，綠色賠)
+    colors_sum = [COLOR_PROFIT if x > 0 else COLOR_LOSS for x in _price_analysis['總損益']]
+    colors_avg = [COLOR_PROFIT if x > 0 else COLOR_LOSS for x in _price_analysis['平均損益']]
+
+    fig.add_trace(
+        go.Bar(
+            x=_price_analysis['價格區間'],
+            y=_price_analysis['總損益'],
+            marker=dict(color=colors_sum, line=dict(color='#3A3F4B', width=0.5)),
+            text=_price_analysis['交易次數'],
+            texttemplate='%{text}筆',
+            textposition='outside',
+            hovertemplate='<b>%{x}元</b><br>總損益: $%{y:,.0f}<br>交易次數: %{text}筆<extra></extra>'
+        ),
+        row=1, col=1
+    )
 
-    events.sort(key=lambda x: (x[0], 0 if x[2] == 'enter' else 1))
+    fig.add_trace(
+        go.Bar(
+            x=_price_analysis['價格區間'],
+            y=_price_analysis['平均損益'],
+            marker=dict(color=colors_avg, line=dict(color='#3A3F4B', width=0.5)),
+            hovertemplate='<b>%{x}元</b><br>平均損益: $%{y:,.0f}<extra></extra>'
+        ),
+        row=1, col=2
+    )
 
-    current_amount = 0
-    max_amount = 0
+    fig.add_hline(y=0, line_dash="dash", line_color="#6B7280", line_width=1.5, row=1, col=1)
+    fig.add_hline(y=0, line_dash="dash", line_color="#6B7280", line_width=1.5, row=1, col=2)
 
-    for time, amount, action in events:
-        if action == 'enter':
-            current_amount += amount
-            max_amount = max(max_amount, current_amount)
-        else:
-            current_amount -= amount
+    fig.update_layout(
+        height=450,
+        template=CHART_TEMPLATE,
+        showlegend=False,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
 
-    return max_amount
+    fig.update_xaxes(title_text="進場價格區間")
+    fig.update_yaxes(title_text="損益 (元)")
+    return fig
+
+
+@st.cache_data(max_entries=ANALYSIS_CACHE_ENTRIES, show_spinner=False)
+def monthly_pnl_figure(analysis_key, title, _monthly):
+    """各月份總損益長條圖 (開倉或關倉月份，title 區分兩者並參與快取鍵)"""
+    fig = go.Figure()
+
+    # 修正: 根據損益正負賦予顏色 (紅色賺，綠色賠)
+    colors = [COLOR_PROFIT if x > 0 else COLOR_LOSS for x in _monthly['總損益']]
+
+    fig.add_trace(
+        go.Bar(
+            x=_monthly['月份'],
+            y=_monthly['總損益'],
+            marker=dict(color=colors, line=dict(color='#3A3F4B', width=0.5)),
+            text=_monthly['交易次數'],
+            texttemplate='%{text}筆',
+            textposition='outside',
+            hovertemplate='<b>%{x}</b><br>總損益: $%{y:,.0f}<br>交易次數: %{text}筆<extra></extra>',
+            name='總損益'
+        )
+    )
 
+    fig.add_hline(y=0, line_dash="dash", line_color="#6B7280", line_width=1.5)
 
-def calculate_drawdown(equity_curve):
-    """計算MDD並標記創新低點"""
-    if len(equity_curve) == 0:
-        return pd.DataFrame(), 0, 0
+    fig.update_layout(
+        title=title,
+        height=500,
+        template=CHART_TEMPLATE,
+        showlegend=False,
+        margin=dict(l=20, r=20, t=60, b=20),
+        xaxis_title='月份',
+        yaxis_title='總損益 (元)'
+    )
+    return fig
+
+
+@st.fragment
+def distribution_section(analysis_key, analysis):
+    """報酬分佈分析：只建立目前選取的圖表，切換項目時只重新執行這個區塊"""
+    st.markdown("<h2>📊 報酬分佈分析</h2>", unsafe_allow_html=True)
+    view = st.radio("分析項目", ["💰 損益分佈", "💲 價格分析", "📅 時間分析"], horizontal=True,
+                    key="distribution_view", label_visibility="collapsed")
+
+    if view == "💰 損益分佈":
+        st.plotly_chart(pnl_distribution_figure(analysis_key, analysis['trades_df']['損益'].to_numpy()),
+                        use_container_width=True)
+
+    elif view == "💲 價格分析":
+        # 價格區間與損益的關係 (每個價格區間的總損益和交易次數)
+        price_analysis = analysis['price_analysis']
+        st.plotly_chart(price_analysis_figure(analysis_key, price_analysis), use_container_width=True)
+
+        # 顯示詳細數據
+        st.dataframe(
+            price_analysis.style.format({
+                '總損益': '${:,.0f}',
+                '平均損益': '${:,.0f}',
+                '交易次數': '{:.0f}'
+            }),
+            use_container_width=True
+        )
 
-    cumulative = equity_curve['累積損益'].values
-    running_max = np.maximum.accumulate(cumulative)
-    drawdown = cumulative - running_max
+    else:
+        # 時間分析 - 依開倉或關倉月份分組
+        time_view = st.radio("時間分析", ["📅 依開倉時間", "📅 依關倉時間"], horizontal=True,
+                             key="time_view", label_visibility="collapsed")
+        if time_view == "📅 依開倉時間":
+            monthly, title = analysis['entry_analysis'], '開倉月份 - 總損益'
+        else:
+            monthly, title = analysis['exit_analysis'], '關倉月份 - 總損益'
+
+        st.plotly_chart(monthly_pnl_figure(analysis_key, title, monthly), use_container_width=True)
+        st.dataframe(monthly.style.format({'總損益': '${:,.0f}', '交易次數': '{:.0f}'}), use_container_width=True)
+
+
+@st.fragment
+def equity_chart_section(analysis):
+    """權益曲線、績效回檔與同時持有金額
+
+    曲線都先以 LTTB 降採樣到 CHART_MAX_POINTS 點以內，以 SVG 繪製；不降採樣的新高/新低標記
+    點數超過 WEBGL_MIN_POINTS 時改用 WebGL。
+
+    拖動檢視區間只重新執行這個區塊。
+    """
+    equity_curve = analysis['equity_curve']
+    dd_df = analysis['dd_df']
+    concurrent_df = analysis['concurrent_df']
+    daily_equity = analysis['daily_equity']
+
+    st.markdown("<h2>📈 權益曲線 & 資金使用</h2>", unsafe_allow_html=True)
+
+    # 長序列以 LTTB 降採樣後再繪圖；縮小檢視區間時重新以區間內的完整資料降採樣
+    chart_start = equity_curve['出場時間'].min()
+    chart_end = equity_curve['出場時間'].max()
+    if len(equity_curve) > CHART_MAX_POINTS and chart_start < chart_end:
+        chart_start, chart_end = st.slider(
+            "🔍 檢視區間",
+            min_value=chart_start.to_pydatetime(),
+            max_value=chart_end.to_pydatetime(),
+            value=(chart_start.to_pydatetime(), chart_end.to_pydatetime()),
+            format="YYYY-MM-DD",
+            key="chart_window",
+            help=f"每條曲線最多繪製 {CHART_MAX_POINTS:,} 點，縮小區間可看到更多細節"
+        )
 
-    # 標記回撤創新低點 (即最大回撤)
-    running_min_dd = np.minimum.accumulate(drawdown)
-    equity_curve['New_Drawdown'] = (drawdown == running_min_dd)
+    def chart_window(frame, column):
+        return frame[(frame[column] >= chart_start) & (frame[column] <= chart_end)] if len(frame) else frame
 
-    max_dd = drawdown.min()
+    equity_view = chart_window(equity_curve, '出場時間')
+    dd_view = chart_window(dd_df, '時間')
+    daily_view = chart_window(daily_equity, '日期')
+    concurrent_view = chart_window(concurrent_df, '日期')
 
-    # 計算百分比回撤 - 基於初始資金而非最高點 (暫時保留，但不使用)
-    initial_capital = 0  # 從0開始
-    drawdown_pct = drawdown / (running_max - initial_capital + 1e-10)
+    fig = make_subplots(
+        rows=3, cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.06,
+        row_heights=[0.5, 0.25, 0.25],
+        subplot_titles=('累積損益曲線', '績效回檔', '同時持有金額')
+    )
 
-    max_dd_pct = drawdown_pct.min()  # 最大的百分比回撤
+    # 權益曲線
+    equity_line = downsample(equity_view, '出場時間', '累積損益')
+    fig.add_trace(
+        go.Scatter(
+            x=equity_line['出場時間'],
+            y=equity_line['累積損益'],
+            mode='lines',
+            name='累積損益',
+            line=dict(color=COLOR_PROFIT, width=3),  # 修正: 權益曲線用紅色
+            fill='tozeroy',
+            fillcolor=f'rgba({int(COLOR_PROFIT[1:3], 16)}, {int(COLOR_PROFIT[3:5], 16)}, {int(COLOR_PROFIT[5:7], 16)}, 0.15)',
+            hovertemplate='<b>%{x|%Y-%m-%d}</b><br>累積損益: $%{y:,.0f}<extra></extra>'
+        ),
+        row=1, col=1
+    )
 
-    dd_df = pd.DataFrame({
-        '時間': equity_curve['出場時間'],
-        '回撤金額': drawdown,
-        '回撤%': drawdown_pct * 100,
-        'New_Drawdown': equity_curve['New_Drawdown']
-    })
+    # 權益曲線 - 創新高標記 (不降採樣，保留每個新高點的確切位置)
+    new_highs = equity_view[equity_view['New_High'] == True]
+    fig.add_trace(
+        scatter_class(len(new_highs))(
+            x=new_highs['出場時間'],
+            y=new_highs['累積損益'],
+            mode='markers',
+            name='權益新高點',
+            marker=dict(color='white', size=8, line=dict(width=1, color=COLOR_PROFIT)),
+            hovertemplate='<b>%{x|%Y-%m-%d}</b><br>權益新高: $%{y:,.0f}<extra></extra>'
+        ),
+        row=1, col=1
+    )
 
-    return dd_df, max_dd, max_dd_pct
+    # 逐日市值權益 (含持有期間的浮動損益)
+    daily_line = downsample(daily_view, '日期', '累積損益')
+    fig.add_trace(
+        go.Scatter(
+            x=daily_line['日期'],
+            y=daily_line['累積損益'],
+            mode='lines',
+            name='逐日市值權益',
+            line=dict(color='#E8EAED', width=1.5, dash='dot'),
+            hovertemplate='<b>%{x|%Y-%m-%d}</b><br>市值權益: $%{y:,.0f}<extra></extra>'
+        ),
+        row=1, col=1
+    )
 
+    fig.add_hline(y=0, line_dash="dot", line_color="#6B7280", line_width=1.5, row=1, col=1)
+
+    # 績效回檔 (MDD)
+    dd_line = downsample(dd_view, '時間', '回撤金額')
+    fig.add_trace(
+        go.Scatter(
+            x=dd_line['時間'],
+            y=dd_line['回撤金額'],
+            fill='tozeroy',
+            mode='lines',
+            name='回撤',
+            line=dict(color=COLOR_LOSS, width=2),  # 修正: 回撤用綠色
+            fillcolor=f'rgba({int(COLOR_LOSS[1:3], 16)}, {int(COLOR_LOSS[3:5], 16)}, {int(COLOR_LOSS[5:7], 16)}, 0.25)',
+            hovertemplate='<b>%{x|%Y-%m-%d}</b><br>回檔金額: $%{y:,.0f}<extra></extra>'
+        ),
+        row=2, col=1
+    )
 
-def calculate_sharpe_ratio(trades_df):
-    """計算夏普值 (年化，假設年交易日 252)"""
-    if len(trades_df) == 0:
-        return 0
+    # 績效回檔 - 創新低標記 (即 MDD，不降採樣)
+    new_drawdowns = dd_view[dd_view['New_Drawdown'] == True]
+    fig.add_trace(
+        scatter_class(len(new_drawdowns))(
+            x=new_drawdowns['時間'],
+            y=new_drawdowns['回撤金額'],
+            mode='markers',
+            name='最大回撤點',
+            marker=dict(color='white', size=8, line=dict(width=1, color=COLOR_LOSS)),
+            hovertemplate='<b>%{x|%Y-%m-%d}</b><br>回檔新低: $%{y:,.0f}<extra></extra>'
+        ),
+        row=2, col=1
+    )
 
-    returns = trades_df['報酬率'].values
-    if len(returns) < 2:
-        return 0
+    # 同時持有金額
+    concurrent_line = downsample(concurrent_view, '日期', '持有金額')
+    fig.add_trace(
+        go.Scatter(
+            x=concurrent_line['日期'],
+            y=concurrent_line['持有金額'],
+            mode='lines',
+            name='持有金額',
+            line=dict(color='#F59E0B', width=2),
+            fill='tozeroy',
+            fillcolor='rgba(245, 158, 11, 0.2)',
+            hovertemplate='<b>%{x|%Y-%m-%d}</b><br>持有金額: $%{y:,.0f}<extra></extra>'
+        ),
+        row=3, col=1
+    )
 
-    mean_return = np.mean(returns)
-    std_return = np.std(returns, ddof=1)
+    fig.update_layout(
+        height=800,
+        template=CHART_TEMPLATE,
+        font=dict(family='Trebuchet MS'),
+        hovermode='x unified',
+        showlegend=False,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
 
-    if std_return == 0:
-        return 0
+    fig.update_xaxes(showline=True, linecolor='#3A3F4B')
+    fig.update_yaxes(showline=True, linecolor='#3A3F4B')
+
+    st.plotly_chart(fig, use_container_width=True)
+
+
+@st.fragment
+def sweep_section(df, investment_amount, costs):
+    """參數掃描：調整網格或按下開始掃描只重新執行這個區塊"""
+    st.markdown("<h2>🔍 參數掃描</h2>", unsafe_allow_html=True)
+    st.caption("一次比較不同投入金額與計算模式的績效，整張計算下金額太小時低價股以外的交易都會被略過")
+
+    col_sweep1, col_sweep2, col_sweep3, col_sweep4 = st.columns([1, 1, 1, 2])
+    with col_sweep1:
+        sweep_start = st.number_input("起始金額", min_value=1000, value=50000, step=10000, key="sweep_start")
+    with col_sweep2:
+        sweep_stop = st.number_input("結束金額", min_value=1000, value=2000000, step=10000, key="sweep_stop")
+    with col_sweep3:
+        sweep_step = st.number_input("間距", min_value=1000, value=50000, step=10000, key="sweep_step")
+    with col_sweep4:
+        sweep_modes = st.multiselect("計算模式", list(SWEEP_MODES), default=list(SWEEP_MODES), key="sweep_modes")
+
+    col_sbtn1, col_sbtn2, col_sbtn3 = st.columns([1, 1, 1])
+    with col_sbtn2:
+        if st.button("🔍 開始掃描", use_container_width=True, key="sweep_start_button"):
+            n_points = int((sweep_stop - sweep_start) // sweep_step) + 1
+            if sweep_stop < sweep_start:
+                st.error("❌ 結束金額必須大於起始金額")
+            elif n_points > SWEEP_MAX_POINTS:
+                st.error(f"❌ 網格點數過多 ({n_points:,})，請加大間距 (上限 {SWEEP_MAX_POINTS} 點)")
+            elif not sweep_modes:
+                st.error("❌ 請至少選擇一種計算模式")
+            else:
+                st.session_state.sweep_params = ((sweep_start, sweep_stop, sweep_step), tuple(sweep_modes))
+
+    if st.session_state.sweep_params is not None:
+        sweep_grid, sweep_mode_list = st.session_state.sweep_params
+        sweep_df = sweep_report(st.session_state.file_hash, df, sweep_grid, sweep_mode_list, costs)
+
+        fig_sweep = make_subplots(rows=2, cols=2, subplot_titles=('夏普值', '總損益', '最大回撤', '交易次數'),
+                                  vertical_spacing=0.15, horizontal_spacing=0.08)
+        sweep_panels = [('夏普值', 1, 1, '%{y:.2f}'), ('總損益', 1, 2, '$%{y:,.0f}'),
+                        ('最大回撤', 2, 1, '$%{y:,.0f}'), ('交易次數', 2, 2, '%{y:,}筆')]
+        sweep_colors = {"整張計算": COLOR_PRIMARY, "股數計算": "#F59E0B"}
+
+        for mode_name, mode_df in sweep_df.groupby('計算模式', sort=False):
+            for metric, row, col, value_format in sweep_panels:
+                fig_sweep.add_trace(go.Scatter(
+                    x=mode_df['投入金額'],
+                    y=mode_df[metric],
+                    mode='lines+markers',
+                    name=mode_name,
+                    legendgroup=mode_name,
+                    showlegend=(row, col) == (1, 1),
+                    line=dict(color=sweep_colors.get(mode_name, COLOR_PRIMARY), width=2),
+                    marker=dict(size=4),
+                    hovertemplate=f'<b>{mode_name}</b><br>投入金額: $%{{x:,.0f}}<br>{metric}: {value_format}<extra></extra>'
+                ), row=row, col=col)
+
+        # 標示目前分析使用的投入金額
+        for _, row, col, _ in sweep_panels:
+            fig_sweep.add_vline(x=investment_amount, line_dash="dash", line_color="#6B7280", line_width=1.5,
+                                row=row, col=col)
+
+        fig_sweep.update_layout(
+            height=650,
+            template=CHART_TEMPLATE,
+            hovermode='x unified',
+            margin=dict(l=20, r=20, t=60, b=20)
+        )
 
-    # 假設策略是日頻率，或者報酬率是每筆交易的報酬率
-    # 這裡使用每筆交易的報酬率進行年化 (sqrt(交易次數/年化因子), 簡化處理)
-    sharpe = (mean_return / std_return) * np.sqrt(252)  # 簡化年化
+        fig_sweep.update_xaxes(tickformat=',.0f')
+
+        st.plotly_chart(fig_sweep, use_container_width=True)
+
+        st.dataframe(sweep_df.style.format({
+            '投入金額': '${:,.0f}', '總損益': '${:,.0f}', '報酬率%': '{:.2f}%', '勝率%': '{:.1f}%',
+            '夏普值': '{:.2f}', '獲利因子': '{:.2f}', '最大回撤': '${:,.0f}'
+        }), use_container_width=True, hide_index=True)
+
+
+@st.fragment
+def cost_sensitivity_section(df, investment_amount, calc_mode, costs):
+    """成本敏感度：固定目前的投入金額與模式，改變單一成本參數
+
+    每個參數值都要重新分析一次報表，因此按下按鈕才計算 (結果依參數快取)。
+    """
+    st.markdown("### 💸 交易成本敏感度")
+    col_cs1, col_cs2 = st.columns([1, 3])
+    with col_cs1:
+        sensitivity_label = st.selectbox("變動參數", list(COST_SENSITIVITY.keys()), key="cost_sensitivity_select")
+        if st.button("💸 開始分析", use_container_width=True, key="cost_sensitivity_button"):
+            st.session_state.cost_sensitivity_param = sensitivity_label
+
+    if st.session_state.cost_sensitivity_param is None:
+        return
+
+    sensitivity_label = st.session_state.cost_sensitivity_param
+    sensitivity_parameter, sensitivity_values = COST_SENSITIVITY[sensitivity_label]
+    sensitivity_df = cost_sensitivity_report(st.session_state.file_hash, df, investment_amount, calc_mode,
+                                             costs or {}, sensitivity_parameter, sensitivity_values)
+
+    with col_cs2:
+        fig_cost = make_subplots(specs=[[{"secondary_y": True}]])
+        fig_cost.add_trace(go.Bar(
+            x=sensitivity_df['參數值'].astype(str),
+            y=sensitivity_df['總損益'],
+            name='總損益',
+            marker=dict(color=[COLOR_PROFIT if v > 0 else COLOR_LOSS for v in sensitivity_df['總損益']]),
+            hovertemplate=f'{sensitivity_label}: %{{x}}<br>總損益: $%{{y:,.0f}}<extra></extra>'
+        ), secondary_y=False)
+        fig_cost.add_trace(go.Scatter(
+            x=sensitivity_df['參數值'].astype(str),
+            y=sensitivity_df['夏普值'],
+            name='夏普值',
+            mode='lines+markers',
+            line=dict(color=COLOR_PRIMARY, width=2),
+            hovertemplate=f'{sensitivity_label}: %{{x}}<br>夏普值: %{{y:.2f}}<extra></extra>'
+        ), secondary_y=True)
+        fig_cost.update_layout(
+            height=350,
+            template=CHART_TEMPLATE,
+            xaxis_title=sensitivity_label,
+            margin=dict(l=20, r=20, t=30, b=20)
+        )
+        fig_cost.update_yaxes(title_text="總損益 (元)", secondary_y=False)
+        fig_cost.update_yaxes(title_text="夏普值", showgrid=False, secondary_y=True)
+        st.plotly_chart(fig_cost, use_container_width=True)
+
+
+def streaming_summary_section(report_path, file_hash, investment_amount, calc_mode, costs):
+    """超大型報表的串流摘要：只顯示可逐批累計的總計與月份統計"""
+    st.info(f"📦 報表超過 {STREAM_MIN_BYTES / 1024 / 1024:,.0f} MB，以串流方式分析 (不載入整份報表)，"
+            f"只顯示總計與月份統計；權益曲線、夏普值、參數掃描與蒙地卡羅模擬需要完整的逐筆交易，不提供")
+
+    # 結果取出後保存在 session，相同參數的重新執行不再分析
+    summary_key = (file_hash, investment_amount, calc_mode, frozen_params(costs))
+    if st.session_state.stream_summary_key != summary_key:
+        stream_job = stream_summary_job(report_path, file_hash, investment_amount, calc_mode, costs)
+        st.session_state.stream_job_key = stream_job.key
+        if stream_job.status == 'running':
+            job_progress(stream_job.key, "stream", lambda done, total: "讀取檔案中..." if not total else
+                         f"串流分析中: {done / 1024 / 1024:,.1f} / {total / 1024 / 1024:,.1f} MB")
+            return
+        if stream_job.status == 'cancelled':
+            st.info("⏹️ 已取消分析")
+            if st.button("🔄 重新分析"):
+                job_runner().discard(stream_job.key)
+                st.rerun()
+            return
+        if stream_job.status == 'failed':
+            st.error(f"❌ 無法解析CSV檔案，請確認檔案格式是否正確 ({stream_job.exception()})")
+            return
+
+        result = job_runner().take(stream_job.key)
+        if result is None:
+            st.rerun()  # 工作在取出前已被移除，重新執行時會重新送出
+        _, st.session_state.stream_summary = result
+        st.session_state.stream_summary_key = summary_key
+
+    summary = st.session_state.stream_summary
+    if summary['n_trades'] == 0:
+        st.error(f"❌ 沒有可執行的交易。請檢查您的回測報表或調整投入金額 ${investment_amount:,} 及計算模式: {calc_mode}")
+        return
 
-    return sharpe
+    st.markdown("<h2>📊 績效總覽</h2>", unsafe_allow_html=True)
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric("💰 總損益", f"${summary['total_pnl']:,.0f}")
+    with col2:
+        st.metric("📈 報酬率", f"{summary['total_return']:.2f}%")
+    with col3:
+        st.metric("🎯 勝率", f"{summary['win_rate']:.1f}%")
+    with col4:
+        st.metric("📝 交易次數", f"{summary['n_trades']:,}", help=f"平均損益 ${summary['avg_pnl']:,.0f}")
+    with col5:
+        st.metric("⚖️ 獲利因子", f"{summary['profit_factor']:.2f}")
+    if costs is not None:
+        st.caption(f"💸 損益已扣除交易成本，合計 ${summary['total_costs']:,.0f}")
+
+    st.markdown("<h2>📅 時間分析</h2>", unsafe_allow_html=True)
+    time_view = st.radio("時間分析", ["📅 依開倉時間", "📅 依關倉時間"], horizontal=True,
+                         key="stream_time_view", label_visibility="collapsed")
+    if time_view == "📅 依開倉時間":
+        monthly, title = summary['entry_analysis'], '開倉月份 - 總損益'
+    else:
+        monthly, title = summary['exit_analysis'], '關倉月份 - 總損益'
 
+    st.plotly_chart(monthly_pnl_figure(summary_key, title, monthly), use_container_width=True)
+    st.dataframe(monthly.style.format({'總損益': '${:,.0f}', '交易次數': '{:.0f}'}), use_container_width=True)
 
-def calculate_profit_factor(trades_df):
-    """計算獲利因子"""
-    gross_profit = trades_df[trades_df['損益'] > 0]['損益'].sum()
-    gross_loss = trades_df[trades_df['損益'] < 0]['損益'].sum()
 
-    if gross_loss == 0 or gross_profit == 0:
-        return np.inf if gross_loss == 0 else 0
-    else:
-        return gross_profit / abs(gross_loss)
+@st.fragment
+def monte_carlo_section(analysis_key, trades_df):
+    """蒙地卡羅模擬：調整設定或按下開始模擬只重新執行這個區塊，不重新計算上方的報表與圖表
 
+    模擬在背景工作中執行，結果保留在 job_runner，切換圖表呈現或其他重新執行時不重新模擬。
+    """
+    st.markdown("<h2>🎲 蒙地卡羅模擬</h2>", unsafe_allow_html=True)
 
-def monte_carlo_simulation(trades_df, n_simulations):
-    """蒙地卡羅模擬 - 返回多條權益曲線"""
-    if len(trades_df) == 0:
-        return []
-
-    pnl_values = trades_df['損益'].values
-    n_trades = len(pnl_values)
+    # 模擬次數與平行運算設定 (放在區塊內，調整時不重新執行整個頁面)
+    col_mc_count, col_mc_seed, col_mc_workers = st.columns(3)
+    with col_mc_count:
+        mc_simulations = st.number_input(
+            "🎲 蒙地卡羅次數",
+            min_value=10,
+            max_value=MC_MAX_SIMULATIONS,
+            value=100,
+            step=10
+        )
+    with col_mc_seed:
+        mc_seed = st.number_input(
+            "🔑 隨機種子",
+            min_value=0,
+            value=None,
+            step=1,
+            placeholder="留空則每次隨機",
+            help="填入相同的種子可重現相同的模擬結果"
+        )
+    with col_mc_workers:
+        mc_workers = st.number_input(
+            "🖥️ 平行運算核心數",
+            min_value=1,
+            max_value=os.cpu_count() or 1,
+            value=1,
+            step=1,
+            help="大量模擬時可使用多核心平行計算；相同的種子與核心數會得到相同結果"
+        )
 
-    simulation_curves = []
+    # 抽樣方式設定
+    col_mc_method, col_mc_unit, col_mc_block, col_mc_chart = st.columns([2, 1, 1, 1])
+    with col_mc_method:
+        mc_method_label = st.selectbox(
+            "🔀 抽樣方式",
+            list(MC_METHOD_LABELS.keys()),
+            index=0,
+            help="i.i.d. 逐筆獨立抽樣會忽略交易的群聚；區塊抽樣保留連續交易的相關性，較能反映回撤風險"
+        )
+    with col_mc_unit:
+        mc_unit = st.radio(
+            "🧩 抽樣單位",
+            ["逐筆交易", "出場日"],
+            index=0,
+            help="出場日: 將同一天出場的交易視為一組一起抽樣"
+        )
+    with col_mc_block:
+        mc_block_size = st.number_input(
+            "📏 區塊長度",
+            min_value=1,
+            value=5,
+            step=1,
+            disabled=MC_METHOD_LABELS[mc_method_label] == 'iid',
+            help="移動區塊為固定長度；平穩 Bootstrap 為平均長度"
+        )
+    with col_mc_chart:
+        mc_chart_mode = st.radio(
+            "📉 圖表呈現",
+            ["百分位扇形圖", "樣本路徑"],
+            index=0,
+            key="mc_chart_mode",
+            help="扇形圖顯示每一步的 5/25/50/75/95 百分位區間，繪圖成本不隨模擬次數增加"
+        )
 
-    # 步驟 3: 在開始模擬時顯示進度條
-    progress_bar = st.empty()
+    # 修正: 將按鈕獨立出來
+    col_btn1, col_btn2, col_btn3 = st.columns([1, 1, 1])
+    with col_btn2:
+        if st.button("🚀 開始模擬", type="primary", use_container_width=True, key="mc_start_button"):
+            # 按鈕被點擊，設置 session state 標記，並儲存模擬次數
+            st.session_state.mc_triggered = True
+            st.session_state.mc_simulations = mc_simulations
+            st.session_state.mc_seed = mc_seed
+            st.session_state.mc_workers = mc_workers
+            st.session_state.mc_method = MC_METHOD_LABELS[mc_method_label]
+            st.session_state.mc_block_size = mc_block_size
+            st.session_state.mc_by_exit_day = mc_unit == "出場日"
+            # 每次按下都是新的模擬工作 (未指定種子時得到新的隨機結果)，並取消上一次仍在執行的模擬
+            reset_monte_carlo()
+            st.session_state.mc_triggered = True
+            st.session_state.mc_run_id = uuid.uuid4().hex
+
+    if st.session_state.mc_triggered:
+        # 確保有交易數據才能模擬
+        if len(trades_df) > 0:
+            mc_simulations_count = st.session_state.mc_simulations
+
+            # 模擬在背景執行 (串流統計，只保留樣本曲線)，執行中顯示進度並可取消；
+            # 同一次按下 (mc_run_id) 與同一份報表的重新執行沿用同一個工作；完成後結果取出保存在 session
+            mc_job_key = ('monte_carlo', st.session_state.mc_run_id, analysis_key)
+            units = monte_carlo_sample_units(analysis_key, st.session_state.mc_by_exit_day, trades_df)
+            if st.session_state.mc_summary_key != mc_job_key:
+                st.session_state.mc_job_key = mc_job_key
+                mc_job = monte_carlo_job(units, mc_simulations_count,
+                                         seed=st.session_state.mc_seed,
+                                         n_workers=st.session_state.mc_workers,
+                                         method=st.session_state.mc_method,
+                                         block_size=st.session_state.mc_block_size,
+                                         key=mc_job_key)
+                if mc_job.status == 'running':
+                    job_progress(mc_job.key, "mc", lambda done, total: f"執行模擬中: {done}/{total} "
+                                                                       f"({int(done / total * 100) if total else 0}%)")
+                    return
+                if mc_job.status == 'cancelled':
+                    st.info("⏹️ 模擬已取消，按下「開始模擬」重新執行")
+                    return
+                if mc_job.status == 'failed':
+                    st.error(f"❌ 模擬失敗: {mc_job.exception()}")
+                    return
+
+                mc_summary = job_runner().take(mc_job_key)
+                if mc_summary is None:
+                    st.rerun()  # 工作在取出前已被移除，重新執行時會重新送出
+                st.session_state.mc_summary = mc_summary
+                st.session_state.mc_summary_key = mc_job_key
+
+            mc_summary = st.session_state.mc_summary
+            simulation_curves = mc_summary['sample_paths']
+            mc_unit_label = "出場日" if st.session_state.mc_by_exit_day else "筆交易"
+            mc_count_unit = "天" if st.session_state.mc_by_exit_day else "筆"
+            actual_curve = np.cumsum(units)
+
+            # 繪製模擬曲線
+            fig_mc = go.Figure()
+            primary_rgb = f'{int(COLOR_PRIMARY[1:3], 16)}, {int(COLOR_PRIMARY[3:5], 16)}, {int(COLOR_PRIMARY[5:7], 16)}'
+
+            if mc_chart_mode == "百分位扇形圖":
+                # 百分位區間：外層 5-95%、內層 25-75%，中位數為實線
+                steps = mc_summary['band_steps']
+                bands = dict(zip(MC_BAND_PERCENTILES, percentile_bands(mc_summary)))
+                for low, high, alpha in ((5, 95, 0.15), (25, 75, 0.3)):
+                    fig_mc.add_trace(go.Scatter(
+                        x=steps, y=bands[low], mode='lines', line=dict(width=0),
+                        showlegend=False, hoverinfo='skip'
+                    ))
+                    fig_mc.add_trace(go.Scatter(
+                        x=steps, y=bands[high], mode='lines', line=dict(width=0),
+                        fill='tonexty', fillcolor=f'rgba({primary_rgb}, {alpha})',
+                        name=f'{low}-{high}% 區間',
+                        customdata=bands[low],
+                        hovertemplate=f'{low}%: $%{{customdata:,.0f}} ~ {high}%: $%{{y:,.0f}}<extra></extra>'
+                    ))
+                fig_mc.add_trace(go.Scatter(
+                    x=steps, y=bands[50], mode='lines', name='中位數',
+                    line=dict(color=COLOR_PRIMARY, width=2),
+                    hovertemplate=f'<b>第%{{x}}{mc_unit_label}</b><br>中位數: $%{{y:,.0f}}<extra></extra>'
+                ))
 
-    for i in range(n_simulations):
-        # 隨機抽樣交易損益 (Bootstrap)
-        sim_pnl = np.random.choice(pnl_values, size=n_trades, replace=True)
-        sim_cumulative = np.cumsum(sim_pnl)
-        simulation_curves.append(sim_cumulative)
+                # 少量樣本路徑合併為一條 WebGL 曲線
+                sample = simulation_curves[:MC_FAN_SAMPLE_PATHS]
+                if len(sample) > 0:
+                    sample_x, sample_y = path_lines(sample, mc_summary['path_steps'])
+                    fig_mc.add_trace(go.Scattergl(
+                        x=sample_x,
+                        y=sample_y,
+                        mode='lines',
+                        name='樣本路徑',
+                        line=dict(color=f'rgba({primary_rgb}, 0.25)', width=1),
+                        hoverinfo='skip'
+                    ))
 
-        # 更新進度條 (因為計算速度很快，這裡可以加入 time.sleep(0.001) 讓進度條稍微可見)
-        progress = int((i + 1) / n_simulations * 100)
-        progress_bar.progress(progress, text=f"執行模擬中: {i + 1}/{n_simulations} ({progress}%)")
+            elif len(simulation_curves) > 0:
+                # 樣本模擬曲線 (最多 MC_PLOT_PATHS 條) 合併為單一 trace，避免瀏覽器負擔過重
+                paths_x, paths_y = path_lines(simulation_curves, mc_summary['path_steps'])
+                # 降低透明度，讓實際曲線更突出
+                fig_mc.add_trace(scatter_class(len(paths_y))(
+                    x=paths_x,
+                    y=paths_y,
+                    mode='lines',
+                    line=dict(color=f'rgba({primary_rgb}, 0.08)', width=1),  # 模擬曲線使用 Primary Blue
+                    showlegend=False,
+                    hoverinfo='skip'
+                ))
 
-        # 由於 Streamlit 單線程的限制，這裡的百分比顯示僅為參考，並非實時進度。
-        # time.sleep(0.001) # 可選: 稍微延遲讓用戶看到進度條
+            # 添加實際曲線 (以 LTTB 降採樣)
+            actual_steps = lttb_indices(np.arange(len(actual_curve)), actual_curve)
+            fig_mc.add_trace(go.Scatter(
+                x=actual_steps,
+                y=actual_curve[actual_steps],
+                mode='lines',
+                name='實際曲線',
+                line=dict(color=COLOR_PROFIT, width=3),  # 修正: 實際曲線用紅色
+                hovertemplate=f'<b>第%{{x}}{mc_unit_label}</b><br>累積損益: $%{{y:,.0f}}<extra></extra>'
+            ))
 
-    progress_bar.progress(100, text="✅ 模擬完成!")
-    time.sleep(0.5)
-    progress_bar.empty()
+            # 添加零軸
+            fig_mc.add_hline(y=0, line_dash="dash", line_color="#6B7280", line_width=2)
+
+            # 計算統計數據
+            final_values = mc_summary['final_pnl']
+            loss_prob = (final_values < 0).sum() / len(final_values) * 100
+            percentile_5 = np.percentile(final_values, 5)
+            percentile_95 = np.percentile(final_values, 95)
+            median = np.median(final_values)
+
+            fig_mc.update_layout(
+                title=f'蒙地卡羅模擬 (n={mc_simulations_count}) - 權益曲線',
+                height=550,
+                template=CHART_TEMPLATE,
+                xaxis_title="出場日數" if st.session_state.mc_by_exit_day else "交易次數",
+                yaxis_title="累積損益 (元)",
+                hovermode='closest',
+                showlegend=True,
+                margin=dict(l=20, r=20, t=60, b=20)
+            )
 
-    return simulation_curves
+            st.plotly_chart(fig_mc, use_container_width=True)
+
+            # 顯示統計數據
+            st.markdown("### 📊 模擬統計")
+            col_mc1, col_mc2, col_mc3, col_mc4 = st.columns(4)
+
+            with col_mc1:
+                # 修正: 虧損機率顏色（機率越低越好，但這裡的顏色用於突顯數據）
+                loss_color = COLOR_LOSS if loss_prob < 10 else COLOR_PROFIT
+                st.markdown(
+                    f"<p style='color: {loss_color}; font-size: 1.5em; font-weight: 700;'>{loss_prob:.1f}%</p>",
+                    unsafe_allow_html=True)
+                st.markdown("<p style='color: #9CA3AF; font-size: 0.9em;'>⚠️ 虧損機率</p>", unsafe_allow_html=True)
+
+            with col_mc2:
+                # 修正: 樂觀情境顏色 (賺錢用紅色)
+                p95_color = COLOR_PROFIT if percentile_95 > 0 else COLOR_LOSS
+                st.markdown(
+                    f"<p style='color: {p95_color}; font-size: 1.5em; font-weight: 700;'>${percentile_95:,.0f}</p>",
+                    unsafe_allow_html=True)
+                st.markdown("<p style='color: #9CA3AF; font-size: 0.9em;'>📈 95% 樂觀情境</p>",
+                            unsafe_allow_html=True)
+
+            with col_mc3:
+                # 修正: 中位數顏色 (賺錢用紅色)
+                median_color = COLOR_PROFIT if median > 0 else COLOR_LOSS
+                st.markdown(
+                    f"<p style='color: {median_color}; font-size: 1.5em; font-weight: 700;'>${median:,.0f}</p>",
+                    unsafe_allow_html=True)
+                st.markdown("<p style='color: #9CA3AF; font-size: 0.9em;'>⚖️ 模擬中位數</p>",
+                            unsafe_allow_html=True)
+
+            with col_mc4:
+                # 修正: 最差情境顏色 (賺錢用紅色)
+                p5_color = COLOR_PROFIT if percentile_5 > 0 else COLOR_LOSS
+                st.markdown(
+                    f"<p style='color: {p5_color}; font-size: 1.5em; font-weight: 700;'>${percentile_5:,.0f}</p>",
+                    unsafe_allow_html=True)
+                st.markdown("<p style='color: #9CA3AF; font-size: 0.9em;'>📉 5% 最差情境</p>",
+                            unsafe_allow_html=True)
+
+            # 風險分佈統計
+            col_risk1, col_risk2, col_risk3, col_risk4 = st.columns(4)
+            with col_risk1:
+                st.metric("📉 MDD 中位數", f"${np.median(mc_summary['max_drawdown']):,.0f}")
+            with col_risk2:
+                st.metric("💥 MDD 5% 最差", f"${np.percentile(mc_summary['max_drawdown'], 5):,.0f}")
+            with col_risk3:
+                st.metric("🔻 最長連虧 (95%)",
+                          f"{np.percentile(mc_summary['longest_losing_streak'], 95):.0f} {mc_count_unit}")
+            with col_risk4:
+                st.metric("⏳ 回復期間 (95%)",
+                          f"{np.percentile(mc_summary['recovery_trades'], 95):.0f} {mc_count_unit}",
+                          help=f"最長的回撤期間，以{mc_count_unit}數計算 (未回復者計至最後一{mc_count_unit})")
 
 
 # 主標題
@@ -459,15 +1210,33 @@ if not st.session_state.uploaded:
         key="file_uploader_key"
     )
 
-    if uploaded_file is not None:
-        # 這裡會觸發 parse_csv 內部的進度條
-        df, error = parse_csv(uploaded_file)
-
-        if error:
-            st.error(f"❌ {error}")
+    if uploaded_file is not None and uploaded_file.size >= STREAM_MIN_BYTES:
+        # 超大型報表不解析成完整的 DataFrame，寫入暫存檔，確認參數後以串流方式分析
+        st.session_state.report_path, st.session_state.file_hash = spool_upload(uploaded_file)
+        st.session_state.uploaded = True
+        st.rerun()
+
+    elif uploaded_file is not None:
+        # 在背景解析，解析期間顯示進度並可取消
+        file_hash = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+        parse_job = parse_csv(uploaded_file, file_hash)
+
+        if parse_job.status == 'running':
+            job_progress(parse_job.key, "parse", lambda done, total: "載入檔案中..." if not total else
+                         f"解析檔案中: {done / 1024 / 1024:,.1f} / {total / 1024 / 1024:,.1f} MB")
+        elif parse_job.status == 'cancelled':
+            st.info("⏹️ 已取消解析")
+            if st.button("🔄 重新解析"):
+                job_runner().discard(parse_job.key)
+                st.rerun()
+        elif parse_job.status == 'failed':
+            st.error(f"❌ 無法解析CSV檔案，請確認檔案格式是否正確 ({parse_job.exception()})")
         else:
-            st.session_state.df = df
-            st.session_state.uploaded = True
+            df = job_runner().take(parse_job.key)
+            if df is not None:  # 為 None 時工作在取出前已被移除，重新執行時會重新送出
+                st.session_state.df = df
+                st.session_state.file_hash = file_hash
+                st.session_state.uploaded = True
             st.rerun()
 
 elif not st.session_state.params_confirmed:
@@ -495,6 +1264,59 @@ elif not st.session_state.params_confirmed:
             help="整張計算: 以1000股為單位，高價股可能買不起\n股數計算: 可買零股，任何價位都能買"
         )
 
+        capital_mode = st.radio(
+            "🏦 資金模式",
+            ["不限資金", "帳戶資金限制"],
+            index=0,
+            key="capital_mode_radio",
+            horizontal=True,
+            # 帳戶模式需要依時間排序全部交易，串流摘要模式不支援
+            disabled=st.session_state.report_path is not None,
+            help="不限資金: 每筆訊號都進場\n帳戶資金限制: 依時間順序以帳戶現金下單，現金不足時略過或縮減部位"
+        )
+
+        portfolio = None
+        if capital_mode == "帳戶資金限制":
+            account_capital = st.number_input(
+                "💼 帳戶總資金 (元)",
+                min_value=10000,
+                value=1000000,
+                step=100000,
+                format="%d"
+            )
+            col_sizing, col_shortfall = st.columns(2)
+            with col_sizing:
+                compound = st.checkbox("📈 複利 (依已實現權益調整每筆金額)", value=False)
+            with col_shortfall:
+                shortfall = st.radio("現金不足時", ["略過交易", "縮減部位"], index=0, horizontal=True)
+            portfolio = {
+                'capital': account_capital,
+                'sizing': 'compound' if compound else 'fixed',
+                'on_shortfall': 'scale' if shortfall == "縮減部位" else 'skip',
+            }
+
+        include_costs = st.checkbox("💸 計入交易成本 (手續費、證交稅、滑價)", value=False, key="include_costs")
+        costs = None
+        if include_costs:
+            col_cost1, col_cost2, col_cost3 = st.columns(3)
+            with col_cost1:
+                commission_discount = st.number_input(
+                    "手續費折扣", min_value=0.0, max_value=1.0, value=float(COST_DEFAULTS['commission_discount']),
+                    step=0.05, help="0.6 表示 6 折；手續費率 0.1425%，每筆最低 20 元")
+            with col_cost2:
+                tax_rate_pct = st.number_input(
+                    "證交稅 (%)", min_value=0.0, value=COST_DEFAULTS['tax_rate'] * 100, step=0.05, format="%.2f",
+                    help=f"當日進出的交易適用當沖稅率 {COST_DEFAULTS['day_trade_tax_rate'] * 100:.2f}%")
+            with col_cost3:
+                slippage_ticks = st.number_input(
+                    "滑價 (檔)", min_value=0, value=COST_DEFAULTS['slippage_ticks'], step=1,
+                    help="進出場各滑價的檔數，跳動單位依證交所升降單位級距")
+            costs = {
+                'commission_discount': commission_discount,
+                'tax_rate': tax_rate_pct / 100,
+                'slippage_ticks': slippage_ticks,
+            }
+
         st.markdown("<br>", unsafe_allow_html=True)
 
         col_a, col_b, col_c = st.columns([1, 1, 1])
@@ -503,61 +1325,120 @@ elif not st.session_state.params_confirmed:
                 # 這裡不需要進度條，因為主要計算在後面
                 st.session_state.investment_amount = investment_amount
                 st.session_state.calc_mode = calc_mode
+                st.session_state.portfolio = portfolio
+                st.session_state.costs = costs
                 st.session_state.params_confirmed = True
                 st.rerun()
 
+elif st.session_state.report_path is not None:
+    # 超大型報表 - 串流摘要 (不載入整份報表)
+    with st.sidebar:
+        st.markdown("### ⚙️ 分析設定")
+        st.markdown(f"**投入金額:** ${st.session_state.investment_amount:,}")
+        st.markdown(f"**計算模式:** {st.session_state.calc_mode}")
+        if st.session_state.costs is not None:
+            costs = st.session_state.costs
+            st.markdown(f"**交易成本:** 手續費 {costs['commission_discount']:g} 折扣、"
+                        f"證交稅 {costs['tax_rate'] * 100:.2f}%、滑價 {costs['slippage_ticks']} 檔")
+        st.markdown("---")
+
+        if st.button("🔄 重新設定"):
+            st.session_state.params_confirmed = False
+            st.rerun()
+
+        if st.button("📤 重新上傳"):
+            st.session_state.uploaded = False
+            st.session_state.file_hash = None
+            st.session_state.params_confirmed = False
+            discard_report_file()
+            st.rerun()
+
+    streaming_summary_section(st.session_state.report_path, st.session_state.file_hash,
+                              st.session_state.investment_amount, st.session_state.calc_mode, st.session_state.costs)
+
 else:
     # 已確認參數 - 顯示分析結果
     df = st.session_state.df
     investment_amount = st.session_state.investment_amount
     calc_mode = st.session_state.calc_mode
+    portfolio = st.session_state.portfolio
+    costs = st.session_state.costs
 
     # 側邊欄
     with st.sidebar:
         st.markdown("### ⚙️ 分析設定")
         st.markdown(f"**投入金額:** ${investment_amount:,}")
         st.markdown(f"**計算模式:** {calc_mode}")
+        if portfolio is not None:
+            st.markdown(f"**帳戶資金:** ${portfolio['capital']:,}")
+            st.markdown(f"**部位計算:** {'複利' if portfolio['sizing'] == 'compound' else '固定金額'}"
+                        f" / 現金不足時{'縮減部位' if portfolio['on_shortfall'] == 'scale' else '略過'}")
+        if costs is not None:
+            st.markdown(f"**交易成本:** 手續費 {costs['commission_discount']:g} 折扣、"
+                        f"證交稅 {costs['tax_rate'] * 100:.2f}%、滑價 {costs['slippage_ticks']} 檔")
         st.markdown("---")
 
-        mc_simulations = st.number_input(
-            "🎲 蒙地卡羅次數",
-            min_value=10,
-            max_value=1000,
-            value=100,
-            step=10
+        price_file = st.file_uploader(
+            "📈 收盤價檔 (選用)",
+            type=['csv'],
+            key="price_file",
+            help="欄位: 日期, 商品代碼, 收盤價。提供時逐日權益以收盤價計算持有部位的市值，否則在進出場價格間內插"
         )
+        if price_file is None:
+            st.session_state.prices = None
+            st.session_state.prices_hash = None
+        else:
+            price_bytes = price_file.getvalue()
+            price_hash = hashlib.sha256(price_bytes).hexdigest()
+            if price_hash != st.session_state.prices_hash:
+                try:
+                    st.session_state.prices = read_price_file(io.BytesIO(price_bytes))
+                    st.session_state.prices_hash = price_hash
+                except ValueError as e:
+                    st.session_state.prices = None
+                    st.session_state.prices_hash = None
+                    st.error(f"❌ 無法讀取收盤價檔: {e}")
 
         st.markdown("---")
 
         if st.button("🔄 重新設定"):
             st.session_state.params_confirmed = False
-            st.session_state.mc_triggered = False  # 重設時清空模擬結果
+            reset_monte_carlo()  # 重設時清空模擬結果，並取消進行中的模擬
             st.rerun()
 
         if st.button("📤 重新上傳"):
             st.session_state.uploaded = False
             st.session_state.df = None
+            st.session_state.file_hash = None
             st.session_state.params_confirmed = False
-            st.session_state.mc_triggered = False  # 重設時清空模擬結果
+            reset_monte_carlo()  # 重設時清空模擬結果，並取消進行中的模擬
+            st.session_state.sweep_params = None
+            st.session_state.cost_sensitivity_param = None
             st.rerun()
 
-    # 計算交易 (這裡的計算速度很快，不需要進度條)
-    trades_df = calculate_trades(df, investment_amount, calc_mode)
+    # 計算交易與所有指標 (結果依檔案雜湊與參數快取，切換圖表或模擬設定時不重新計算)
+    analysis = analyze_report(st.session_state.file_hash, df, investment_amount, calc_mode, portfolio, costs,
+                              st.session_state.prices_hash, st.session_state.prices)
+    # 與 analyze_report 相同的快取鍵 (設定 dict 轉為 tuple 才能作為背景工作的鍵)，圖表函數以此快取已建立的圖表
+    analysis_key = (st.session_state.file_hash, investment_amount, calc_mode, frozen_params(portfolio),
+                    frozen_params(costs), st.session_state.prices_hash)
+    trades_df = analysis['trades_df']
 
     if len(trades_df) == 0:
         st.error(f"❌ 沒有可執行的交易。請檢查您的回測報表或調整投入金額 ${investment_amount:,} 及計算模式: {calc_mode}")
     else:
-        # 計算指標
-        equity_curve = calculate_equity_curve(trades_df)
-        total_pnl = trades_df['損益'].sum()
-        total_investment = trades_df['投入金額'].sum()
-        total_return = (total_pnl / total_investment) * 100
-        max_concurrent = calculate_max_concurrent_positions(trades_df)
-        dd_df, max_dd, max_dd_pct = calculate_drawdown(equity_curve)
-        sharpe = calculate_sharpe_ratio(trades_df)
-        profit_factor = calculate_profit_factor(trades_df)
-        win_rate = (trades_df['損益'] > 0).sum() / len(trades_df) * 100
-        concurrent_df = calculate_concurrent_holdings(trades_df)
+        equity_curve = analysis['equity_curve']
+        total_pnl = analysis['total_pnl']
+        total_return = analysis['total_return']
+        max_concurrent = analysis['max_concurrent']
+        max_concurrent_time = analysis['max_concurrent_time']
+        max_positions = analysis['max_positions']
+        dd_df, max_dd, max_dd_pct = analysis['dd_df'], analysis['max_dd'], analysis['max_dd_pct']
+        sharpe = analysis['sharpe']
+        profit_factor = analysis['profit_factor']
+        win_rate = analysis['win_rate']
+        concurrent_df = analysis['concurrent_df']
+        daily_equity = analysis['daily_equity']
         # --- 頂部 CTA 按鈕群組：藍底白字 (primary 樣式)，置中 ---
         # 使用 col([1, 1.5, 1.5, 1.5, 1]) 讓三個按鈕置中
         empty_col_l, action_col1, action_col2, action_col3, empty_col_r = st.columns([1, 1.5, 1.5, 1.5, 1])
@@ -573,7 +1454,11 @@ else:
                 # 這是最簡單的重置方法：直接將狀態設為未上傳，然後重新運行
                 st.session_state.uploaded = False
                 st.session_state.df = None
+                st.session_state.file_hash = None
                 st.session_state.params_confirmed = False
+                reset_monte_carlo()  # 與側邊欄的重新上傳相同，取消並移除進行中的模擬
+                st.session_state.sweep_params = None
+                st.session_state.cost_sensitivity_param = None
                 st.rerun()
 
         with action_col2:
@@ -680,7 +1565,7 @@ else:
 
         st.markdown("<br>", unsafe_allow_html=True)
 
-        col1, col2, col3 = st.columns(3)
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
             st.metric("🎯 勝率", f"{win_rate:.1f}%")
         with col2:
@@ -688,470 +1573,84 @@ else:
         with col3:
             avg_pnl = trades_df['損益'].mean()
             st.metric("📊 平均損益", f"${avg_pnl:,.0f}")
+        with col4:
+            # 最大持倉發生時間與最大同時持有部位數
+            peak_time_text = max_concurrent_time.strftime('%Y-%m-%d') if max_concurrent_time is not None else "-"
+            st.metric("📦 最大同時持有", f"{max_positions} 檔", help=f"最大持倉發生於 {peak_time_text}")
+
+        # 逐日市值權益 (含持有中部位的未實現損益) 的日報酬指標
+        metrics = analysis['metrics']
+        col_daily1, col_daily2, col_daily3, col_daily4 = st.columns(4)
+        daily_basis = "帳戶資金" if portfolio is not None else "最大持倉金額"
+        with col_daily1:
+            st.metric("📅 日報酬夏普值", f"{metrics.daily_sharpe:.2f}",
+                      help=f"以逐日市值權益的日報酬年化 (√252)，報酬率以{daily_basis}為基準；"
+                           f"總覽的夏普值以每筆報酬率依每年 {metrics.trades_per_year:,.0f} 筆交易年化")
+        with col_daily2:
+            st.metric("🛡️ Sortino", f"{metrics.sortino:.2f}", help="只以下跌的日報酬計算波動")
+        with col_daily3:
+            st.metric("📉 逐日 MDD", f"${metrics.max_dd:,.0f}",
+                      help="含持有期間的浮動損益；出場時才認列的 MDD 見上方總覽")
+        with col_daily4:
+            st.metric("📉 逐日 MDD %", f"{metrics.max_dd_pct:.1f}%", help=f"相對{daily_basis}加上權益高點")
+
+        # 延伸風險指標
+        col_ext1, col_ext2, col_ext3, col_ext4, col_ext5, col_ext6 = st.columns(6)
+        with col_ext1:
+            st.metric("🏔️ Calmar", f"{metrics.calmar:.2f}",
+                      help=f"年化報酬率 {metrics.annual_return:.1f}% / |逐日 MDD %|")
+        with col_ext2:
+            st.metric("🎲 期望值", f"${metrics.expectancy:,.0f}", help="每筆交易的平均淨損益")
+        with col_ext3:
+            st.metric("⚖️ 賺賠比", f"{metrics.payoff_ratio:.2f}",
+                      help=f"平均獲利 ${metrics.avg_win:,.0f} / 平均虧損 ${abs(metrics.avg_loss):,.0f}")
+        with col_ext4:
+            st.metric("🔁 最大連勝 / 連敗", f"{metrics.max_consecutive_wins} / {metrics.max_consecutive_losses}",
+                      help="依出場時間排序的連續獲利 / 虧損筆數")
+        with col_ext5:
+            st.metric("😰 Ulcer 指數", f"{metrics.ulcer_index:.2f}", help="逐日回撤百分比的均方根，越低越好")
+        with col_ext6:
+            st.metric("⏱️ 平均持有天數", f"{metrics.avg_holding_days:.1f} 天")
+
+        if costs is not None:
+            st.caption(f"💸 損益與各項指標皆已扣除交易成本，合計 ${analysis['total_costs']:,.0f}")
+
+        # 帳戶資金限制模式的帳戶摘要
+        account = analysis.get('account')
+        if account is not None:
+            col_acc1, col_acc2, col_acc3, col_acc4 = st.columns(4)
+            with col_acc1:
+                st.metric("🏦 期末權益", f"${account['final_equity']:,.0f}",
+                          delta=f"{account['account_return']:.1f}%")
+            with col_acc2:
+                st.metric("✅ 成交訊號", f"{account['n_executed']:,} / {account['n_signals']:,}")
+            with col_acc3:
+                st.metric("⛔ 資金不足略過", f"{account['n_skipped']:,} 筆",
+                          help=f"另有 {account['n_unaffordable']:,} 筆買不起一張、{account['n_scaled']:,} 筆縮減部位")
+            with col_acc4:
+                st.metric("💵 最低可用現金", f"${account['min_cash']:,.0f}")
 
         # 權益曲線 + 同時持有金額
-        st.markdown("<h2>📈 權益曲線 & 資金使用</h2>", unsafe_allow_html=True)
-
-        fig = make_subplots(
-            rows=3, cols=1,
-            shared_xaxes=True,
-            vertical_spacing=0.06,
-            row_heights=[0.5, 0.25, 0.25],
-            subplot_titles=('累積損益曲線', '績效回檔', '同時持有金額')
-        )
-
-        # 權益曲線
-        fig.add_trace(
-            go.Scatter(
-                x=equity_curve['出場時間'],
-                y=equity_curve['累積損益'],
-                mode='lines',
-                name='累積損益',
-                line=dict(color=COLOR_PROFIT, width=3),  # 修正: 權益曲線用紅色
-                fill='tozeroy',
-                fillcolor=f'rgba({int(COLOR_PROFIT[1:3], 16)}, {int(COLOR_PROFIT[3:5], 16)}, {int(COLOR_PROFIT[5:7], 16)}, 0.15)',
-                hovertemplate='<b>%{x|%Y-%m-%d}</b><br>累積損益: $%{y:,.0f}<extra></extra>'
-            ),
-            row=1, col=1
-        )
-
-        # 權益曲線 - 創新高標記
-        new_highs = equity_curve[equity_curve['New_High'] == True]
-        fig.add_trace(
-            go.Scatter(
-                x=new_highs['出場時間'],
-                y=new_highs['累積損益'],
-                mode='markers',
-                name='權益新高點',
-                marker=dict(color='white', size=8, line=dict(width=1, color=COLOR_PROFIT)),
-                hovertemplate='<b>%{x|%Y-%m-%d}</b><br>權益新高: $%{y:,.0f}<extra></extra>'
-            ),
-            row=1, col=1
-        )
-
-        fig.add_hline(y=0, line_dash="dot", line_color="#6B7280", line_width=1.5, row=1, col=1)
-
-        # 績效回檔 (MDD)
-        fig.add_trace(
-            go.Scatter(
-                x=dd_df['時間'],
-                y=dd_df['回撤金額'],
-                fill='tozeroy',
-                mode='lines',
-                name='回撤',
-                line=dict(color=COLOR_LOSS, width=2),  # 修正: 回撤用綠色
-                fillcolor=f'rgba({int(COLOR_LOSS[1:3], 16)}, {int(COLOR_LOSS[3:5], 16)}, {int(COLOR_LOSS[5:7], 16)}, 0.25)',
-                hovertemplate='<b>%{x|%Y-%m-%d}</b><br>回檔金額: $%{y:,.0f}<extra></extra>'
-            ),
-            row=2, col=1
-        )
-
-        # 績效回檔 - 創新低標記 (即 MDD)
-        new_drawdowns = dd_df[dd_df['New_Drawdown'] == True]
-        fig.add_trace(
-            go.Scatter(
-                x=new_drawdowns['時間'],
-                y=new_drawdowns['回撤金額'],
-                mode='markers',
-                name='最大回撤點',
-                marker=dict(color='white', size=8, line=dict(width=1, color=COLOR_LOSS)),
-                hovertemplate='<b>%{x|%Y-%m-%d}</b><br>回檔新低: $%{y:,.0f}<extra></extra>'
-            ),
-            row=2, col=1
-        )
-
-        # 同時持有金額
-        fig.add_trace(
-            go.Scatter(
-                x=concurrent_df['日期'],
-                y=concurrent_df['持有金額'],
-                mode='lines',
-                name='持有金額',
-                line=dict(color='#F59E0B', width=2),
-                fill='tozeroy',
-                fillcolor='rgba(245, 158, 11, 0.2)',
-                hovertemplate='<b>%{x|%Y-%m-%d}</b><br>持有金額: $%{y:,.0f}<extra></extra>'
-            ),
-            row=3, col=1
-        )
-
-        fig.update_layout(
-            height=800,
-            template='plotly_dark',
-            paper_bgcolor='#0B0E14',
-            plot_bgcolor='#1A1D24',
-            font=dict(color='#E8EAED', family='Trebuchet MS', size=12),
-            hovermode='x unified',
-            showlegend=False,
-            margin=dict(l=20, r=20, t=40, b=20)
-        )
-
-        fig.update_xaxes(
-            showgrid=True,
-            gridwidth=1,
-            gridcolor='#3A3F4B',
-            showline=True,
-            linecolor='#3A3F4B'
-        )
-
-        fig.update_yaxes(
-            showgrid=True,
-            gridwidth=1,
-            gridcolor='#3A3F4B',
-            showline=True,
-            linecolor='#3A3F4B'
-        )
-
-        st.plotly_chart(fig, use_container_width=True)
-
-        # 報酬分佈分析
-        st.markdown("<h2>📊 報酬分佈分析</h2>", unsafe_allow_html=True)
-
-        tab1, tab2, tab3 = st.tabs(["💰 損益分佈", "💲 價格分析", "📅 時間分析"])
-
-        with tab1:
-            # 損益分佈直方圖
-            fig_dist = go.Figure()
-
-            # 根據損益正負賦予顏色 (紅色賺，綠色賠)
-            pnl_data = trades_df['損益'].values
-            colors_hist = [COLOR_PROFIT if p > 0 else COLOR_LOSS for p in pnl_data]
-
-            # 這裡使用 Plotly 內建的 Histogarm
-            fig_dist.add_trace(go.Histogram(
-                x=pnl_data,
-                nbinsx=50,
-                # 由於 Plotly Histogram 難以對單一條形圖上色，這裡使用 `marker.color` 保持單一顏色，但在其他圖中使用條件顏色。
-                # 為了視覺效果，這裡使用 Primary Color，並在 Bar 圖中使用條件顏色。
-                marker=dict(
-                    color=COLOR_PRIMARY,
-                    line=dict(color='#3A3F4B', width=0.5)
-                ),
-                hovertemplate='損益: $%{x:,.0f}<br>次數: %{y}<extra></extra>'
-            ))
-
-            fig_dist.add_vline(x=0, line_dash="dash", line_color="#E8EAED", line_width=2.5)
-
-            fig_dist.update_layout(
-                height=450,
-                template='plotly_dark',
-                paper_bgcolor='#0B0E14',
-                plot_bgcolor='#1A1D24',
-                font=dict(color='#E8EAED', size=12),
-                xaxis_title="損益 (元)",
-                yaxis_title="交易次數",
-                showlegend=False,
-                margin=dict(l=20, r=20, t=20, b=20)
-            )
-
-            fig_dist.update_xaxes(showgrid=True, gridcolor='#3A3F4B')
-            fig_dist.update_yaxes(showgrid=True, gridcolor='#3A3F4B')
-
-            st.plotly_chart(fig_dist, use_container_width=True)
-
-        with tab2:
-            # 價格區間與損益的關係
-            price_bins = [0, 10, 20, 30, 50, 100, 200, float('inf')]
-            price_labels = ['0-10', '10-20', '20-30', '30-50', '50-100', '100-200', '200+']
-
-            trades_df['價格區間'] = pd.cut(trades_df['進場價格'], bins=price_bins, labels=price_labels)
-
-            # 計算每個價格區間的總損益和交易次數
-            price_analysis = trades_df.groupby('價格區間', observed=True).agg({
-                '損益': ['sum', 'mean', 'count']
-            }).reset_index()
-
-            price_analysis.columns = ['價格區間', '總損益', '平均損益', '交易次數']
-
-            # 繪製價格分析圖
-            fig_price = make_subplots(
-                rows=1, cols=2,
-                subplot_titles=('各價格區間總損益', '各價格區間平均損益'),
-                horizontal_spacing=0.12
-            )
-
-            # 修正: 根據損益正負賦予顏色 (紅色賺，綠色賠)
-            colors_sum = [COLOR_PROFIT if x > 0 else COLOR_LOSS for x in price_analysis['總損益']]
-            colors_avg = [COLOR_PROFIT if x > 0 else COLOR_LOSS for x in price_analysis['平均損益']]
-
-            fig_price.add_trace(
-                go.Bar(
-                    x=price_analysis['價格區間'],
-                    y=price_analysis['總損益'],
-                    marker=dict(color=colors_sum, line=dict(color='#3A3F4B', width=0.5)),
-                    text=price_analysis['交易次數'],
-                    texttemplate='%{text}筆',
-                    textposition='outside',
-                    hovertemplate='<b>%{x}元</b><br>總損益: $%{y:,.0f}<br>交易次數: %{text}筆<extra></extra>'
-                ),
-                row=1, col=1
-            )
+        equity_chart_section(analysis)
 
-            fig_price.add_trace(
-                go.Bar(
-                    x=price_analysis['價格區間'],
-                    y=price_analysis['平均損益'],
-                    marker=dict(color=colors_avg, line=dict(color='#3A3F4B', width=0.5)),
-                    hovertemplate='<b>%{x}元</b><br>平均損益: $%{y:,.0f}<extra></extra>'
-                ),
-                row=1, col=2
-            )
-
-            fig_price.add_hline(y=0, line_dash="dash", line_color="#6B7280", line_width=1.5, row=1, col=1)
-            fig_price.add_hline(y=0, line_dash="dash", line_color="#6B7280", line_width=1.5, row=1, col=2)
-
-            fig_price.update_layout(
-                height=450,
-                template='plotly_dark',
-                paper_bgcolor='#0B0E14',
-                plot_bgcolor='#1A1D24',
-                font=dict(color='#E8EAED', size=12),
-                showlegend=False,
-                margin=dict(l=20, r=20, t=40, b=20)
-            )
-
-            fig_price.update_xaxes(title_text="進場價格區間", showgrid=True, gridcolor='#3A3F4B')
-            fig_price.update_yaxes(title_text="損益 (元)", showgrid=True, gridcolor='#3A3F4B')
-
-            st.plotly_chart(fig_price, use_container_width=True)
-
-            # 顯示詳細數據
-            st.dataframe(
-                price_analysis.style.format({
-                    '總損益': '${:,.0f}',
-                    '平均損益': '${:,.0f}',
-                    '交易次數': '{:.0f}'
-                }),
-                use_container_width=True
-            )
-
-        with tab3:
-            # 時間分析 - 依開倉時間
-            time_tab1, time_tab2 = st.tabs(["📅 依開倉時間", "📅 依關倉時間"])
-
-            with time_tab1:
-                # 按月份分組 - 開倉
-                trades_df['進場月份'] = trades_df['進場時間'].dt.to_period('M')
-                entry_analysis = trades_df.groupby('進場月份').agg({
-                    '損益': ['sum', 'count']
-                }).reset_index()
-                entry_analysis.columns = ['月份', '總損益', '交易次數']
-                entry_analysis['月份'] = entry_analysis['月份'].astype(str)
-
-                fig_entry = go.Figure()
-
-                # 修正: 根據損益正負賦予顏色 (紅色賺，綠色賠)
-                colors_entry = [COLOR_PROFIT if x > 0 else COLOR_LOSS for x in entry_analysis['總損益']]
-
-                fig_entry.add_trace(
-                    go.Bar(
-                        x=entry_analysis['月份'],
-                        y=entry_analysis['總損益'],
-                        marker=dict(color=colors_entry, line=dict(color='#3A3F4B', width=0.5)),
-                        text=entry_analysis['交易次數'],
-                        texttemplate='%{text}筆',
-                        textposition='outside',
-                        hovertemplate='<b>%{x}</b><br>總損益: $%{y:,.0f}<br>交易次數: %{text}筆<extra></extra>',
-                        name='總損益'
-                    )
-                )
-
-                fig_entry.add_hline(y=0, line_dash="dash", line_color="#6B7280", line_width=1.5)
-
-                fig_entry.update_layout(
-                    title='開倉月份 - 總損益',
-                    height=500,
-                    template='plotly_dark',
-                    paper_bgcolor='#0B0E14',
-                    plot_bgcolor='#1A1D24',
-                    font=dict(color='#E8EAED', size=12),
-                    showlegend=False,
-                    margin=dict(l=20, r=20, t=60, b=20),
-                    xaxis_title='月份',
-                    yaxis_title='總損益 (元)'
-                )
-
-                fig_entry.update_xaxes(showgrid=True, gridcolor='#3A3F4B')
-                fig_entry.update_yaxes(showgrid=True, gridcolor='#3A3F4B')
-
-                st.plotly_chart(fig_entry, use_container_width=True)
-
-                st.dataframe(entry_analysis.style.format({'總損益': '${:,.0f}', '交易次數': '{:.0f}'}),
-                             use_container_width=True)
-
-            with time_tab2:
-                # 按月份分組 - 關倉
-                trades_df['出場月份'] = trades_df['出場時間'].dt.to_period('M')
-                exit_analysis = trades_df.groupby('出場月份').agg({
-                    '損益': ['sum', 'count']
-                }).reset_index()
-                exit_analysis.columns = ['月份', '總損益', '交易次數']
-                exit_analysis['月份'] = exit_analysis['月份'].astype(str)
-
-                fig_exit = go.Figure()
-
-                # 修正: 根據損益正負賦予顏色 (紅色賺，綠色賠)
-                colors_exit = [COLOR_PROFIT if x > 0 else COLOR_LOSS for x in exit_analysis['總損益']]
-
-                fig_exit.add_trace(
-                    go.Bar(
-                        x=exit_analysis['月份'],
-                        y=exit_analysis['總損益'],
-                        marker=dict(color=colors_exit, line=dict(color='#3A3F4B', width=0.5)),
-                        text=exit_analysis['交易次數'],
-                        texttemplate='%{text}筆',
-                        textposition='outside',
-                        hovertemplate='<b>%{x}</b><br>總損益: $%{y:,.0f}<br>交易次數: %{text}筆<extra></extra>',
-                        name='總損益'
-                    )
-                )
-
-                fig_exit.add_hline(y=0, line_dash="dash", line_color="#6B7280", line_width=1.5)
-
-                fig_exit.update_layout(
-                    title='關倉月份 - 總損益',
-                    height=500,
-                    template='plotly_dark',
-                    paper_bgcolor='#0B0E14',
-                    plot_bgcolor='#1A1D24',
-                    font=dict(color='#E8EAED', size=12),
-                    showlegend=False,
-                    margin=dict(l=20, r=20, t=60, b=20),
-                    xaxis_title='月份',
-                    yaxis_title='總損益 (元)'
-                )
-
-                fig_exit.update_xaxes(showgrid=True, gridcolor='#3A3F4B')
-                fig_exit.update_yaxes(showgrid=True, gridcolor='#3A3F4B')
+        # 報酬分佈分析 (只建立目前選取的圖表)
+        distribution_section(analysis_key, analysis)
 
-                st.plotly_chart(fig_exit, use_container_width=True)
+        # 參數掃描
+        sweep_section(df, investment_amount, costs)
 
-                st.dataframe(exit_analysis.style.format({'總損益': '${:,.0f}', '交易次數': '{:.0f}'}),
-                             use_container_width=True)
+        # 成本敏感度：固定目前的投入金額與模式，改變單一成本參數
+        cost_sensitivity_section(df, investment_amount, calc_mode, costs)
 
         # 蒙地卡羅模擬
-        st.markdown("<h2>🎲 蒙地卡羅模擬</h2>", unsafe_allow_html=True)
-
-        # 修正: 將按鈕獨立出來
-        col_btn1, col_btn2, col_btn3 = st.columns([1, 1, 1])
-        with col_btn2:
-            if st.button("🚀 開始模擬", type="primary", use_container_width=True, key="mc_start_button"):
-                # 按鈕被點擊，設置 session state 標記，並儲存模擬次數
-                st.session_state.mc_triggered = True
-                st.session_state.mc_simulations = mc_simulations
-                # 重新執行以觸發下一階段的圖表顯示
-                # 這裡不需要 rerun，因為計算會直接在這裡發生
-                pass  # 讓程式碼繼續向下執行，進入模擬繪圖區塊
-
-        if st.session_state.mc_triggered:
-            # 確保有交易數據才能模擬
-            if len(trades_df) > 0:
-                mc_simulations_count = st.session_state.mc_simulations
-
-                # 模擬計算會在這裡執行，並顯示內部進度條
-                simulation_curves = monte_carlo_simulation(trades_df, mc_simulations_count)
-
-                # 繪製模擬曲線
-                fig_mc = go.Figure()
-
-                # 添加所有模擬曲線
-                for i, curve in enumerate(simulation_curves):
-                    # 降低透明度，讓實際曲線更突出
-                    fig_mc.add_trace(go.Scatter(
-                        x=list(range(len(curve))),
-                        y=curve,
-                        mode='lines',
-                        line=dict(
-                            color=f'rgba({int(COLOR_PRIMARY[1:3], 16)}, {int(COLOR_PRIMARY[3:5], 16)}, {int(COLOR_PRIMARY[5:7], 16)}, 0.08)',
-                            width=1),  # 模擬曲線使用 Primary Blue
-                        showlegend=False,
-                        hoverinfo='skip'
-                    ))
+        monte_carlo_section(analysis_key, trades_df)
 
-                # 添加實際曲線
-                fig_mc.add_trace(go.Scatter(
-                    x=list(range(len(equity_curve))),
-                    y=equity_curve['累積損益'].values,
-                    mode='lines',
-                    name='實際曲線',
-                    line=dict(color=COLOR_PROFIT, width=3),  # 修正: 實際曲線用紅色
-                    hovertemplate='<b>第%{x}筆交易</b><br>累積損益: $%{y:,.0f}<extra></extra>'
-                ))
+        ## RUN 的方法：streamlit run app.py
+        # 1. 確保 app.py 的變更被加入暫存區
+        ##git add app.py
+
+        # 2. 提交變更
+        ##git commit -m "寫出改了什麼"
 
-                # 添加零軸
-                fig_mc.add_hline(y=0, line_dash="dash", line_color="#6B7280", line_width=2)
-
-                # 計算統計數據
-                final_values = [curve[-1] for curve in simulation_curves]
-                loss_prob = (np.array(final_values) < 0).sum() / len(final_values) * 100
-                percentile_5 = np.percentile(final_values, 5)
-                percentile_95 = np.percentile(final_values, 95)
-                median = np.median(final_values)
-
-                fig_mc.update_layout(
-                    title=f'蒙地卡羅模擬 (n={mc_simulations_count}) - 權益曲線',
-                    height=550,
-                    template='plotly_dark',
-                    paper_bgcolor='#0B0E14',
-                    plot_bgcolor='#1A1D24',
-                    font=dict(color='#E8EAED', size=12),
-                    xaxis_title="交易次數",
-                    yaxis_title="累積損益 (元)",
-                    hovermode='closest',
-                    showlegend=True,
-                    margin=dict(l=20, r=20, t=60, b=20)
-                )
-
-                fig_mc.update_xaxes(showgrid=True, gridcolor='#3A3F4B')
-                fig_mc.update_yaxes(showgrid=True, gridcolor='#3A3F4B')
-
-                st.plotly_chart(fig_mc, use_container_width=True)
-
-                # 顯示統計數據
-                st.markdown("### 📊 模擬統計")
-                col_mc1, col_mc2, col_mc3, col_mc4 = st.columns(4)
-
-                with col_mc1:
-                    # 修正: 虧損機率顏色（機率越低越好，但這裡的顏色用於突顯數據）
-                    loss_color = COLOR_LOSS if loss_prob < 10 else COLOR_PROFIT
-                    st.markdown(
-                        f"<p style='color: {loss_color}; font-size: 1.5em; font-weight: 700;'>{loss_prob:.1f}%</p>",
-                        unsafe_allow_html=True)
-                    st.markdown("<p style='color: #9CA3AF; font-size: 0.9em;'>⚠️ 虧損機率</p>", unsafe_allow_html=True)
-
-                with col_mc2:
-                    # 修正: 樂觀情境顏色 (賺錢用紅色)
-                    p95_color = COLOR_PROFIT if percentile_95 > 0 else COLOR_LOSS
-                    st.markdown(
-                        f"<p style='color: {p95_color}; font-size: 1.5em; font-weight: 700;'>${percentile_95:,.0f}</p>",
-                        unsafe_allow_html=True)
-                    st.markdown("<p style='color: #9CA3AF; font-size: 0.9em;'>📈 95% 樂觀情境</p>",
-                                unsafe_allow_html=True)
-
-                with col_mc3:
-                    # 修正: 中位數顏色 (賺錢用紅色)
-                    median_color = COLOR_PROFIT if median > 0 else COLOR_LOSS
-                    st.markdown(
-                        f"<p style='color: {median_color}; font-size: 1.5em; font-weight: 700;'>${median:,.0f}</p>",
-                        unsafe_allow_html=True)
-                    st.markdown("<p style='color: #9CA3AF; font-size: 0.9em;'>⚖️ 模擬中位數</p>",
-                                unsafe_allow_html=True)
-
-                with col_mc4:
-                    # 修正: 最差情境顏色 (賺錢用紅色)
-                    p5_color = COLOR_PROFIT if percentile_5 > 0 else COLOR_LOSS
-                    st.markdown(
-                        f"<p style='color: {p5_color}; font-size: 1.5em; font-weight: 700;'>${percentile_5:,.0f}</p>",
-                        unsafe_allow_html=True)
-                    st.markdown("<p style='color: #9CA3AF; font-size: 0.9em;'>📉 5% 最差情境</p>",
-                                unsafe_allow_html=True)
-
-                    ## RUN 的方法：streamlit run app.py
-                    # 1. 確保 app.py 的變更被加入暫存區
-                    ##git add app.py
-
-                    # 2. 提交變更
-                    ##git commit -m "寫出改了什麼"
-
-                    # 3. 推送到 GitHub
-                    #git push origin main
\ No newline at end of file
+        # 3. 推送到 GitHub
+        #git push origin main
\ No newline at end of file
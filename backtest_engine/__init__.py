@@ -0,0 +1,48 @@
+"""3Q 回測引擎 - 不依賴 Streamlit 的計算模組
+
+app.py (Streamlit 介面) 與 run_batch.py (命令列批次) 都使用這裡的函數。
+耗時的函數都接受 progress_callback(完成數, 總數)，由呼叫端決定如何顯示進度，
+引擎本身不匯入任何 UI 套件。
+"""
+from .analysis import (
+    PRICE_BINS, PRICE_LABELS, analyze_trades, calculate_monthly_analysis, calculate_price_analysis, summarize_trades
+)
+from .costs import COST_DEFAULTS, resolve_costs, tick_size, trade_costs
+from .downsample import CHART_MAX_POINTS, downsample, lttb_indices
+from .equity import calculate_daily_equity, calculate_daily_metrics, read_price_file
+from .ingest import REQUIRED_COLUMNS, iter_report_chunks, read_report
+from .jobs import JOB_STATUSES, Job, JobCancelled, JobRunner
+from .metrics import (
+    METRIC_LABELS, TradeMetrics, calculate_drawdown, calculate_equity_curve, calculate_profit_factor,
+    calculate_sharpe_ratio, compute_trade_metrics, trades_per_year
+)
+from .monte_carlo import (
+    MC_BAND_PERCENTILES, MC_CHUNK_BYTES, MC_METHODS, band_step_limit, empty_summary, monte_carlo_units,
+    percentile_bands, simulate_paths, simulate_summary, simulate_summary_parallel
+)
+from .portfolio import SHORTFALL_MODES, SIZING_MODES, simulate_portfolio
+from .positions import build_position_events, calculate_concurrent_holdings, calculate_max_concurrent_positions
+from .report_cache import load_cached_report, read_report_cached, store_cached_report
+from .streaming import STREAM_MIN_BYTES, stream_trades, stream_trades_file
+from .sweep import SWEEP_MODES, investment_grid, sweep_costs, sweep_parameters
+from .trades import TRADE_INPUT_COLUMNS, calculate_trades, trades_frame
+
+__all__ = [
+    'PRICE_BINS', 'PRICE_LABELS', 'analyze_trades', 'calculate_monthly_analysis', 'calculate_price_analysis',
+    'summarize_trades',
+    'COST_DEFAULTS', 'resolve_costs', 'tick_size', 'trade_costs',
+    'CHART_MAX_POINTS', 'downsample', 'lttb_indices',
+    'calculate_daily_equity', 'calculate_daily_metrics', 'read_price_file',
+    'REQUIRED_COLUMNS', 'iter_report_chunks', 'read_report',
+    'JOB_STATUSES', 'Job', 'JobCancelled', 'JobRunner',
+    'METRIC_LABELS', 'TradeMetrics', 'calculate_drawdown', 'calculate_equity_curve', 'calculate_profit_factor',
+    'calculate_sharpe_ratio', 'compute_trade_metrics', 'trades_per_year',
+    'MC_BAND_PERCENTILES', 'MC_CHUNK_BYTES', 'MC_METHODS', 'band_step_limit', 'empty_summary', 'monte_carlo_units',
+    'percentile_bands', 'simulate_paths', 'simulate_summary', 'simulate_summary_parallel',
+    'SHORTFALL_MODES', 'SIZING_MODES', 'simulate_portfolio',
+    'build_position_events', 'calculate_concurrent_holdings', 'calculate_max_concurrent_positions',
+    'load_cached_report', 'read_report_cached', 'store_cached_report',
+    'STREAM_MIN_BYTES', 'stream_trades', 'stream_trades_file',
+    'SWEEP_MODES', 'investment_grid', 'sweep_costs', 'sweep_parameters',
+    'TRADE_INPUT_COLUMNS', 'calculate_trades', 'trades_frame',
+]
@@ -0,0 +1,95 @@
+"""完整的報表分析流程與分組統計"""
+import pandas as pd
+
+from .equity import calculate_daily_equity
+from .metrics import calculate_drawdown, calculate_equity_curve, compute_trade_metrics
+from .positions import build_position_events, calculate_concurrent_holdings, calculate_max_concurrent_positions
+from .trades import calculate_trades
+
+# 價格區間分析
+PRICE_BINS = [0, 10, 20, 30, 50, 100, 200, float('inf')]
+PRICE_LABELS = ['0-10', '10-20', '20-30', '30-50', '50-100', '100-200', '200+']
+
+
+def calculate_price_analysis(trades_df):
+    """依進場價格區間統計總損益、平均損益與交易次數"""
+    price_band = pd.cut(trades_df['進場價格'], bins=PRICE_BINS, labels=PRICE_LABELS)
+
+    price_analysis = trades_df.groupby(price_band, observed=True).agg({
+        '損益': ['sum', 'mean', 'count']
+    }).reset_index()
+    price_analysis.columns = ['價格區間', '總損益', '平均損益', '交易次數']
+
+    return price_analysis
+
+
+def calculate_monthly_analysis(trades_df, time_col):
+    """依月份 (進場或出場時間) 統計總損益與交易次數"""
+    month = trades_df[time_col].dt.to_period('M')
+
+    monthly_analysis = trades_df.groupby(month).agg({
+        '損益': ['sum', 'count']
+    }).reset_index()
+    monthly_analysis.columns = ['月份', '總損益', '交易次數']
+    monthly_analysis['月份'] = monthly_analysis['月份'].astype(str)
+
+    return monthly_analysis
+
+
+def analyze_trades(df, investment, mode, include_charts=True, costs=None, prices=None):
+    """由報表計算交易與所有指標，回傳 dict
+
+    沒有可執行的交易時只回傳 trades_df。include_charts=False 時略過圖表用的
+    持倉序列、價格區間與月份分析 (批次摘要用不到)。costs 為交易成本設定，
+    指標 (權益曲線、回撤、夏普值...) 一律以淨損益計算。prices 為選用的收盤價寬表
+    (見 equity.read_price_file)，用於逐日市值權益。
+    """
+    return summarize_trades(calculate_trades(df, investment, mode, costs), include_charts, prices=prices)
+
+
+def summarize_trades(trades_df, include_charts=True, capital=None, prices=None):
+    """由交易表 (calculate_trades 或 simulate_portfolio 的結果) 計算所有指標，欄位同 analyze_trades
+
+    逐日市值權益的報酬率以 capital 為資金基準，未指定時使用最大持倉金額。
+    'metrics' 為 compute_trade_metrics 的 TradeMetrics (夏普值、Sortino、Calmar、連勝連敗...)。
+    """
+    if len(trades_df) == 0:
+        return {'trades_df': trades_df}
+
+    equity_curve = calculate_equity_curve(trades_df)
+    dd_df, max_dd, max_dd_pct = calculate_drawdown(equity_curve)
+    position_events = build_position_events(trades_df)
+    max_concurrent, max_concurrent_time, max_positions = calculate_max_concurrent_positions(
+        trades_df, events=position_events)
+    total_pnl = trades_df['損益'].sum()
+    daily_equity = calculate_daily_equity(trades_df, prices)
+    metrics = compute_trade_metrics(trades_df, daily_equity, capital if capital is not None else max_concurrent)
+
+    analysis = {
+        'trades_df': trades_df,
+        'equity_curve': equity_curve,
+        'dd_df': dd_df,
+        'max_dd': max_dd,
+        'max_dd_pct': max_dd_pct,
+        'total_pnl': total_pnl,
+        'total_costs': trades_df['交易成本'].sum(),
+        'total_return': total_pnl / trades_df['投入金額'].sum() * 100,
+        'max_concurrent': max_concurrent,
+        'max_concurrent_time': max_concurrent_time,
+        'max_positions': max_positions,
+        'sharpe': metrics.sharpe,
+        'profit_factor': metrics.profit_factor,
+        'win_rate': metrics.win_rate,
+        'daily_equity': daily_equity,
+        'metrics': metrics,
+    }
+
+    if include_charts:
+        analysis.update({
+            'concurrent_df': calculate_concurrent_holdings(trades_df, events=position_events),
+            'price_analysis': calculate_price_analysis(trades_df),
+            'entry_analysis': calculate_monthly_analysis(trades_df, '進場時間'),
+            'exit_analysis': calculate_monthly_analysis(trades_df, '出場時間'),
+        })
+
+    return analysis
@@ -0,0 +1,268 @@
+"""批次回測命令列工具 (不需要 Streamlit)
+
+將目錄中的每份 XQ 回測報表平行分析，輸出一列一份報表的摘要表 (CSV 或 Parquet)。
+
+使用方式:
+    python run_batch.py 報表目錄 -o summary.csv --investment 100000 --mode 整張計算 --mc-simulations 1000
+    python run_batch.py 報表目錄 -o summary.csv --metrics-only   (超大型報表：串流讀取，只輸出總計類指標)
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .analysis import analyze_trades, summarize_trades
+from .equity import read_price_file
+from .metrics import METRIC_LABELS
+from .ingest import read_report
+from .monte_carlo import monte_carlo_units, simulate_summary
+from .portfolio import simulate_portfolio
+from .streaming import stream_trades_file
+from .trades import TRADE_INPUT_COLUMNS
+
+CALC_MODES = ("整張計算", "股數計算")
+
+
+def analyze_file(path, investment, mode, mc_simulations=0, seed=None, portfolio=None, costs=None, prices=None,
+                 metrics_only=False):
+    """分析單一報表，回傳摘要 dict (一列)；發生錯誤時記錄在 '錯誤' 欄位
+
+    任何錯誤 (讀取、計算、模擬) 都只影響這份報表，不會中止整個批次；錯誤列只保留檔名與錯誤訊息。
+    portfolio 為 simulate_portfolio 的參數 (capital, sizing, on_shortfall)，None 表示不限資金。
+    costs 為交易成本設定 (見 costs.COST_DEFAULTS)，None 表示不計成本。
+    prices 為選用的收盤價寬表 (見 equity.read_price_file)，用於逐日市值權益。
+    metrics_only=True 時以 stream_trades 串流讀取，只輸出總計類指標 (見 analyze_file_streaming)。
+    """
+    if metrics_only:
+        return analyze_file_streaming(path, investment, mode, costs)
+
+    try:
+        return _analyze_report(path, investment, mode, mc_simulations, seed, portfolio, costs, prices)
+    except Exception as e:
+        return {'檔名': Path(path).name, '錯誤': _error_message(e)}
+
+
+def _analyze_report(path, investment, mode, mc_simulations, seed, portfolio, costs, prices):
+    """analyze_file 的計算本體 (錯誤由 analyze_file 記錄)"""
+    row = {'檔名': Path(path).name}
+    with open(path, 'rb') as file:
+        df = read_report(file, columns=TRADE_INPUT_COLUMNS)
+
+    account = None
+    if portfolio is None:
+        analysis = analyze_trades(df, investment, mode, include_charts=False, costs=costs, prices=prices)
+    else:
+        trades_df, account = simulate_portfolio(df, investment=investment, mode=mode, costs=costs, **portfolio)
+        analysis = summarize_trades(trades_df, include_charts=False, capital=portfolio['capital'], prices=prices)
+
+    trades_df = analysis['trades_df']
+    row['交易次數'] = len(trades_df)
+    if len(trades_df) == 0:
+        row['錯誤'] = "沒有可執行的交易"
+        return row
+
+    row.update({METRIC_LABELS[field]: value for field, value in analysis['metrics']._asdict().items()})
+    row.update({
+        '交易成本': analysis['total_costs'],
+        '報酬率%': analysis['total_return'],
+        '最大回撤': analysis['max_dd'],
+        '最大持倉': analysis['max_concurrent'],
+        '最大同時持有': analysis['max_positions'],
+    })
+
+    if account is not None:
+        row.update({
+            '期末權益': account['final_equity'],
+            '帳戶報酬率%': account['account_return'],
+            '資金不足略過': account['n_skipped'],
+        })
+
+    if mc_simulations > 0:
+        summary = simulate_summary(monte_carlo_units(trades_df), mc_simulations, seed)
+        final_pnl = summary['final_pnl']
+        row.update({
+            'MC虧損機率%': (final_pnl < 0).mean() * 100,
+            'MC_P5': np.percentile(final_pnl, 5),
+            'MC中位數': np.median(final_pnl),
+            'MC_P95': np.percentile(final_pnl, 95),
+            'MC_MDD中位數': np.median(summary['max_drawdown']),
+        })
+
+    return row
+
+
+def analyze_file_streaming(path, investment, mode, costs=None):
+    """串流分析單一報表，不保留原始報表與逐筆交易，回傳摘要 dict (一列)
+
+    只能輸出可逐批累計的指標 (交易次數、總損益、報酬率、勝率、期望值、獲利因子、交易成本)；
+    夏普值、MDD 等需要完整權益曲線的欄位留空。
+    """
+    row = {'檔名': Path(path).name}
+
+    try:
+        _, summary = stream_trades_file(path, investment, mode, keep_trades=False, costs=costs)
+    except Exception as e:
+        row['錯誤'] = _error_message(e)
+        return row
+
+    row['交易次數'] = summary['n_trades']
+    if summary['n_trades'] == 0:
+        row['錯誤'] = "沒有可執行的交易"
+        return row
+
+    row.update({
+        METRIC_LABELS['total_pnl']: summary['total_pnl'],
+        METRIC_LABELS['win_rate']: summary['win_rate'],
+        METRIC_LABELS['expectancy']: summary['avg_pnl'],
+        METRIC_LABELS['profit_factor']: summary['profit_factor'],
+        '交易成本': summary['total_costs'],
+        '報酬率%': summary['total_return'],
+    })
+    return row
+
+
+def _error_message(error):
+    """錯誤欄位的訊息：讀取與格式錯誤 (OSError、ValueError) 直接顯示，其他例外加上型別名稱以便除錯"""
+    if isinstance(error, (OSError, ValueError)):
+        return str(error)
+    return f"{type(error).__name__}: {error}"
+
+
+def run_batch(paths, investment, mode, mc_simulations=0, seed=None, n_workers=1, progress_callback=None,
+              portfolio=None, costs=None, prices=None, metrics_only=False):
+    """以多個子程序分析多份報表，回傳依檔名排序的摘要表
+
+    progress_callback(完成數, 總數, 摘要 dict) 在每份報表完成時呼叫。
+    """
+    paths = [str(path) for path in paths]
+    rows = []
+
+    if n_workers <= 1:
+        for path in paths:
+            rows.append(analyze_file(path, investment, mode, mc_simulations, seed, portfolio, costs, prices,
+                                     metrics_only))
+            if progress_callback is not None:
+                progress_callback(len(rows), len(paths), rows[-1])
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = {executor.submit(analyze_file, path, investment, mode, mc_simulations, seed, portfolio, costs,
+                                       prices, metrics_only): path
+                       for path in paths}
+            for future in as_completed(futures):
+                try:
+                    rows.append(future.result())
+                except Exception as e:
+                    # 子程序本身異常結束 (例如記憶體不足被終止) 時，仍記錄為該報表的錯誤
+                    rows.append({'檔名': Path(futures[future]).name, '錯誤': _error_message(e)})
+                if progress_callback is not None:
+                    progress_callback(len(rows), len(paths), rows[-1])
+
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame(rows).sort_values('檔名').reset_index(drop=True)
+
+
+def check_output(output):
+    """在開始分析前確認摘要表寫得出去 (輸出目錄存在、Parquet 有可用的引擎)，否則拋出 ValueError"""
+    output = Path(output)
+    if not output.parent.is_dir():
+        raise ValueError(f"輸出目錄不存在: {output.parent}")
+    if output.suffix.lower() == '.parquet':
+        try:
+            pd.io.parquet.get_engine('auto')
+        except ImportError:
+            raise ValueError("輸出 .parquet 需要 pyarrow (pip install -r requirements.txt)，或改用 .csv")
+
+
+def write_summary(summary, output):
+    """依副檔名寫出摘要表 (.parquet 或 .csv)"""
+    output = Path(output)
+    if output.suffix.lower() == '.parquet':
+        summary.to_parquet(output, index=False)
+    else:
+        # 使用 utf-8-sig 讓 Excel 正確顯示中文
+        summary.to_csv(output, index=False, encoding='utf-8-sig')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="XQ 回測報表批次分析")
+    parser.add_argument('directory', help="報表所在目錄")
+    parser.add_argument('-o', '--output', default='summary.csv', help="摘要輸出檔 (.csv 或 .parquet)")
+    parser.add_argument('--pattern', default='*.csv', help="報表檔名樣式 (預設 *.csv)")
+    parser.add_argument('--investment', type=float, default=100000, help="每筆固定投入金額 (預設 100000)")
+    parser.add_argument('--mode', choices=CALC_MODES, default=CALC_MODES[0], help="計算模式")
+    parser.add_argument('--capital', type=float, default=0,
+                        help="帳戶總資金；大於 0 時依時間順序以帳戶現金下單 (預設 0 表示不限資金)")
+    parser.add_argument('--compound', action='store_true', help="帳戶模式下依已實現權益調整每筆金額 (複利)")
+    parser.add_argument('--scale-on-shortfall', action='store_true', help="帳戶模式下現金不足時縮減部位而非略過")
+    parser.add_argument('--costs', action='store_true', help="計入手續費、證交稅與滑價 (台股預設費率)")
+    parser.add_argument('--commission-discount', type=float, default=None, help="手續費折扣，例如 0.6 (隱含 --costs)")
+    parser.add_argument('--slippage-ticks', type=int, default=None, help="進出場各滑價的檔數 (隱含 --costs)")
+    parser.add_argument('--prices', default=None, help="收盤價檔 (日期, 商品代碼, 收盤價)，用於逐日市值權益")
+    parser.add_argument('--metrics-only', action='store_true',
+                        help="串流讀取超大型報表，只輸出總計類指標 (不可與 --capital、--prices、--mc-simulations 併用)")
+    parser.add_argument('--mc-simulations', type=int, default=0, help="每份報表的蒙地卡羅次數 (0 表示不模擬)")
+    parser.add_argument('--seed', type=int, default=None, help="蒙地卡羅隨機種子")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="平行處理的程序數")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.metrics_only and (args.capital > 0 or args.prices is not None or args.mc_simulations > 0):
+        parser.error("--metrics-only 不保留逐筆交易，不可與 --capital、--prices、--mc-simulations 併用")
+    # 批次 (含蒙地卡羅) 可能執行很久，先確認結果寫得出去，避免跑完才失敗
+    try:
+        check_output(args.output)
+    except ValueError as e:
+        parser.error(str(e))
+
+    paths = sorted(Path(args.directory).glob(args.pattern))
+    if not paths:
+        print(f"找不到符合 {args.pattern} 的報表: {args.directory}", file=sys.stderr)
+        return 1
+
+    def report_progress(done, total, row):
+        status = row.get('錯誤', "完成")
+        print(f"[{done}/{total}] {row['檔名']}: {status}", file=sys.stderr)
+
+    portfolio = None
+    if args.capital > 0:
+        portfolio = {
+            'capital': args.capital,
+            'sizing': 'compound' if args.compound else 'fixed',
+            'on_shortfall': 'scale' if args.scale_on_shortfall else 'skip',
+        }
+
+    costs = None
+    if args.costs or args.commission_discount is not None or args.slippage_ticks is not None:
+        costs = {}
+        if args.commission_discount is not None:
+            costs['commission_discount'] = args.commission_discount
+        if args.slippage_ticks is not None:
+            costs['slippage_ticks'] = args.slippage_ticks
+
+    prices = None
+    if args.prices is not None:
+        try:
+            with open(args.prices, 'rb') as file:
+                prices = read_price_file(file)
+        except (OSError, ValueError) as e:
+            print(f"無法讀取收盤價檔: {e}", file=sys.stderr)
+            return 1
+
+    summary = run_batch(paths, args.investment, args.mode, args.mc_simulations, args.seed,
+                        n_workers=args.workers, progress_callback=report_progress, portfolio=portfolio, costs=costs,
+                        prices=prices, metrics_only=args.metrics_only)
+    write_summary(summary, args.output)
+    print(f"已輸出 {len(summary)} 份報表的摘要: {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
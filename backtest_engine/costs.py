@@ -0,0 +1,73 @@
+"""台股交易成本：券商手續費、證券交易稅與滑價
+
+所有函數都以陣列運算處理整批交易，costs 為設定 dict (缺少的鍵使用 COST_DEFAULTS)。
+"""
+import numpy as np
+
+COST_DEFAULTS = {
+    'commission_rate': 0.001425,  # 手續費率 (買賣各收一次)
+    'commission_discount': 1.0,  # 券商折扣，0.6 表示 6 折
+    'min_commission': 20,  # 每筆最低手續費 (元)
+    'tax_rate': 0.003,  # 證券交易稅 (賣出時收取)
+    'day_trade_tax_rate': 0.0015,  # 現股當沖的證交稅率
+    'slippage_ticks': 0,  # 每次成交的滑價檔數
+}
+
+# 證交所股票升降單位：價格下限與對應的跳動單位
+TICK_PRICE_FLOORS = np.array([0, 10, 50, 100, 500, 1000], dtype=float)
+TICK_SIZES = np.array([0.01, 0.05, 0.1, 0.5, 1, 5])
+
+
+def resolve_costs(costs):
+    """補齊成本設定的預設值；costs 為 None 時回傳 None (不計成本)"""
+    if costs is None:
+        return None
+    unknown = set(costs) - set(COST_DEFAULTS)
+    if unknown:
+        raise ValueError(f"未知的成本設定: {', '.join(sorted(unknown))}")
+    return {**COST_DEFAULTS, **costs}
+
+
+def tick_size(price):
+    """依證交所升降單位級距回傳每檔跳動金額"""
+    idx = np.searchsorted(TICK_PRICE_FLOORS, price, side='right') - 1
+    return TICK_SIZES[np.clip(idx, 0, len(TICK_SIZES) - 1)]
+
+
+def fill_prices(entry_price, exit_price, costs):
+    """套用滑價後的實際成交價 (買進往上、賣出往下各滑 slippage_ticks 檔，跳動單位依原價格的級距)"""
+    ticks = costs['slippage_ticks']
+    if ticks == 0:
+        return entry_price, exit_price
+    buy_price = entry_price + ticks * tick_size(entry_price)
+    sell_price = np.maximum(exit_price - ticks * tick_size(exit_price), 0.0)
+    return buy_price, sell_price
+
+
+def commission(amount, costs):
+    """單邊手續費：成交金額 × 費率 × 折扣，無條件捨去至元，不足最低手續費以最低計"""
+    fee = np.floor(amount * costs['commission_rate'] * costs['commission_discount'])
+    return np.where(amount > 0, np.maximum(fee, costs['min_commission']), 0.0)
+
+
+def transaction_tax(amount, day_trade, costs):
+    """賣出的證券交易稅，當日進出的交易適用當沖稅率，無條件捨去至元"""
+    rate = np.where(day_trade, costs['day_trade_tax_rate'], costs['tax_rate'])
+    return np.floor(amount * rate)
+
+
+def trade_costs(entry_price, exit_price, shares, day_trade, costs):
+    """計算每筆交易的成交價與費用，回傳 (買進成交價, 賣出成交價, 手續費+稅)"""
+    buy_price, sell_price = fill_prices(entry_price, exit_price, costs)
+    buy_amount = shares * buy_price
+    sell_amount = shares * sell_price
+    fees = commission(buy_amount, costs) + commission(sell_amount, costs) + \
+        transaction_tax(sell_amount, day_trade, costs)
+    return buy_price, sell_price, fees
+
+
+def is_day_trade(entry_times, exit_times):
+    """進出場在同一個日曆日的交易"""
+    entry_days = np.asarray(entry_times, dtype='datetime64[ns]').astype('datetime64[D]')
+    exit_days = np.asarray(exit_times, dtype='datetime64[ns]').astype('datetime64[D]')
+    return entry_days == exit_days
@@ -0,0 +1,60 @@
+"""圖表降採樣：Largest-Triangle-Three-Buckets (LTTB)
+
+長序列 (逐筆權益、回撤、日內持倉) 直接送到瀏覽器會產生數十 MB 的 JSON；
+LTTB 在每個區間保留與前後點構成最大三角形的點，保留曲線的峰谷形狀。
+"""
+import numpy as np
+
+CHART_MAX_POINTS = 2000  # 預設每條曲線最多送出的點數 (約為圖表寬度像素的兩倍)
+
+
+def lttb_indices(x, y, n_out=CHART_MAX_POINTS):
+    """回傳 LTTB 選出的索引 (遞增，包含第一點與最後一點)
+
+    x 可為數值或 datetime64 陣列 (須已排序)；資料點數不超過 n_out 時回傳全部索引。
+    迴圈只跑 n_out 個區間，區間內以向量運算計算三角形面積。
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    x = _as_float(x)
+    y = np.asarray(y, dtype=float)
+
+    # 第一點與最後一點固定保留，其餘平均分成 n_out - 2 個區間
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    # 每個區間的平均點 (作為下一個區間的三角形頂點)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    avg_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    avg_x = np.append(avg_x, x[-1])
+    avg_y = np.append(avg_y, y[-1])
+
+    prev = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_x, next_y = avg_x[bucket + 1], avg_y[bucket + 1]
+        area = np.abs((x[prev] - next_x) * (y[start:end] - y[prev]) - (x[prev] - x[start:end]) * (next_y - y[prev]))
+        prev = start + int(np.argmax(area))
+        selected[bucket + 1] = prev
+
+    return selected
+
+
+def downsample(df, x_column, y_column, n_out=CHART_MAX_POINTS):
+    """以 LTTB 降採樣 DataFrame 的一條曲線，回傳選出的列 (其他欄位一併保留)"""
+    if len(df) <= n_out:
+        return df
+    return df.iloc[lttb_indices(df[x_column].to_numpy(), df[y_column].to_numpy(), n_out)]
+
+
+def _as_float(x):
+    """將時間或數值陣列轉為 float64 (時間以 ns 計)"""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').view(np.int64).astype(float)
+    return x.astype(float)
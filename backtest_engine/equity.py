@@ -0,0 +1,163 @@
+"""逐日市值權益：持有期間的未實現損益也計入權益曲線
+
+calculate_equity_curve 只在出場時認列損益；這裡把每筆交易的損益攤到持有期間的每一天，
+以差分陣列 (scatter-add) 一次累加所有交易，再由逐日權益計算日報酬的夏普值、Sortino 與 MDD。
+"""
+import io
+
+import numpy as np
+import pandas as pd
+
+from .ingest import SNIFF_BYTES, detect_encoding
+from .positions import _period_index
+
+PRICE_FILE_COLUMNS = ['日期', '商品代碼', '收盤價']
+PERIODS_PER_YEAR = {'B': 252, 'D': 365, 'W': 52}  # 各頻率的年化期數 ('B' 為營業日)
+MTM_CHUNK_ELEMENTS = 4_000_000  # 收盤價市值計算每批展開的 (交易 × 持有日) 元素上限
+
+
+def read_price_file(file):
+    """讀取收盤價檔 (欄位: 日期, 商品代碼, 收盤價)，回傳以日期為索引、商品代碼為欄位的寬表
+
+    file 為二進位檔案物件，編碼判斷方式與回測報表相同。格式錯誤時拋出 ValueError。
+    """
+    prefix = file.read(SNIFF_BYTES)
+    file.seek(0)
+    encoding = detect_encoding(prefix)
+    if encoding is None:
+        raise ValueError("無法判斷收盤價檔的編碼")
+
+    prices = pd.read_csv(io.TextIOWrapper(file, encoding=encoding), dtype={'商品代碼': str})
+    missing = [column for column in PRICE_FILE_COLUMNS if column not in prices.columns]
+    if missing:
+        raise ValueError(f"收盤價檔缺少必要欄位: {', '.join(missing)}")
+
+    prices['日期'] = pd.to_datetime(prices['日期'], format='mixed').dt.normalize()
+    prices['收盤價'] = pd.to_numeric(prices['收盤價'], errors='coerce')
+
+    return prices.pivot_table(index='日期', columns='商品代碼', values='收盤價', aggfunc='last').sort_index()
+
+
+def calculate_daily_equity(trades_df, prices=None, freq='B'):
+    """計算逐日 (或逐週) 的市值權益，回傳 DataFrame (日期, 累積損益, 已實現損益)
+
+    有 prices (read_price_file 的寬表) 且有該商品收盤價的交易，持有期間以收盤價計算未實現損益
+    (股數 × (收盤價 - 進場價格))；其餘交易在進出場價格間線性內插。出場當期一律認列淨損益。
+    freq 可為 'B' (營業日)、'D' (日曆日) 或 'W' (週)。複雜度 O(交易數 + 期數 + 收盤價持有日數)。
+    """
+    if freq not in PERIODS_PER_YEAR:
+        raise ValueError(f"不支援的頻率: {freq}")
+    if len(trades_df) == 0:
+        return pd.DataFrame()
+
+    entry_times = trades_df['進場時間'].to_numpy(dtype='datetime64[ns]')
+    exit_times = trades_df['出場時間'].to_numpy(dtype='datetime64[ns]')
+    valid = ~np.isnat(entry_times) & ~np.isnat(exit_times) & (exit_times >= entry_times)
+    if not valid.any():
+        return pd.DataFrame()
+
+    n_valid = int(valid.sum())
+    period_idx, labels = _equity_period_index(np.concatenate([entry_times[valid], exit_times[valid]]), freq)
+    start, end = period_idx[:n_valid], period_idx[n_valid:]
+    pnl = trades_df['損益'].to_numpy(dtype=float)[valid]
+    n_periods = len(labels)
+
+    # 已實現損益：出場當期一次認列
+    realized = np.cumsum(np.bincount(end, weights=pnl, minlength=n_periods))
+
+    marked = np.zeros(len(pnl), dtype=bool)
+    open_value = np.zeros(n_periods)
+    if prices is not None and len(prices.columns) > 0:
+        codes = trades_df['商品代碼'].astype(str).to_numpy()[valid]
+        code_idx = pd.Index(prices.columns).get_indexer(codes)
+        marked = (code_idx >= 0) & (end > start)
+        if marked.any():
+            close = prices.reindex(labels, method='ffill').to_numpy(dtype=float)
+            open_value = _open_position_value(
+                close, code_idx[marked], start[marked], end[marked],
+                trades_df['股數'].to_numpy(dtype=float)[valid][marked],
+                trades_df['進場價格'].to_numpy(dtype=float)[valid][marked], n_periods)
+
+    # 其餘交易：損益在持有期間線性累積，以二階差分在進場與出場處改變斜率
+    ramp = ~marked & (end > start)
+    slope = pnl[ramp] / (end[ramp] - start[ramp])
+    second_diff = np.bincount(start[ramp] + 1, weights=slope, minlength=n_periods + 1)
+    second_diff -= np.bincount(end[ramp] + 1, weights=slope, minlength=n_periods + 1)
+    interpolated = np.cumsum(np.cumsum(second_diff[:n_periods]))
+
+    # 線性內插的交易在出場後由內插值延續；已實現損益中扣除以免重複計算
+    ramp_realized = np.cumsum(np.bincount(end[ramp], weights=pnl[ramp], minlength=n_periods))
+    equity = realized - ramp_realized + interpolated + open_value
+
+    return pd.DataFrame({'日期': labels, '累積損益': equity, '已實現損益': realized})
+
+
+def _equity_period_index(times, freq):
+    """期間序號與各期間起點；營業日以 numpy 營業日曆計算 (週末歸入下一個營業日)"""
+    if freq != 'B':
+        return _period_index(times, freq)
+
+    days = times.astype('datetime64[D]')
+    origin = np.busday_offset(days.min(), 0, roll='forward')
+    period_idx = np.busday_count(origin, days)
+    labels = np.busday_offset(origin, np.arange(int(period_idx.max()) + 1), roll='forward')
+    return period_idx, pd.DatetimeIndex(labels.astype('datetime64[ns]'))
+
+
+def _open_position_value(close, code_idx, start, end, shares, entry_price, n_periods):
+    """持有期間 (進場當期到出場前一期) 以收盤價計算的未實現損益，依期間加總
+
+    將每筆交易展開為持有期數個元素後以 bincount 累加；為控制記憶體，依元素數分批展開。
+    缺少收盤價的期間以進場價格計 (未實現損益為 0)。
+    """
+    lengths = end - start
+    value = np.zeros(n_periods)
+    split_points = np.arange(MTM_CHUNK_ELEMENTS, lengths.sum(), MTM_CHUNK_ELEMENTS)
+    boundaries = np.searchsorted(np.cumsum(lengths), split_points)
+
+    for chunk in np.split(np.arange(len(lengths)), boundaries):
+        if len(chunk) == 0:
+            continue
+        chunk_lengths = lengths[chunk]
+        trade = np.repeat(chunk, chunk_lengths)
+        offset = np.arange(len(trade)) - np.repeat(np.cumsum(chunk_lengths) - chunk_lengths, chunk_lengths)
+        period = start[trade] + offset
+
+        price = close[period, code_idx[trade]]
+        price = np.where(np.isnan(price), entry_price[trade], price)
+        value += np.bincount(period, weights=shares[trade] * (price - entry_price[trade]), minlength=n_periods)
+
+    return value
+
+
+def calculate_daily_metrics(daily_equity, capital, freq='B'):
+    """由逐日權益計算日報酬的夏普值、Sortino 與 MDD，回傳 dict
+
+    capital 為計算報酬率的資金基準 (帳戶資金或最大持倉)；日報酬 = 當期損益變動 / 前一期權益。
+    MDD 以期初 (累積損益 0) 為第一個高點。
+    """
+    metrics = {'sharpe': 0.0, 'sortino': 0.0, 'max_dd': 0.0, 'max_dd_pct': 0.0}
+    if len(daily_equity) == 0 or capital <= 0:
+        return metrics
+
+    cumulative = daily_equity['累積損益'].to_numpy(dtype=float)
+    equity = capital + cumulative
+    previous = np.concatenate([[capital], equity[:-1]])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.where(previous > 0, (equity - previous) / previous, 0.0)
+
+    annualize = np.sqrt(PERIODS_PER_YEAR[freq])
+    if len(returns) >= 2:
+        std = np.std(returns, ddof=1)
+        downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+        if std > 0:
+            metrics['sharpe'] = float(np.mean(returns) / std * annualize)
+        if downside > 0:
+            metrics['sortino'] = float(np.mean(returns) / downside * annualize)
+
+    peak = np.maximum.accumulate(np.maximum(cumulative, 0))
+    drawdown = cumulative - peak
+    metrics['max_dd'] = float(drawdown.min())
+    metrics['max_dd_pct'] = float((drawdown / (capital + peak)).min() * 100)
+
+    return metrics
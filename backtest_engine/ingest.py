@@ -0,0 +1,188 @@
+"""XQ「選股中心」回測報表的讀取
+
+先從檔案開頭判斷編碼，再以必要欄位與宣告的欄位型別 (schema) 一次解析完成。
+"""
+import codecs
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+REQUIRED_COLUMNS = ['商品名稱', '商品代碼', '序號', '進場時間', '進場方向',
+                    '進場價格', '出場時間', '出場方向', '出場價格']
+# 報表欄位型別：文字欄位重複值多，使用 category；
+# 價格維持 float64，整張計算的股數換算需要精確的小數價格
+COLUMN_DTYPES = {
+    '商品名稱': 'category',
+    '商品代碼': 'category',
+    '序號': np.int32,
+    '進場方向': 'category',
+    '出場方向': 'category',
+    '進場價格': np.float64,
+    '出場價格': np.float64,
+}
+CATEGORY_COLUMNS = [col for col, dtype in COLUMN_DTYPES.items() if dtype == 'category']
+DATETIME_COLUMNS = ['進場時間', '出場時間']
+# XQ 匯出的日期時間格式，依序嘗試；都不符合時才逐筆推斷
+DATETIME_FORMATS = ('%Y/%m/%d %H:%M', '%Y/%m/%d %H:%M:%S', '%Y/%m/%d',
+                    '%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%Y%m%d')
+# gb18030 涵蓋 GBK 與繁體字 (gb2312 無法表示「稱」等必要欄位名稱)
+CANDIDATE_ENCODINGS = ('utf-8', 'cp950', 'big5', 'gb18030')
+SNIFF_BYTES = 64 * 1024  # 判斷編碼時讀取的檔案開頭長度
+CSV_CHUNK_ROWS = 100000  # 每批解析的列數 (用於回報進度)
+
+
+def detect_encoding(prefix):
+    """依 BOM 或試解碼檔案開頭判斷編碼，無法判斷時回傳 None"""
+    encodings = decodable_encodings(prefix)
+    return encodings[0] if encodings else None
+
+
+def decodable_encodings(prefix):
+    """可解碼檔案開頭的編碼 (有 BOM 時只有對應的編碼，否則依 CANDIDATE_ENCODINGS 的順序)"""
+    if prefix.startswith(codecs.BOM_UTF8):
+        return ['utf-8-sig']
+    if prefix.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return ['utf-16']
+
+    encodings = []
+    for encoding in CANDIDATE_ENCODINGS:
+        try:
+            # 以增量解碼器處理，避免開頭截斷在多位元組字元中間而誤判
+            codecs.getincrementaldecoder(encoding)().decode(prefix, final=False)
+            encodings.append(encoding)
+        except UnicodeDecodeError:
+            continue
+
+    return encodings
+
+
+def read_report(file, columns=REQUIRED_COLUMNS, progress_callback=None):
+    """讀取回測報表 CSV，回傳只含 columns 欄位的 DataFrame
+
+    file 為二進位檔案物件 (例如 Streamlit 的 UploadedFile)。
+    columns 須為 REQUIRED_COLUMNS 的子集，可只保留後續計算需要的欄位以節省記憶體。
+    progress_callback(已讀取位元組, 檔案大小) 在每批解析完成時呼叫。
+    格式錯誤時拋出 ValueError。
+    """
+    encoding, file_size = _open_report(file)
+
+    # 若試解碼判斷錯誤 (檔案後段出現無法解碼的字元)，才改用其他候選編碼
+    fallbacks = [enc for enc in CANDIDATE_ENCODINGS if enc != encoding]
+    for encoding in [encoding] + fallbacks:
+        try:
+            chunks = list(_raw_chunks(file, encoding, file_size, columns, CSV_CHUNK_ROWS, progress_callback))
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise ValueError("無法解碼檔案內容，請確認檔案編碼")
+
+    # 只有標題列的檔案仍會解析出一批 0 列的資料
+    if sum(len(chunk) for chunk in chunks) == 0:
+        raise ValueError("報表中沒有任何交易資料")
+
+    df = concat_chunks(chunks)
+    for col in DATETIME_COLUMNS:
+        if col in df:
+            df[col] = parse_datetime_column(df[col], col)
+
+    return df
+
+
+def iter_report_chunks(file, columns=REQUIRED_COLUMNS, chunk_rows=CSV_CHUNK_ROWS, progress_callback=None):
+    """逐批讀取回測報表，每批已轉換型別與日期時間 (供串流處理使用，不保留整份報表)
+
+    串流模式無法回頭重讀，僅使用從檔案開頭判斷出的編碼。
+    """
+    encoding, file_size = _open_report(file)
+
+    try:
+        for chunk in _raw_chunks(file, encoding, file_size, columns, chunk_rows, progress_callback):
+            for col in DATETIME_COLUMNS:
+                if col in chunk:
+                    chunk[col] = parse_datetime_column(chunk[col], col)
+            yield chunk
+    except UnicodeDecodeError:
+        raise ValueError(f"檔案內容無法以 {encoding} 解碼，請確認檔案編碼")
+
+
+def concat_chunks(chunks):
+    """合併分批讀取的 DataFrame，category 欄位先合併分類，避免退化為 object"""
+    category_columns = [col for col in chunks[0].columns if isinstance(chunks[0][col].dtype, pd.CategoricalDtype)]
+    categories = {col: union_categoricals([chunk[col] for chunk in chunks], sort_categories=True)
+                  for col in category_columns}
+
+    df = pd.concat([chunk.drop(columns=category_columns) for chunk in chunks], ignore_index=True)
+    for col, values in categories.items():
+        df[col] = values
+
+    return df[chunks[0].columns]
+
+
+def _open_report(file):
+    """判斷編碼並檢查標題列，回傳 (編碼, 檔案大小)
+
+    依序嘗試可解碼檔案開頭的編碼，取第一個解出全部必要欄位的編碼
+    (例如 GBK 檔案可能也能以 cp950 解碼，但欄位名稱會是亂碼)。
+    """
+    file.seek(0, 2)
+    file_size = file.tell()
+    file.seek(0)
+    prefix = file.read(SNIFF_BYTES)
+
+    encodings = decodable_encodings(prefix)
+    if not encodings:
+        raise ValueError("無法判斷檔案編碼，請確認檔案格式是否正確")
+
+    first_missing = None
+    for encoding in encodings:
+        # 先只讀標題列檢查欄位
+        file.seek(0)
+        try:
+            header = pd.read_csv(file, encoding=encoding, nrows=0).columns
+        except UnicodeDecodeError:
+            continue
+        missing = [col for col in REQUIRED_COLUMNS if col not in header]
+        if not missing:
+            return encoding, file_size
+        if first_missing is None:
+            first_missing = missing
+
+    if first_missing is None:
+        raise ValueError("無法判斷檔案編碼，請確認檔案格式是否正確")
+    raise ValueError(f"缺少必要欄位: {', '.join(first_missing)}")
+
+
+def parse_datetime_column(values, column):
+    """以宣告的固定格式解析日期時間欄位，皆不符合時退回逐筆推斷"""
+    for fmt in DATETIME_FORMATS:
+        try:
+            return pd.to_datetime(values, format=fmt)
+        except (ValueError, TypeError):
+            continue
+
+    try:
+        return pd.to_datetime(values, format='mixed')
+    except (ValueError, TypeError):
+        raise ValueError(f"「{column}」欄位的日期時間格式無法辨識")
+
+
+def _raw_chunks(file, encoding, file_size, columns, chunk_rows, progress_callback):
+    """以指定編碼分批解析 (日期時間尚未轉換)，依實際讀取的位元組數回報進度"""
+    file.seek(0)
+    reader = pd.read_csv(file, encoding=encoding, usecols=list(columns),
+                         dtype={col: COLUMN_DTYPES[col] for col in columns if col in COLUMN_DTYPES},
+                         chunksize=chunk_rows)
+
+    try:
+        with reader:
+            for chunk in reader:
+                if progress_callback is not None:
+                    progress_callback(min(file.tell(), file_size), file_size)
+                # usecols 不保證欄位順序，依指定的欄位順序排列
+                yield chunk[list(columns)]
+    except UnicodeDecodeError:
+        raise
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"欄位內容與格式不符 (價格需為數字、序號需為整數): {e}")
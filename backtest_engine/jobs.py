@@ -0,0 +1,152 @@
+"""背景工作：在執行緒池中執行耗時的計算，提供進度查詢、取消與結果交接
+
+呼叫端 (Streamlit 腳本) 只負責送出工作與輪詢狀態，不必在腳本執行緒中等待計算完成。
+工作函數須接受 progress_callback(完成數, 總數)；取消是協作式的：要求取消後，
+下一次回報進度時拋出 JobCancelled 中止計算 (因此取消的粒度為一批)。
+完成的結果以 JobRunner.take 交給呼叫端保存 (例如 session_state)，執行器本身只保留狀態與進度。
+"""
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+JOB_WORKERS = 2  # 同時執行的背景工作數
+JOB_HISTORY = 8  # 保留狀態的失敗與取消工作數 (超過時移除最舊的；結果已取出的工作直接移除)
+JOB_RESULT_TTL = 30 * 60  # 完成但未取出的結果最多保留的秒數 (例如送出工作的 session 已關閉)
+JOB_STATUSES = ('running', 'done', 'failed', 'cancelled')
+
+
+class JobCancelled(Exception):
+    """工作已被要求取消 (由 progress_callback 拋出以中止計算)"""
+
+
+class Job:
+    """單一背景工作的狀態；status 為 JOB_STATUSES 之一"""
+
+    def __init__(self, key):
+        self.key = key
+        self.done = 0
+        self.total = 0
+        self.future = None
+        self._result = None
+        self.finished_at = None  # 工作函數結束的時間 (time.monotonic)
+        self._cancel_event = threading.Event()
+
+    def progress_callback(self, done, total):
+        """傳給工作函數的進度回報；已要求取消時拋出 JobCancelled"""
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+        self.done, self.total = done, total
+
+    def cancel(self):
+        """要求取消：尚未開始的工作直接取消，執行中的工作在下一次回報進度時中止"""
+        self._cancel_event.set()
+        self.future.cancel()
+
+    @property
+    def status(self):
+        if not self.future.done():
+            return 'running'
+        if self.future.cancelled() or isinstance(self.future.exception(), JobCancelled):
+            return 'cancelled'
+        return 'failed' if self.future.exception() is not None else 'done'
+
+    @property
+    def progress(self):
+        """完成比例 (0 ~ 1)"""
+        return self.done / self.total if self.total else 0.0
+
+    def result(self):
+        """工作的回傳值 (失敗時拋出工作中的例外，取消時拋出 CancelledError)"""
+        if self.status == 'cancelled':
+            raise CancelledError()
+        self.future.result()
+        return self._result
+
+    def exception(self):
+        """工作失敗的例外 (未失敗時為 None)"""
+        return self.future.exception() if self.status == 'failed' else None
+
+
+class JobRunner:
+    """以 key 識別的背景工作執行器，執行緒安全，可在多個 session 之間共用
+
+    相同 key 的工作只會執行一次：工作執行中或已結束 (含失敗與取消) 時 submit 直接回傳原本的工作，
+    要重新執行須先 discard。完成的結果以 take 取出後工作即移除；未取出的結果保留到 result_ttl 秒後，
+    不會因其他 session 送出工作而被提早移除。失敗或取消的工作只保留狀態，最多 max_history 個。
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, max_history=JOB_HISTORY, result_ttl=JOB_RESULT_TTL):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='3q-job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_history = max_history
+        self._result_ttl = result_ttl
+
+    def submit(self, key, fn, *args, **kwargs):
+        """送出工作 fn(*args, progress_callback=..., **kwargs)，回傳 Job"""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                self._jobs.move_to_end(key)
+                return job
+
+            job = Job(key)
+            job.future = self._executor.submit(_run, job, fn, args, kwargs)
+            self._jobs[key] = job
+            self._prune()
+            return job
+
+    def get(self, key):
+        """取得 key 對應的工作 (不存在時為 None)"""
+        with self._lock:
+            return self._jobs.get(key)
+
+    def take(self, key):
+        """取出已完成工作的結果並移除工作，之後結果只由呼叫端保存 (工作須為 'done' 狀態)
+
+        工作不存在 (已被 discard 或逾期移除) 時回傳 None，呼叫端應重新送出工作。
+        """
+        with self._lock:
+            job = self._jobs.pop(key, None)
+        return job.result() if job is not None else None
+
+    def cancel(self, key):
+        """要求取消 key 對應的工作"""
+        job = self.get(key)
+        if job is not None:
+            job.cancel()
+
+    def discard(self, key):
+        """移除 key 對應的工作 (執行中的工作會先要求取消)，之後 submit 相同的 key 會重新執行"""
+        with self._lock:
+            job = self._jobs.pop(key, None)
+        if job is not None and job.status == 'running':
+            job.cancel()
+
+    def _prune(self):
+        """移除逾期未取出的結果，以及超過保留數量的最舊失敗或取消工作 (執行中的工作不移除)"""
+        now = time.monotonic()
+        expired = [key for key, job in self._jobs.items()
+                   if job.status == 'done' and now - job.finished_at > self._result_ttl]
+        for key in expired:
+            del self._jobs[key]
+
+        finished = [key for key, job in self._jobs.items() if job.future.done() and job.status != 'done']
+        for key in finished[:max(0, len(finished) - self._max_history)]:
+            del self._jobs[key]
+
+
+def _run(job, fn, args, kwargs):
+    """在工作執行緒中執行 fn，結果存在 Job 上 (可由 take 釋放)
+
+    失敗時清除 traceback 各層的區域變數，保留的例外不會連帶留住報表等大型資料。
+    """
+    try:
+        job._result = fn(*args, progress_callback=job.progress_callback, **kwargs)
+    except BaseException as e:
+        traceback.clear_frames(e.__traceback__)
+        raise
+    finally:
+        job.finished_at = time.monotonic()
@@ -0,0 +1,221 @@
+"""績效指標：權益曲線、回撤、夏普值、獲利因子，以及一次算出所有指標的 compute_trade_metrics"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from .equity import calculate_daily_metrics
+from .monte_carlo import longest_run
+
+DAYS_PER_YEAR = 365.25
+
+
+class TradeMetrics(NamedTuple):
+    """compute_trade_metrics 的結果 (UI、命令列與報表共用)"""
+    n_trades: int
+    total_pnl: float
+    win_rate: float  # 勝率 (%)
+    expectancy: float  # 每筆期望值 (平均淨損益)
+    avg_win: float
+    avg_loss: float
+    payoff_ratio: float  # 賺賠比 = 平均獲利 / |平均虧損|
+    profit_factor: float
+    trades_per_year: float
+    sharpe: float  # 每筆報酬率依實際交易頻率年化
+    daily_sharpe: float  # 逐日市值權益的日報酬年化
+    sortino: float  # 逐日市值權益的日報酬，只計下跌波動
+    max_dd: float  # 逐日市值權益的 MDD (元)
+    max_dd_pct: float  # 逐日 MDD 相對資金基準 + 權益高點 (%)
+    annual_return: float  # 以資金基準計算的年化報酬率 (%)
+    calmar: float  # 年化報酬率 / |逐日 MDD %|
+    ulcer_index: float  # 回撤百分比的均方根 (%)
+    max_consecutive_wins: int
+    max_consecutive_losses: int
+    avg_holding_days: float
+
+
+# 指標的中文名稱 (命令列摘要欄位、報表表頭)
+METRIC_LABELS = {
+    'n_trades': '交易次數',
+    'total_pnl': '總損益',
+    'win_rate': '勝率%',
+    'expectancy': '期望值',
+    'avg_win': '平均獲利',
+    'avg_loss': '平均虧損',
+    'payoff_ratio': '賺賠比',
+    'profit_factor': '獲利因子',
+    'trades_per_year': '年交易次數',
+    'sharpe': '夏普值',
+    'daily_sharpe': '日夏普值',
+    'sortino': 'Sortino',
+    'max_dd': '逐日MDD',
+    'max_dd_pct': '逐日MDD%',
+    'annual_return': '年化報酬%',
+    'calmar': 'Calmar',
+    'ulcer_index': 'Ulcer指數',
+    'max_consecutive_wins': '最大連勝',
+    'max_consecutive_losses': '最大連敗',
+    'avg_holding_days': '平均持有天數',
+}
+
+
+def calculate_equity_curve(trades_df):
+    """計算權益曲線，標記創新高點"""
+    if len(trades_df) == 0:
+        return pd.DataFrame()
+
+    # 穩定排序：出場時間相同的交易依報表順序累積 (與參數掃描、蒙地卡羅相同)
+    trades_df = trades_df.sort_values('出場時間', kind='stable').reset_index(drop=True)
+    trades_df['累積損益'] = trades_df['損益'].cumsum()
+
+    # 標記創新高點
+    cumulative = trades_df['累積損益'].values
+    running_max = np.maximum.accumulate(cumulative)
+    trades_df['New_High'] = (cumulative == running_max) & (
+                cumulative > trades_df['累積損益'].shift(1).fillna(-np.inf).values)
+    trades_df.loc[0, 'New_High'] = True  # 第一筆交易一定是新高 (相對初始資金0)
+
+    return trades_df
+
+
+def calculate_drawdown(equity_curve):
+    """計算MDD並標記創新低點"""
+    if len(equity_curve) == 0:
+        return pd.DataFrame(), 0, 0
+
+    cumulative = equity_curve['累積損益'].values
+    running_max = np.maximum.accumulate(cumulative)
+    drawdown = cumulative - running_max
+
+    # 標記回撤創新低點 (即最大回撤)
+    running_min_dd = np.minimum.accumulate(drawdown)
+    equity_curve['New_Drawdown'] = (drawdown == running_min_dd)
+
+    max_dd = drawdown.min()
+
+    # 計算百分比回撤 - 基於初始資金而非最高點 (暫時保留，但不使用)
+    initial_capital = 0  # 從0開始
+    drawdown_pct = drawdown / (running_max - initial_capital + 1e-10)
+
+    max_dd_pct = drawdown_pct.min()  # 最大的百分比回撤
+
+    dd_df = pd.DataFrame({
+        '時間': equity_curve['出場時間'],
+        '回撤金額': drawdown,
+        '回撤%': drawdown_pct * 100,
+        'New_Drawdown': equity_curve['New_Drawdown']
+    })
+
+    return dd_df, max_dd, max_dd_pct
+
+
+def calculate_sharpe_ratio(trades_df):
+    """計算夏普值：每筆報酬率的平均 / 標準差，依實際交易頻率 (每年交易次數) 年化"""
+    if len(trades_df) < 2:
+        return 0
+    return _trade_sharpe(trades_df['報酬率'].to_numpy(dtype=float),
+                         trades_per_year(trades_df['進場時間'], trades_df['出場時間']))
+
+
+def calculate_profit_factor(trades_df):
+    """計算獲利因子"""
+    return _profit_factor(trades_df['損益'].to_numpy(dtype=float))
+
+
+def trades_per_year(entry_times, exit_times):
+    """每年交易次數 = 交易數 / 第一筆進場到最後一筆出場的年數 (至少以 1 天計)"""
+    if len(entry_times) == 0:
+        return 0.0
+    span = (np.max(exit_times) - np.min(entry_times)) / pd.Timedelta(days=1)
+    return len(entry_times) / (max(span, 1.0) / DAYS_PER_YEAR)
+
+
+def compute_trade_metrics(trades_df, daily_equity=None, capital=0):
+    """由交易表一次算出所有績效指標，回傳 TradeMetrics
+
+    交易依出場時間排序一次，逐筆指標 (期望值、賺賠比、連勝連敗...) 都由同一組陣列計算；
+    日報酬指標、MDD、Calmar 與 Ulcer 指數使用 daily_equity (calculate_daily_equity 的結果)，
+    報酬率以 capital 為資金基準。沒有逐日權益或資金基準時這些指標為 0。
+    """
+    n_trades = len(trades_df)
+    if n_trades == 0:
+        return TradeMetrics(**dict.fromkeys(TradeMetrics._fields, 0))
+
+    order = np.argsort(trades_df['出場時間'].to_numpy(), kind='stable')
+    pnl = trades_df['損益'].to_numpy(dtype=float)[order]
+    returns = trades_df['報酬率'].to_numpy(dtype=float)[order]
+    entry_times = trades_df['進場時間'].to_numpy()
+    exit_times = trades_df['出場時間'].to_numpy()
+
+    wins = pnl > 0
+    losses = pnl < 0
+    n_wins = int(wins.sum())
+    n_losses = int(losses.sum())
+    avg_win = pnl[wins].mean() if n_wins else 0.0
+    avg_loss = pnl[losses].mean() if n_losses else 0.0
+    per_year = trades_per_year(entry_times, exit_times)
+
+    daily = calculate_daily_metrics(daily_equity if daily_equity is not None else pd.DataFrame(), capital)
+    annual_return, ulcer_index = _annual_return_and_ulcer(daily_equity, capital)
+
+    return TradeMetrics(
+        n_trades=n_trades,
+        total_pnl=float(pnl.sum()),
+        win_rate=n_wins / n_trades * 100,
+        expectancy=float(pnl.mean()),
+        avg_win=float(avg_win),
+        avg_loss=float(avg_loss),
+        payoff_ratio=float(avg_win / abs(avg_loss)) if n_losses and n_wins else (np.inf if n_wins else 0.0),
+        profit_factor=float(_profit_factor(pnl)),
+        trades_per_year=float(per_year),
+        sharpe=float(_trade_sharpe(returns, per_year)),
+        daily_sharpe=daily['sharpe'],
+        sortino=daily['sortino'],
+        max_dd=daily['max_dd'],
+        max_dd_pct=daily['max_dd_pct'],
+        annual_return=annual_return,
+        calmar=annual_return / abs(daily['max_dd_pct']) if daily['max_dd_pct'] < 0 else 0.0,
+        ulcer_index=ulcer_index,
+        max_consecutive_wins=int(longest_run(wins[None, :])[0]),
+        max_consecutive_losses=int(longest_run(losses[None, :])[0]),
+        avg_holding_days=float(trades_df['持有天數'].mean()),
+    )
+
+
+def _trade_sharpe(returns, per_year):
+    """每筆報酬率的夏普值，以每年交易次數年化"""
+    if len(returns) < 2:
+        return 0
+    std_return = np.std(returns, ddof=1)
+    if std_return == 0:
+        return 0
+    return np.mean(returns) / std_return * np.sqrt(per_year)
+
+
+def _profit_factor(pnl):
+    """獲利因子 = 總獲利 / |總虧損|；沒有虧損時為 inf，沒有獲利時為 0"""
+    gross_profit = pnl[pnl > 0].sum()
+    gross_loss = pnl[pnl < 0].sum()
+
+    if gross_loss == 0 or gross_profit == 0:
+        return np.inf if gross_loss == 0 else 0
+    return gross_profit / abs(gross_loss)
+
+
+def _annual_return_and_ulcer(daily_equity, capital):
+    """由逐日權益計算年化報酬率 (%，複利) 與 Ulcer 指數 (%)"""
+    if daily_equity is None or len(daily_equity) == 0 or capital <= 0:
+        return 0.0, 0.0
+
+    cumulative = daily_equity['累積損益'].to_numpy(dtype=float)
+    equity = capital + cumulative
+    dates = daily_equity['日期']
+    years = max((dates.iloc[-1] - dates.iloc[0]) / pd.Timedelta(days=1), 1.0) / DAYS_PER_YEAR
+    growth = equity[-1] / capital
+    annual_return = (growth ** (1 / years) - 1) * 100 if growth > 0 else -100.0
+
+    peak = capital + np.maximum.accumulate(np.maximum(cumulative, 0))
+    drawdown_pct = (equity - peak) / peak * 100
+    ulcer_index = np.sqrt(np.mean(drawdown_pct ** 2))
+
+    return float(annual_return), float(ulcer_index)
@@ -0,0 +1,299 @@
+"""蒙地卡羅模擬 (Bootstrap) 計算核心
+
+此模組不匯入 Streamlit，可在子程序 (ProcessPoolExecutor) 中使用。
+"""
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from .downsample import CHART_MAX_POINTS
+
+MC_CHUNK_BYTES = 8 * 1024 * 1024  # 每批抽樣矩陣的記憶體上限 (較小的批次可留在 CPU 快取中，整體較快)
+MC_POLL_SECONDS = 0.5  # 平行模擬等待子程序時呼叫 progress_callback 的間隔 (讓呼叫端可中止)
+
+
+MC_METHODS = ('iid', 'block', 'stationary')
+MC_BAND_PERCENTILES = (5, 25, 50, 75, 95)  # 扇形圖的百分位數
+MC_BAND_STEPS = 500  # 扇形圖每條路徑最多記錄的步數
+MC_BAND_BYTES = 64 * 1024 * 1024  # 扇形圖 (模擬次數 × 步數) float32 矩陣的記憶體上限
+MC_PATH_STEPS = CHART_MAX_POINTS  # 樣本曲線每條最多記錄的步數 (圖表也只繪製這麼多點)
+
+
+def bootstrap_chunks(pnl_values, n_simulations, rng, chunk_bytes=MC_CHUNK_BYTES, method='iid', block_size=5):
+    """分批產生 Bootstrap 抽樣的交易損益，每批回傳 (起始列, 結束列, 抽樣損益矩陣)
+
+    method:
+        'iid': 逐筆獨立抽樣
+        'block': 移動區塊 (moving-block)，每段固定 block_size 筆連續資料
+        'stationary': 平穩 Bootstrap (Politis-Romano)，區塊長度服從平均為 block_size 的幾何分佈
+    沒有交易時不產生任何批次。
+    """
+    if method not in MC_METHODS:
+        raise ValueError(f"未知的抽樣方式: {method}")
+
+    n_trades = len(pnl_values)
+    if n_trades == 0:
+        return
+    chunk_rows = max(1, chunk_bytes // (n_trades * 8))
+
+    for start in range(0, n_simulations, chunk_rows):
+        stop = min(start + chunk_rows, n_simulations)
+        if method == 'iid':
+            sample_idx = rng.integers(0, n_trades, size=(stop - start, n_trades))
+        elif method == 'block':
+            sample_idx = _moving_block_index(rng, stop - start, n_trades, block_size)
+        else:
+            sample_idx = _stationary_index(rng, stop - start, n_trades, block_size)
+        yield start, stop, pnl_values[sample_idx]
+
+
+def _moving_block_index(rng, n_rows, n, block_size):
+    """移動區塊抽樣索引：隨機選取區塊起點，每段取連續 block_size 筆後截斷為 n 筆"""
+    block_size = int(min(max(block_size, 1), n))
+    n_blocks = -(-n // block_size)
+    starts = rng.integers(0, n - block_size + 1, size=(n_rows, n_blocks))
+    sample_idx = starts[:, :, None] + np.arange(block_size)
+    return sample_idx.reshape(n_rows, n_blocks * block_size)[:, :n]
+
+
+def _stationary_index(rng, n_rows, n, block_size):
+    """平穩 Bootstrap 抽樣索引：每一步以 1/block_size 的機率開新區塊，否則接續下一筆 (循環)"""
+    positions = np.arange(n)
+    new_block = rng.random((n_rows, n)) < 1.0 / max(block_size, 1)
+    new_block[:, 0] = True
+    starts = rng.integers(0, n, size=(n_rows, n))
+
+    # 每個位置所屬區塊的起始位置
+    block_start = np.maximum.accumulate(np.where(new_block, positions, 0), axis=1)
+    block_origin = np.take_along_axis(starts, block_start, axis=1)
+    return (block_origin + positions - block_start) % n
+
+
+def group_pnl_by_exit_day(exit_times, pnl_values):
+    """將交易損益依出場日加總，回傳依日期排序的每日損益 (作為區塊抽樣的單位)"""
+    exit_days = np.asarray(exit_times, dtype='datetime64[ns]').astype('datetime64[D]')
+    _, day_idx = np.unique(exit_days, return_inverse=True)
+    return np.bincount(day_idx.ravel(), weights=np.asarray(pnl_values, dtype=float))
+
+
+def longest_run(mask):
+    """計算布林矩陣每一列最長的連續 True 長度
+
+    兩側補 False 後找出每段連續 True 的起點與終點 (各列依序攤平)，只需掃過一次布林矩陣，
+    再以 reduceat 取每列最長的一段；不需要與矩陣同大小的整數累加陣列。
+    """
+    n_rows, n_cols = mask.shape
+    result = np.zeros(n_rows, dtype=np.int64)
+    if n_cols == 0:
+        return result
+
+    padded = np.zeros((n_rows, n_cols + 2), dtype=bool)
+    padded[:, 1:-1] = mask
+    # 每列以 False 開頭與結尾，變化點必成對出現：偶數個為起點、奇數個為終點
+    changes = np.flatnonzero(padded[:, 1:] != padded[:, :-1])
+    if len(changes) == 0:
+        return result
+
+    starts, ends = changes[0::2], changes[1::2]
+    row_counts = np.bincount(starts // (n_cols + 1), minlength=n_rows)
+    has_run = row_counts > 0
+    offsets = np.cumsum(row_counts) - row_counts
+    result[has_run] = np.maximum.reduceat(ends - starts, offsets[has_run])
+    return result
+
+
+def monte_carlo_units(trades_df, by_exit_day=False):
+    """取得蒙地卡羅的抽樣單位：依出場時間排序的逐筆損益，或依出場日加總的每日損益"""
+    ordered = trades_df.sort_values('出場時間', kind='stable')
+    if by_exit_day:
+        return group_pnl_by_exit_day(ordered['出場時間'], ordered['損益'])
+    return ordered['損益'].to_numpy(dtype=float)
+
+
+def simulate_paths(pnl_values, n_simulations, seed=None, chunk_bytes=MC_CHUNK_BYTES, progress_callback=None,
+                   method='iid', block_size=5):
+    """產生全部的模擬權益曲線，回傳 (n_simulations × n_trades) 的 float32 矩陣
+
+    progress_callback(完成數, 總數) 在每批完成時呼叫；method、block_size 見 bootstrap_chunks。
+    """
+    pnl_values = np.asarray(pnl_values, dtype=float)
+    rng = np.random.default_rng(seed)
+    simulation_curves = np.empty((n_simulations, len(pnl_values)), dtype=np.float32)
+
+    for start, stop, sim_pnl in bootstrap_chunks(pnl_values, n_simulations, rng, chunk_bytes, method, block_size):
+        simulation_curves[start:stop] = np.cumsum(sim_pnl, axis=1)
+        if progress_callback is not None:
+            progress_callback(stop, n_simulations)
+
+    return simulation_curves
+
+
+def empty_summary(n_simulations=0, n_trades=0, n_sample_paths=0, n_band_steps=0, n_path_steps=MC_PATH_STEPS):
+    """建立空的統計結果 (各欄位預先配置好長度)"""
+    steps = band_steps(n_trades, n_band_steps)
+    path_steps = band_steps(n_trades, n_path_steps)
+    return {
+        'final_pnl': np.empty(n_simulations),
+        'max_drawdown': np.empty(n_simulations),
+        'longest_losing_streak': np.empty(n_simulations, dtype=np.int64),
+        'recovery_trades': np.empty(n_simulations, dtype=np.int64),
+        'path_steps': path_steps,
+        'sample_paths': np.empty((min(n_sample_paths, n_simulations), len(path_steps)), dtype=np.float32),
+        'band_steps': steps,
+        'band_values': np.empty((n_simulations, len(steps)), dtype=np.float32),
+    }
+
+
+def band_steps(n_trades, n_band_steps):
+    """扇形圖 (與樣本曲線) 記錄的步數位置 (0 起算，平均分佈並包含第一步與最後一步)"""
+    if n_trades == 0 or n_band_steps <= 0:
+        return np.empty(0, dtype=np.int64)
+    return np.unique(np.linspace(0, n_trades - 1, min(n_band_steps, n_trades)).round().astype(np.int64))
+
+
+def band_step_limit(n_simulations, max_steps=MC_BAND_STEPS, band_bytes=MC_BAND_BYTES):
+    """在記憶體上限內，每條路徑可記錄的扇形圖步數 (至少 2 步：第一步與最後一步)"""
+    return int(min(max_steps, max(2, band_bytes // (4 * max(n_simulations, 1)))))
+
+
+def percentile_bands(summary, percentiles=MC_BAND_PERCENTILES):
+    """由 band_values 計算每一步的百分位數，回傳 (len(percentiles) × 步數) 的陣列"""
+    band_values = summary['band_values']
+    if band_values.size == 0:
+        return np.empty((len(percentiles), band_values.shape[1]))
+    return np.percentile(band_values, percentiles, axis=0)
+
+
+def simulate_summary(pnl_values, n_simulations, seed=None, n_sample_paths=0, chunk_bytes=MC_CHUNK_BYTES,
+                     progress_callback=None, method='iid', block_size=5, n_band_steps=0, n_path_steps=MC_PATH_STEPS):
+    """串流模式 - 只保留每條路徑的統計量、前 n_sample_paths 條曲線與扇形圖取樣點
+
+    記憶體用量為 O(n_simulations × (1 + n_band_steps) + n_sample_paths × n_path_steps)，與交易筆數無關
+    (抽樣批次本身另受 chunk_bytes 限制)。
+    抽樣方式與 simulate_paths 相同，相同 seed 會得到相同的路徑。
+    各路徑彼此獨立同分佈，因此前 n_sample_paths 條即為均勻的隨機樣本。
+    以下「筆數」指抽樣單位，依出場日分組時即為出場日數。
+
+    回傳 dict:
+        final_pnl: 每條路徑的最終損益
+        max_drawdown: 每條路徑的最大回撤 (金額，<= 0)
+        longest_losing_streak: 每條路徑最長連續虧損筆數
+        recovery_trades: 每條路徑最長的回撤期間 (筆數，未回復者計至最後一筆)
+        path_steps: 樣本曲線記錄的步數位置 (最多 n_path_steps 個，見 band_steps)
+        sample_paths: 前 n_sample_paths 條累積損益曲線在 path_steps 的值 (float32)
+        band_steps: 扇形圖記錄的步數位置 (最多 n_band_steps 個，見 band_steps)
+        band_values: 每條路徑在 band_steps 的累積損益 (float32)，以 percentile_bands 計算百分位數
+    """
+    pnl_values = np.asarray(pnl_values, dtype=float)
+    if len(pnl_values) == 0:
+        # 沒有交易：每條路徑的損益、回撤與連續筆數皆為 0
+        summary = empty_summary(n_simulations, 0, n_sample_paths, n_band_steps, n_path_steps)
+        for key in ('final_pnl', 'max_drawdown', 'longest_losing_streak', 'recovery_trades'):
+            summary[key][:] = 0
+        return summary
+
+    rng = np.random.default_rng(seed)
+    summary = empty_summary(n_simulations, len(pnl_values), n_sample_paths, n_band_steps, n_path_steps)
+    sample_paths = summary['sample_paths']
+    steps = summary['band_steps']
+    path_steps = summary['path_steps']
+
+    for start, stop, sim_pnl in bootstrap_chunks(pnl_values, n_simulations, rng, chunk_bytes, method, block_size):
+        summary['longest_losing_streak'][start:stop] = longest_run(sim_pnl < 0)
+
+        cumulative = np.cumsum(sim_pnl, axis=1, out=sim_pnl)
+        summary['final_pnl'][start:stop] = cumulative[:, -1]
+        summary['band_values'][start:stop] = cumulative[:, steps]
+        if start < len(sample_paths):
+            sample_paths[start:stop] = cumulative[:len(sample_paths) - start, path_steps]
+
+        # 回撤以初始資金 0 為起點的最高點計算
+        drawdown = np.maximum.accumulate(cumulative, axis=1)
+        np.maximum(drawdown, 0, out=drawdown)
+        np.subtract(cumulative, drawdown, out=drawdown)
+        summary['max_drawdown'][start:stop] = drawdown.min(axis=1)
+        summary['recovery_trades'][start:stop] = longest_run(drawdown < 0)
+
+        if progress_callback is not None:
+            progress_callback(stop, n_simulations)
+
+    return summary
+
+
+def simulate_summary_parallel(pnl_values, n_simulations, seed=None, n_sample_paths=0, chunk_bytes=MC_CHUNK_BYTES,
+                              n_workers=1, progress_callback=None, method='iid', block_size=5, n_band_steps=0,
+                              n_path_steps=MC_PATH_STEPS):
+    """以多個子程序執行 simulate_summary，再依序合併結果
+
+    模擬次數切成多個小工作 (每個約一批 chunk_bytes，且至少分給每個子程序一個)，
+    每個工作使用 SeedSequence.spawn 產生的獨立亂數流，只回傳統計量與所需的樣本曲線。
+    相同的 seed、n_workers 與 chunk_bytes 會得到完全相同的結果。
+    progress_callback 拋出例外 (例如背景工作被取消) 時，尚未開始的工作直接取消，只等正在執行的一批結束。
+    子程序以 spawn 啟動 (呼叫端可能是多執行緒的 Streamlit 伺服器，fork 後的子程序可能卡在複製來的鎖上)，
+    損益陣列只在子程序啟動時傳送一次。
+    n_workers=1 時直接在本程序執行，結果與 simulate_summary 相同。
+    """
+    pnl_values = np.asarray(pnl_values, dtype=float)
+    if n_workers <= 1 or n_simulations < 2 or len(pnl_values) == 0:
+        return simulate_summary(pnl_values, n_simulations, seed, n_sample_paths, chunk_bytes, progress_callback,
+                                method, block_size, n_band_steps, n_path_steps)
+
+    n_workers = min(n_workers, n_simulations)
+    chunk_rows = max(1, chunk_bytes // (len(pnl_values) * 8))
+    task_rows = min(chunk_rows, -(-n_simulations // n_workers))
+    offsets = np.arange(0, n_simulations, task_rows)
+    sizes = np.minimum(offsets + task_rows, n_simulations) - offsets
+    seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    child_seeds = seed_seq.spawn(len(offsets))
+
+    summary = empty_summary(n_simulations, len(pnl_values), n_sample_paths, n_band_steps, n_path_steps)
+    completed = 0
+
+    executor = ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_worker, initargs=(pnl_values,))
+    try:
+        futures = {}
+        for child_seed, size, offset in zip(child_seeds, sizes, offsets):
+            # 只有前面的工作需要回傳樣本曲線
+            task_sample_paths = max(0, min(n_sample_paths - offset, size))
+            future = executor.submit(_summary_task, int(size), child_seed, int(task_sample_paths), chunk_bytes,
+                                     method, block_size, n_band_steps, n_path_steps)
+            futures[future] = (offset, size)
+
+        # 工作完成前也定期回報進度，progress_callback 拋出例外時可立即中止
+        pending = set(futures)
+        while pending:
+            finished, pending = wait(pending, timeout=MC_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in finished:
+                offset, size = futures.pop(future)
+                part = future.result()
+                for key in ('final_pnl', 'max_drawdown', 'longest_losing_streak', 'recovery_trades', 'band_values'):
+                    summary[key][offset:offset + size] = part[key]
+                summary['sample_paths'][offset:offset + len(part['sample_paths'])] = part['sample_paths']
+                completed += size
+
+            if progress_callback is not None:
+                progress_callback(completed, n_simulations)
+    except BaseException:
+        # 中止或發生錯誤時取消尚未開始的工作；正在執行的最多 n_workers 批很快就會結束
+        executor.shutdown(cancel_futures=True)
+        raise
+
+    executor.shutdown()
+    return summary
+
+
+_worker_pnl = None  # 子程序內的損益陣列 (由 _init_worker 設定)
+
+
+def _init_worker(pnl_values):
+    """子程序啟動時保存損益陣列，之後的工作不必再傳送"""
+    global _worker_pnl
+    _worker_pnl = pnl_values
+
+
+def _summary_task(n_simulations, seed, n_sample_paths, chunk_bytes, method, block_size, n_band_steps, n_path_steps):
+    """子程序中的單一工作：以 _init_worker 保存的損益陣列執行 simulate_summary"""
+    return simulate_summary(_worker_pnl, n_simulations, seed, n_sample_paths, chunk_bytes, None, method, block_size,
+                            n_band_steps, n_path_steps)
@@ -0,0 +1,150 @@
+"""帳戶資金限制模擬：以固定的帳戶資金依時間順序進出場
+
+calculate_trades 假設每筆交易都有足夠資金；這裡改以帳戶現金為限，
+依進場時間處理訊號，並以最小堆積 (依出場時間) 在進場前釋放已出場部位的資金。
+複雜度 O(n log n)。
+"""
+import heapq
+import math
+
+import numpy as np
+
+from .costs import fill_prices, is_day_trade, resolve_costs
+from .trades import trades_frame
+
+SIZING_MODES = ('fixed', 'compound')  # 每筆固定金額 / 依已實現權益等比例放大
+SHORTFALL_MODES = ('skip', 'scale')  # 現金不足時略過交易 / 以剩餘現金縮減部位
+CASH_TOLERANCE = 1e-6  # 比較成本與現金時容許的浮點誤差 (元)
+
+
+def simulate_portfolio(df, capital, investment, mode, sizing='fixed', on_shortfall='skip', costs=None):
+    """以帳戶資金 capital 模擬實際下單，回傳 (trades_df, summary)
+
+    trades_df 只包含實際成交的交易，欄位與 calculate_trades 相同。
+    sizing='compound' 時每筆目標金額 = investment × 已實現權益 / capital。
+    costs 為交易成本設定 (見 costs.COST_DEFAULTS)：進場需支付含滑價的成交金額與手續費，
+    出場收回扣除手續費與證交稅後的金額。
+    同一時間點的出場資金不能用於該時間點的進場 (與最大持倉的計算方式一致)；
+    同時進場的訊號依報表順序處理。缺少時間或出場早於進場的交易不列入。
+    """
+    if sizing not in SIZING_MODES:
+        raise ValueError(f"未知的部位計算方式: {sizing}")
+    if on_shortfall not in SHORTFALL_MODES:
+        raise ValueError(f"未知的資金不足處理方式: {on_shortfall}")
+
+    entry_price = df['進場價格'].to_numpy(dtype=float)
+    exit_price = df['出場價格'].to_numpy(dtype=float)
+    entry_times = df['進場時間'].to_numpy(dtype='datetime64[ns]')
+    exit_times = df['出場時間'].to_numpy(dtype='datetime64[ns]')
+
+    valid = (entry_price != 0) & ~np.isnat(entry_times) & ~np.isnat(exit_times) & (exit_times >= entry_times)
+    candidates = np.flatnonzero(valid)
+    candidates = candidates[np.argsort(entry_times[candidates], kind='stable')]
+
+    # 不計成本時費率為 0、成交價即報表價格
+    resolved = resolve_costs(costs)
+    if resolved is None:
+        buy_price, sell_price = entry_price, exit_price
+        fee_rate, min_fee = 0.0, 0.0
+        tax_rate = np.zeros(len(df))
+    else:
+        buy_price, sell_price = fill_prices(entry_price, exit_price, resolved)
+        fee_rate = resolved['commission_rate'] * resolved['commission_discount']
+        min_fee = float(resolved['min_commission'])
+        tax_rate = np.where(is_day_trade(entry_times, exit_times), resolved['day_trade_tax_rate'],
+                            resolved['tax_rate'])
+
+    def fee(amount):
+        return max(math.floor(amount * fee_rate), min_fee)
+
+    # 迴圈中以 Python 數值存取，避免逐筆取 NumPy 純量的額外成本
+    entry_ns = entry_times.view(np.int64).tolist()
+    exit_ns = exit_times.view(np.int64).tolist()
+    entry_price_list = entry_price.tolist()
+    buy_price_list = np.broadcast_to(buy_price, entry_price.shape).tolist()
+    sell_price_list = np.broadcast_to(sell_price, exit_price.shape).tolist()
+    tax_rate_list = tax_rate.tolist()
+    whole_lots = mode == "整張計算"
+
+    cash = float(capital)
+    equity = float(capital)  # 已實現權益 = 期初資金 + 已出場交易的淨損益
+    open_positions = []  # 最小堆積: (出場時間, 序號, 出場淨收入, 進場成本)
+    executed = []
+    executed_shares = []
+    n_unaffordable = 0
+    n_skipped = 0
+    n_scaled = 0
+    min_cash = cash
+
+    for idx in candidates.tolist():
+        entry_time = entry_ns[idx]
+
+        # 釋放在此進場時間之前出場的部位
+        while open_positions and open_positions[0][0] < entry_time:
+            _, _, proceeds, cost = heapq.heappop(open_positions)
+            cash += proceeds
+            equity += proceeds - cost
+
+        target = investment * equity / capital if sizing == 'compound' else investment
+        shares = _position_size(target, entry_price_list[idx], whole_lots)
+        if shares <= 0:
+            # 目標金額買不起一張 (與 calculate_trades 略過的交易相同)
+            n_unaffordable += 1
+            continue
+
+        fill = buy_price_list[idx]
+        cost = shares * fill + fee(shares * fill)
+        if cost > cash + CASH_TOLERANCE:
+            if on_shortfall == 'skip':
+                n_skipped += 1
+                continue
+            # 以剩餘現金 (預留手續費) 重新計算部位
+            shares = _position_size(cash / (1 + fee_rate), fill, whole_lots)
+            cost = shares * fill + fee(shares * fill)
+            if cost > cash + CASH_TOLERANCE:
+                shares = _position_size(cash - min_fee, fill, whole_lots)
+                cost = shares * fill + fee(shares * fill)
+            if shares <= 0 or cost > cash + CASH_TOLERANCE:
+                n_skipped += 1
+                continue
+            n_scaled += 1
+
+        sell_amount = shares * sell_price_list[idx]
+        proceeds = sell_amount - fee(sell_amount) - math.floor(sell_amount * tax_rate_list[idx]) \
+            if resolved is not None else sell_amount
+
+        cash = max(cash - cost, 0.0)
+        min_cash = min(min_cash, cash)
+        heapq.heappush(open_positions, (exit_ns[idx], idx, proceeds, cost))
+        executed.append(idx)
+        executed_shares.append(shares)
+
+    while open_positions:
+        _, _, proceeds, cost = heapq.heappop(open_positions)
+        equity += proceeds - cost
+
+    executed = np.asarray(executed, dtype=np.int64)
+    executed_shares = np.asarray(executed_shares, dtype=float)
+    trades_df = trades_frame(df.iloc[executed], executed_shares, executed_shares * entry_price[executed], costs)
+    summary = {
+        'capital': float(capital),
+        'final_equity': float(equity),
+        'account_return': float((equity - capital) / capital * 100),
+        'n_signals': len(candidates),
+        'n_executed': len(executed),
+        'n_unaffordable': n_unaffordable,
+        'n_skipped': n_skipped,
+        'n_scaled': n_scaled,
+        'min_cash': float(min_cash),
+    }
+
+    return trades_df, summary
+
+
+def _position_size(amount, price, whole_lots):
+    """依金額計算股數：整張以1000股為單位無條件捨去，股數計算可買零股"""
+    if amount <= 0:
+        return 0
+    if whole_lots:
+        return int(amount / (price * 1000)) * 1000
+    return amount / price
@@ -0,0 +1,93 @@
+"""持倉資金計算：進出場事件、同時持有金額與最大持倉"""
+import numpy as np
+import pandas as pd
+
+
+def build_position_events(trades_df):
+    """建立依時間排序的進出場事件陣列
+
+    回傳 (times, amounts, is_exit)：每筆交易產生一個進場 (+投入金額) 與一個出場 (-投入金額) 事件，
+    以 lexsort 排序，同一時間點進場排在出場之前。缺少時間或出場早於進場的交易不列入。
+    """
+    entry_times = trades_df['進場時間'].to_numpy(dtype='datetime64[ns]')
+    exit_times = trades_df['出場時間'].to_numpy(dtype='datetime64[ns]')
+    amounts = trades_df['投入金額'].to_numpy(dtype=float)
+
+    valid = ~np.isnat(entry_times) & ~np.isnat(exit_times) & (exit_times >= entry_times)
+    n_valid = int(valid.sum())
+
+    times = np.concatenate([entry_times[valid], exit_times[valid]])
+    deltas = np.concatenate([amounts[valid], -amounts[valid]])
+    is_exit = np.concatenate([np.zeros(n_valid, dtype=bool), np.ones(n_valid, dtype=bool)])
+
+    order = np.lexsort((is_exit, times))
+    return times[order], deltas[order], is_exit[order]
+
+
+def calculate_concurrent_holdings(trades_df, freq='D', events=None):
+    """計算同時持有金額的時間序列
+
+    以差分陣列 (difference array) 累加事件，複雜度 O(期數 + 交易數)。
+    freq 可為 'D' (日)、'W' (週) 或 'h'、'30min' 等日內頻率 (依實際進出場時間)。
+    進場與出場所在的期間都算持有 (含頭含尾)，'日期' 為每個期間的起點。
+    events 可傳入 build_position_events 的結果以免重複建立。
+    """
+    if len(trades_df) == 0:
+        return pd.DataFrame()
+
+    times, deltas, is_exit = build_position_events(trades_df) if events is None else events
+    if len(times) == 0:
+        return pd.DataFrame()
+
+    period_idx, labels = _period_index(times, freq)
+    n_periods = len(labels)
+
+    # 出場金額在出場期間的下一期才扣除，使出場當期仍計入持有
+    diff = np.bincount(period_idx + is_exit, weights=deltas, minlength=n_periods + 1)
+    holdings = np.cumsum(diff[:n_periods])
+
+    return pd.DataFrame({'日期': labels, '持有金額': holdings})
+
+
+def _period_index(times, freq):
+    """將時間陣列換算為期間序號 (從最早的期間起算)，並回傳各期間起點"""
+    offset = pd.tseries.frequencies.to_offset(freq)
+    times = pd.DatetimeIndex(times)
+
+    if isinstance(offset, pd.offsets.Tick):
+        # 固定長度的頻率 (日、小時、分鐘...)：以 ns 整數除法分桶
+        step = pd.Timedelta(offset).value
+        origin = times.min().floor(offset)
+        period_idx = (times.asi8 - origin.value) // step
+        labels = pd.date_range(start=origin, periods=int(period_idx.max()) + 1, freq=offset)
+    else:
+        # 週、月等日曆頻率：以 Period 序號分桶
+        ordinals = times.to_period(offset).asi8
+        origin = pd.Period(ordinal=int(ordinals.min()), freq=offset)
+        period_idx = ordinals - origin.ordinal
+        labels = pd.period_range(start=origin, periods=int(period_idx.max()) + 1, freq=offset).to_timestamp()
+
+    return period_idx, labels
+
+
+def calculate_max_concurrent_positions(trades_df, events=None):
+    """計算最大同時持有金額
+
+    回傳 (最大持有金額, 發生時間, 最大同時持有部位數)。
+    events 可傳入 build_position_events 的結果以免重複建立。
+    """
+    if len(trades_df) == 0:
+        return 0, None, 0
+
+    times, deltas, is_exit = build_position_events(trades_df) if events is None else events
+    if len(times) == 0:
+        return 0, None, 0
+
+    current_amount = np.cumsum(deltas)
+    current_positions = np.cumsum(np.where(is_exit, -1, 1))
+
+    peak = int(np.argmax(current_amount))
+    max_amount = max(float(current_amount[peak]), 0)
+    max_positions = max(int(current_positions.max()), 0)
+
+    return max_amount, pd.Timestamp(times[peak]), max_positions
@@ -0,0 +1,122 @@
+"""已解析報表的本機快取 (Arrow/Feather)
+
+以檔案內容雜湊為鍵，將解析好的報表存成未壓縮的 Feather 檔，之後以 memory-map 讀回，不需重新解析 CSV。
+快取依總大小與最後使用時間淘汰。pyarrow (requirements.txt) 未安裝時快取停用並發出 RuntimeWarning。
+"""
+import hashlib
+import os
+import time
+import warnings
+from pathlib import Path
+
+from .ingest import REQUIRED_COLUMNS, read_report
+
+REPORT_CACHE_DIR = Path(os.environ.get('Q3_REPORT_CACHE_DIR', Path.home() / '.3q_backtest' / 'report_cache'))
+REPORT_CACHE_MAX_BYTES = 2 * 1024 ** 3  # 快取總大小上限
+REPORT_CACHE_MAX_AGE_DAYS = 30  # 超過此天數未使用的快取會被刪除
+REPORT_CACHE_VERSION = 1  # 解析格式變更時遞增，使舊快取失效
+
+
+def read_report_cached(file, file_hash, columns=REQUIRED_COLUMNS, progress_callback=None, cache_dir=None):
+    """讀取報表：有快取時直接載入，否則解析 CSV 後寫入快取
+
+    快取寫入失敗 (磁碟空間、權限等) 不影響回傳結果。解析錯誤時拋出 ValueError。
+    """
+    df = load_cached_report(file_hash, columns, cache_dir)
+    if df is not None:
+        return df
+
+    df = read_report(file, columns=columns, progress_callback=progress_callback)
+    try:
+        store_cached_report(file_hash, columns, df, cache_dir)
+    except OSError:
+        pass
+
+    return df
+
+
+def cache_path(file_hash, columns, cache_dir=None):
+    """快取檔路徑，鍵包含檔案雜湊、欄位與快取版本"""
+    columns_tag = hashlib.sha256(','.join(columns).encode('utf-8')).hexdigest()[:8]
+    return Path(cache_dir or REPORT_CACHE_DIR) / f"{file_hash}-{columns_tag}-v{REPORT_CACHE_VERSION}.feather"
+
+
+def load_cached_report(file_hash, columns, cache_dir=None):
+    """讀取快取的報表，沒有快取時回傳 None
+
+    以 memory-map 開啟，數值與時間欄位不另外複製。
+    """
+    feather = _feather()
+    if feather is None:
+        return None
+
+    path = cache_path(file_hash, columns, cache_dir)
+    if not path.exists():
+        return None
+
+    try:
+        table = feather.read_table(path, memory_map=True)
+    except OSError:
+        return None
+
+    # 更新最後使用時間，供淘汰機制判斷；唯讀目錄或檔案已被其他程序淘汰時略過，不影響讀取
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return table.to_pandas(split_blocks=True)
+
+
+def store_cached_report(file_hash, columns, df, cache_dir=None):
+    """將解析好的報表寫入快取 (未壓縮，才能 memory-map 讀取)，並執行淘汰"""
+    feather = _feather()
+    if feather is None:
+        return
+
+    path = cache_path(file_hash, columns, cache_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # 先寫入暫存檔再改名，避免其他程序讀到寫到一半的檔案
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    feather.write_feather(df.reset_index(drop=True), tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+
+    evict_report_cache(cache_dir)
+
+
+def evict_report_cache(cache_dir=None, max_bytes=REPORT_CACHE_MAX_BYTES, max_age_days=REPORT_CACHE_MAX_AGE_DAYS):
+    """刪除過期的快取，總大小超過上限時再從最久未使用的開始刪除"""
+    cache_dir = Path(cache_dir or REPORT_CACHE_DIR)
+    if not cache_dir.exists():
+        return
+
+    entries = []
+    for path in cache_dir.glob('*.feather'):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    oldest_allowed = time.time() - max_age_days * 86400
+    total_bytes = sum(size for _, size, _ in entries)
+
+    for mtime, size, path in sorted(entries):
+        if mtime >= oldest_allowed and total_bytes <= max_bytes:
+            break
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total_bytes -= size
+
+
+def _feather():
+    """延遲匯入 pyarrow.feather (匯入成本高)，未安裝時發出警告並回傳 None (快取停用，每次重新解析 CSV)"""
+    try:
+        import pyarrow.feather as feather
+    except ImportError:
+        warnings.warn("未安裝 pyarrow，報表快取已停用 (每次都會重新解析 CSV)；請執行 pip install -r requirements.txt",
+                      RuntimeWarning, stacklevel=3)
+        return None
+    return feather
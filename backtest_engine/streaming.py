@@ -0,0 +1,99 @@
+"""大型報表的串流處理
+
+分批讀取 CSV，每批直接換算成精簡的交易欄位並累計統計量，不需要把整份原始報表載入記憶體。
+超過 STREAM_MIN_BYTES 的上傳檔 (app.py，先寫入暫存檔) 與 --metrics-only 的批次分析 (cli.py) 使用此路徑。
+"""
+import numpy as np
+import pandas as pd
+
+from .ingest import CSV_CHUNK_ROWS, concat_chunks, iter_report_chunks
+from .trades import TRADE_INPUT_COLUMNS, calculate_trades
+
+MONTHLY_COLUMNS = ['月份', '總損益', '交易次數']
+# 超過此大小的上傳檔改以串流摘要分析 (不載入整份報表)；須低於 Streamlit 的上傳上限 (server.maxUploadSize 預設 200 MB)
+STREAM_MIN_BYTES = 150 * 1024 ** 2
+
+
+def stream_trades(file, investment, mode, keep_trades=True, chunk_rows=CSV_CHUNK_ROWS, progress_callback=None,
+                  costs=None):
+    """串流計算交易損益與累計統計，回傳 (trades_df, summary)
+
+    keep_trades=False 時不保留逐筆交易 (trades_df 為 None)，只回傳累計統計。
+    summary 包含 n_trades、total_pnl、total_investment、total_costs、n_wins、win_rate、gross_profit、gross_loss、
+    avg_pnl、total_return (%)、profit_factor (定義同 calculate_profit_factor)，
+    以及與 calculate_monthly_analysis 相同格式的 entry_analysis / exit_analysis (依開倉/關倉月份)。
+    """
+    summary = {
+        'n_trades': 0,
+        'total_pnl': 0.0,
+        'total_investment': 0.0,
+        'total_costs': 0.0,
+        'n_wins': 0,
+        'gross_profit': 0.0,
+        'gross_loss': 0.0,
+    }
+    entry_parts = []
+    exit_parts = []
+    trade_chunks = []
+
+    for chunk in iter_report_chunks(file, TRADE_INPUT_COLUMNS, chunk_rows, progress_callback):
+        trades = calculate_trades(chunk, investment, mode, costs)
+        if len(trades) == 0:
+            continue
+
+        pnl = trades['損益']
+        summary['n_trades'] += len(trades)
+        summary['total_pnl'] += pnl.sum()
+        summary['total_investment'] += trades['投入金額'].sum()
+        summary['total_costs'] += trades['交易成本'].sum()
+        summary['n_wins'] += int((pnl > 0).sum())
+        summary['gross_profit'] += pnl[pnl > 0].sum()
+        summary['gross_loss'] += pnl[pnl < 0].sum()
+
+        entry_parts.append(_monthly_partial(trades['進場時間'], pnl))
+        exit_parts.append(_monthly_partial(trades['出場時間'], pnl))
+
+        if keep_trades:
+            trade_chunks.append(trades)
+
+    n_trades = summary['n_trades']
+    gross_profit, gross_loss = summary['gross_profit'], summary['gross_loss']
+    summary['win_rate'] = summary['n_wins'] / n_trades * 100 if n_trades else 0
+    summary['avg_pnl'] = summary['total_pnl'] / n_trades if n_trades else 0
+    summary['total_return'] = summary['total_pnl'] / summary['total_investment'] * 100 if n_trades else 0
+    if gross_loss == 0 or gross_profit == 0:
+        summary['profit_factor'] = np.inf if gross_loss == 0 else 0
+    else:
+        summary['profit_factor'] = gross_profit / abs(gross_loss)
+    summary['entry_analysis'] = _merge_monthly(entry_parts)
+    summary['exit_analysis'] = _merge_monthly(exit_parts)
+
+    if not keep_trades:
+        return None, summary
+    if not trade_chunks:
+        return pd.DataFrame(), summary
+    return concat_chunks(trade_chunks), summary
+
+
+def stream_trades_file(path, investment, mode, keep_trades=True, chunk_rows=CSV_CHUNK_ROWS, progress_callback=None,
+                       costs=None):
+    """以檔案路徑執行 stream_trades (檔案在函數內開啟，呼叫端只需保留路徑)"""
+    with open(path, 'rb') as file:
+        return stream_trades(file, investment, mode, keep_trades, chunk_rows, progress_callback, costs)
+
+
+def _monthly_partial(times, pnl):
+    """單批交易依月份的損益合計與筆數"""
+    return pnl.groupby(times.dt.to_period('M')).agg(['sum', 'count'])
+
+
+def _merge_monthly(parts):
+    """合併各批的月份統計"""
+    if not parts:
+        return pd.DataFrame(columns=MONTHLY_COLUMNS)
+
+    merged = pd.concat(parts).groupby(level=0).sum().reset_index()
+    merged.columns = MONTHLY_COLUMNS
+    merged['月份'] = merged['月份'].astype(str)
+
+    return merged
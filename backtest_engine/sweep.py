@@ -0,0 +1,183 @@
+"""參數掃描：一次計算多組投入金額 × 計算模式的績效指標
+
+所有網格點共用同一組交易陣列，以廣播 (投入金額 × 交易) 的矩陣一次算出
+損益、夏普值、MDD 等，不需要每個網格點重新跑一次 calculate_trades。
+"""
+import numpy as np
+import pandas as pd
+
+from .analysis import summarize_trades
+from .costs import commission, fill_prices, is_day_trade, resolve_costs, transaction_tax
+from .metrics import DAYS_PER_YEAR
+from .trades import calculate_trades
+
+SWEEP_MODES = ("整張計算", "股數計算")
+SWEEP_CHUNK_BYTES = 64 * 1024 * 1024  # 每批 (投入金額 × 交易) 矩陣的大小上限
+NS_PER_DAY = 86400 * 10**9
+
+
+def investment_grid(start, stop, step):
+    """產生投入金額網格 (包含 stop)"""
+    if step <= 0 or stop < start:
+        raise ValueError("投入金額範圍不正確")
+    return np.arange(start, stop + step / 2, step, dtype=float)
+
+
+def sweep_parameters(df, investments, modes=SWEEP_MODES, chunk_bytes=SWEEP_CHUNK_BYTES, progress_callback=None,
+                     costs=None):
+    """計算每組 (投入金額, 計算模式) 的績效指標，回傳一列一個網格點的 DataFrame
+
+    指標定義與 analyze_trades 相同 (夏普值以每筆報酬率計算、MDD 依出場時間累積)；
+    出場時間相同的交易依報表順序累積。costs 為交易成本設定 (見 costs.COST_DEFAULTS)。
+    progress_callback(完成數, 總數) 以網格點計算。
+    """
+    investments = np.asarray(investments, dtype=float)
+
+    # 股數計算模式下的交易 = 所有進場價格不為零的交易，先依出場時間排序一次
+    trades_df = calculate_trades(df, 1.0, "股數計算")
+    order = np.argsort(trades_df['出場時間'].to_numpy(), kind='stable')
+    entry_price = trades_df['進場價格'].to_numpy()[order]
+    exit_price = trades_df['出場價格'].to_numpy()[order]
+    returns = trades_df['報酬率'].to_numpy()[order]
+    times = (trades_df['進場時間'].to_numpy(dtype='datetime64[ns]').view(np.int64)[order],
+             trades_df['出場時間'].to_numpy(dtype='datetime64[ns]').view(np.int64)[order])
+
+    costs = resolve_costs(costs)
+    if costs is not None:
+        day_trade = is_day_trade(trades_df['進場時間'], trades_df['出場時間'])[order]
+        buy_price, sell_price = fill_prices(entry_price, exit_price, costs)
+        costs = {**costs, 'buy_price': buy_price, 'sell_price': sell_price, 'day_trade': day_trade}
+
+    # 每批的投入金額數，避免大型報表的矩陣占用過多記憶體
+    batch = max(1, chunk_bytes // max(1, len(entry_price) * 8))
+    total = len(investments) * len(modes)
+    rows = []
+
+    for mode in modes:
+        if mode == "股數計算" and costs is None:
+            # 不計成本時股數計算的損益與投入金額成正比：以 1 元算一次，再依金額縮放金額類指標
+            unit = _sweep_batch(entry_price, exit_price, returns, times, np.ones(1), mode, costs)[0]
+            for amount in investments:
+                rows.append(dict(unit, 投入金額=amount, 總損益=unit['總損益'] * amount,
+                                 最大回撤=unit['最大回撤'] * amount))
+            if progress_callback is not None:
+                progress_callback(len(rows), total)
+            continue
+
+        for start in range(0, len(investments), batch):
+            batch_investments = investments[start:start + batch]
+            rows.extend(_sweep_batch(entry_price, exit_price, returns, times, batch_investments, mode, costs))
+            if progress_callback is not None:
+                progress_callback(len(rows), total)
+
+    return pd.DataFrame(rows)
+
+
+def _sweep_batch(entry_price, exit_price, returns, times, investments, mode, costs=None):
+    """計算一批投入金額 (列) × 交易 (欄) 的指標
+
+    times 為排序後的 (進場時間, 出場時間) ns 整數陣列；
+    costs 除成本設定外另含排序後的 buy_price、sell_price 與 day_trade 陣列。
+    """
+    investment = investments[:, None]
+
+    if mode == "整張計算":
+        # 以1000股為單位，無條件捨去；買不起一張的交易略過
+        lots = np.trunc(investment / (entry_price * 1000))
+        valid = lots >= 1
+        shares = np.where(valid, lots * 1000, 0.0)
+        # 與 calculate_trades 相同的運算順序，浮點數結果才會逐位相同
+        trade_investment = (shares / 1000) * entry_price * 1000
+    else:
+        valid = np.broadcast_to(np.ones(len(entry_price), dtype=bool), (len(investments), len(entry_price)))
+        shares = investment / entry_price
+        trade_investment = shares * entry_price
+
+    if costs is None:
+        pnl = shares * (exit_price - entry_price)
+    else:
+        # 淨損益：費用依每個網格點的成交金額計算 (最低手續費使成本與金額不成正比)；算式同 trades_frame
+        buy_amount = shares * costs['buy_price']
+        sell_amount = shares * costs['sell_price']
+        fees = commission(buy_amount, costs) + commission(sell_amount, costs) + \
+            transaction_tax(sell_amount, costs['day_trade'], costs)
+        pnl = shares * (costs['sell_price'] - costs['buy_price']) - fees
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.where(valid, pnl / trade_investment, 0.0)
+
+    invested = trade_investment.sum(axis=1)
+    n_trades = valid.sum(axis=1)
+
+    # 權益曲線與 MDD：無效交易不計入，創高基準從第一筆有效交易開始
+    cumulative = np.cumsum(pnl, axis=1)
+    running_max = np.maximum.accumulate(np.where(valid, cumulative, -np.inf), axis=1)
+    with np.errstate(invalid='ignore'):
+        max_dd = np.where(valid, cumulative - running_max, 0.0).min(axis=1, initial=0.0)
+
+    gross_profit = np.where(pnl > 0, pnl, 0.0).sum(axis=1)
+    gross_loss = np.where(pnl < 0, pnl, 0.0).sum(axis=1)
+    total_pnl = pnl.sum(axis=1)
+
+    # 夏普值 (與 calculate_sharpe_ratio 相同，每筆報酬率依每個網格點的實際交易頻率年化)
+    entry_ns, exit_ns = times
+    first_entry = np.where(valid, entry_ns, np.iinfo(np.int64).max).min(axis=1)
+    last_exit = np.where(valid, exit_ns, np.iinfo(np.int64).min).max(axis=1)
+    span_days = np.maximum((last_exit - first_entry) / NS_PER_DAY, 1.0)
+    per_year = n_trades / (span_days / DAYS_PER_YEAR)
+    masked_returns = np.where(valid, returns, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_return = masked_returns.sum(axis=1) / n_trades
+        variance = (np.where(valid, returns - mean_return[:, None], 0.0) ** 2).sum(axis=1) / (n_trades - 1)
+        sharpe = mean_return / np.sqrt(variance) * np.sqrt(per_year)
+    sharpe = np.where((n_trades >= 2) & (variance > 0), sharpe, 0.0)
+
+    rows = []
+    for i, amount in enumerate(investments):
+        count = int(n_trades[i])
+        if gross_loss[i] == 0 or gross_profit[i] == 0:
+            profit_factor = np.inf if gross_loss[i] == 0 else 0
+        else:
+            profit_factor = gross_profit[i] / abs(gross_loss[i])
+
+        rows.append({
+            '投入金額': amount,
+            '計算模式': mode,
+            '交易次數': count,
+            '總損益': total_pnl[i],
+            '報酬率%': total_pnl[i] / invested[i] * 100 if count else 0.0,
+            '勝率%': (pnl[i] > 0).sum() / count * 100 if count else 0.0,
+            '夏普值': sharpe[i],
+            '獲利因子': profit_factor if count else 0,
+            '最大回撤': max_dd[i],
+        })
+
+    return rows
+
+
+def sweep_costs(df, investment, mode, costs, parameter, values, progress_callback=None):
+    """成本敏感度：固定投入金額與模式，逐一改變一個成本參數，回傳一列一個參數值的 DataFrame
+
+    parameter 為 COST_DEFAULTS 的鍵 (例如 'slippage_ticks'、'commission_discount')；
+    直接使用已解析的報表，不重新讀檔。
+    """
+    rows = []
+    for value in values:
+        analysis = summarize_trades(calculate_trades(df, investment, mode, {**(costs or {}), parameter: value}),
+                                    include_charts=False)
+        trades_df = analysis['trades_df']
+        row = {'參數值': value, '交易次數': len(trades_df)}
+        if len(trades_df) > 0:
+            row.update({
+                '總損益': analysis['total_pnl'],
+                '交易成本': analysis['total_costs'],
+                '報酬率%': analysis['total_return'],
+                '勝率%': analysis['win_rate'],
+                '夏普值': analysis['sharpe'],
+                '獲利因子': analysis['profit_factor'],
+                '最大回撤': analysis['max_dd'],
+            })
+        rows.append(row)
+        if progress_callback is not None:
+            progress_callback(len(rows), len(values))
+
+    return pd.DataFrame(rows)
@@ -0,0 +1,74 @@
+"""交易損益計算"""
+import numpy as np
+import pandas as pd
+
+from .costs import is_day_trade, resolve_costs, trade_costs
+
+# calculate_trades 需要的報表欄位
+TRADE_INPUT_COLUMNS = ['商品名稱', '商品代碼', '進場時間', '進場價格', '出場時間', '出場價格']
+
+
+def calculate_trades(df, investment, mode, costs=None):
+    """計算每筆交易的損益
+
+    以欄位陣列一次完成整張/股數換算、略過零價格與買不起的交易，
+    結果與逐筆 iterrows 的版本一致。costs 為交易成本設定 (見 costs.COST_DEFAULTS)，
+    None 表示不計手續費、稅與滑價；部位大小一律以報表的進場價格計算。
+    """
+    entry_price = df['進場價格'].to_numpy(dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if mode == "整張計算":
+            # 以1000股為單位，無條件捨去 (與 int() 相同，往零取整)
+            lots = np.trunc(investment / (entry_price * 1000))
+            valid = (entry_price != 0) & (lots >= 1)
+            shares = lots[valid].astype(np.int64) * 1000
+        else:
+            valid = entry_price != 0
+            shares = investment / entry_price[valid]
+
+    entry_price = entry_price[valid]
+    if mode == "整張計算":
+        actual_investment = (shares / 1000) * entry_price * 1000
+    else:
+        actual_investment = shares * entry_price
+
+    return trades_frame(df.loc[valid], shares, actual_investment, costs)
+
+
+def trades_frame(kept, shares, invested, costs=None):
+    """由成交的報表列與股數組出交易表 (calculate_trades 與 simulate_portfolio 共用)
+
+    有 costs 時損益為扣除手續費、稅與滑價後的淨損益，報酬率 = 淨損益 / 投入金額，
+    '交易成本' 欄為毛損益與淨損益的差額。
+    """
+    entry_price = kept['進場價格'].to_numpy(dtype=float)
+    exit_price = kept['出場價格'].to_numpy(dtype=float)
+    entry_time = kept['進場時間'].reset_index(drop=True)
+    exit_time = kept['出場時間'].reset_index(drop=True)
+
+    gross_pnl = shares * (exit_price - entry_price)
+    costs = resolve_costs(costs)
+    if costs is None:
+        pnl = gross_pnl
+        pnl_pct = (exit_price - entry_price) / entry_price
+    else:
+        buy_price, sell_price, fees = trade_costs(entry_price, exit_price, shares,
+                                                  is_day_trade(entry_time, exit_time), costs)
+        pnl = shares * (sell_price - buy_price) - fees
+        pnl_pct = pnl / invested
+
+    return pd.DataFrame({
+        '商品名稱': kept['商品名稱'].reset_index(drop=True),
+        '商品代碼': kept['商品代碼'].reset_index(drop=True),
+        '進場時間': entry_time,
+        '出場時間': exit_time,
+        '進場價格': entry_price,
+        '出場價格': exit_price,
+        '股數': shares,
+        '投入金額': invested,
+        '損益': pnl,
+        '報酬率': pnl_pct,
+        '交易成本': gross_pnl - pnl,
+        '持有天數': (exit_time - entry_time).dt.days
+    })
@@ -0,0 +1,9 @@
+# run_batch.py
+# 批次分析整個目錄的 XQ 回測報表 (不啟動 Streamlit)
+# 用法: python run_batch.py 報表目錄 -o summary.csv --mc-simulations 1000
+import sys
+
+from backtest_engine.cli import main
+
+if __name__ == '__main__':
+    sys.exit(main())
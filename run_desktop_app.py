@@ -1,3 +1,4 @@
+import multiprocessing
 import threading
 import subprocess
 import time
@@ -63,6 +64,9 @@ def on_closed():
 
 # 3. 主執行邏輯
 if __name__ == '__main__':
+    # 打包後的執行檔需要此設定，蒙地卡羅的平行運算子程序才能正確啟動
+    multiprocessing.freeze_support()
+
     # 設置全域變數
     streamlit_process = None
 
@@ -0,0 +1,104 @@
+"""Streamlit 介面的整合測試 (streamlit.testing.AppTest)"""
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from streamlit.testing.v1 import AppTest
+
+APP_DIR = Path(__file__).resolve().parent.parent
+COSTS = {'commission_discount': 0.6, 'tax_rate': 0.003, 'slippage_ticks': 1}
+PORTFOLIO = {'capital': 1000000, 'sizing': 'fixed', 'on_shortfall': 'skip'}
+
+
+def make_report(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    entry_price = np.round(rng.uniform(10, 90, n), 2)
+    exit_price = np.round(entry_price * rng.uniform(0.9, 1.1, n), 2)
+    entry_time = pd.Timestamp('2023-01-02 09:00') + pd.to_timedelta(rng.integers(0, 300, n), unit='D')
+    exit_time = entry_time + pd.to_timedelta(rng.integers(1, 15, n), unit='D')
+    return pd.DataFrame({
+        '商品名稱': pd.Categorical([f"股票{i % 17}" for i in range(n)]),
+        '商品代碼': pd.Categorical([str(1100 + i % 17) for i in range(n)]),
+        '進場時間': entry_time,
+        '進場價格': entry_price,
+        '出場時間': exit_time,
+        '出場價格': exit_price,
+    })
+
+
+def analysis_app(monkeypatch, portfolio=None, costs=None):
+    """已上傳報表並確認參數的 App"""
+    monkeypatch.chdir(APP_DIR)
+    at = AppTest.from_file(str(APP_DIR / 'app.py'), default_timeout=60)
+    at.session_state['uploaded'] = True
+    at.session_state['params_confirmed'] = True
+    at.session_state['df'] = make_report()
+    at.session_state['file_hash'] = 'test-report'
+    at.session_state['investment_amount'] = 100000
+    at.session_state['calc_mode'] = '整張計算'
+    at.session_state['portfolio'] = portfolio
+    at.session_state['costs'] = costs
+    return at.run()
+
+
+def run_until_idle(at, cancel_key, timeout=30):
+    """重新執行直到背景工作結束 (取消按鈕消失)"""
+    deadline = time.time() + timeout
+    while [button for button in at.button if button.key == cancel_key]:
+        assert time.time() < deadline, "背景工作逾時"
+        time.sleep(0.2)
+        at.run()
+    return at
+
+
+@pytest.mark.parametrize('portfolio, costs', [(None, None), (None, COSTS), (PORTFOLIO, None), (PORTFOLIO, COSTS)])
+def test_monte_carlo(monkeypatch, portfolio, costs):
+    at = analysis_app(monkeypatch, portfolio, costs)
+    assert not at.exception
+
+    at.button(key='mc_start_button').click().run()
+    run_until_idle(at, 'mc_cancel_button')
+    assert not at.exception
+    assert any(metric.label == "📉 MDD 中位數" for metric in at.metric)
+
+
+def test_top_reupload_resets_monte_carlo(monkeypatch):
+    at = analysis_app(monkeypatch)
+    at.button(key='mc_start_button').click().run()
+    run_until_idle(at, 'mc_cancel_button')
+    assert at.session_state['mc_summary'] is not None
+
+    at.button(key='top_upload_btn').click().run()
+    assert not at.exception
+    assert not at.session_state['mc_triggered']
+    assert at.session_state['mc_summary'] is None
+    assert not at.session_state['uploaded']
+
+
+def test_streaming_summary_from_spooled_file(monkeypatch, tmp_path):
+    """超大型報表以暫存檔串流分析；重新上傳時刪除暫存檔"""
+    from test_streaming import make_report_csv
+
+    path = tmp_path / 'spooled.csv'
+    path.write_bytes(make_report_csv())
+    monkeypatch.chdir(APP_DIR)
+    at = AppTest.from_file(str(APP_DIR / 'app.py'), default_timeout=60)
+    at.session_state['uploaded'] = True
+    at.session_state['params_confirmed'] = True
+    at.session_state['report_path'] = str(path)
+    at.session_state['file_hash'] = 'spooled-report'
+    at.session_state['investment_amount'] = 100000
+    at.session_state['calc_mode'] = '整張計算'
+    at.session_state['costs'] = None
+    at.run()
+    run_until_idle(at, 'stream_cancel_button')
+    assert not at.exception
+    assert any(metric.label == "📝 交易次數" for metric in at.metric)
+
+    next(button for button in at.sidebar.button if button.label == "📤 重新上傳").click().run()
+    assert not at.exception
+    assert at.session_state['report_path'] is None
+    assert not path.exists()
@@ -0,0 +1,52 @@
+"""批次命令列工具"""
+import sys
+
+import pandas as pd
+import pytest
+
+from backtest_engine.cli import main, run_batch
+from test_streaming import make_report_csv
+
+
+def test_batch_writes_summary(tmp_path):
+    (tmp_path / 'a.csv').write_bytes(make_report_csv(seed=1))
+    (tmp_path / 'b.csv').write_bytes(make_report_csv(seed=2))
+    output = tmp_path / 'out' / 'summary.csv'
+    output.parent.mkdir()
+
+    assert main([str(tmp_path), '-o', str(output), '--workers', '1']) == 0
+    summary = pd.read_csv(output)
+    assert summary['檔名'].tolist() == ['a.csv', 'b.csv']
+
+
+def test_parquet_without_engine_fails_before_analysis(tmp_path, monkeypatch):
+    (tmp_path / 'a.csv').write_bytes(make_report_csv())
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    monkeypatch.setitem(sys.modules, 'fastparquet', None)
+
+    analyzed = []
+    monkeypatch.setattr('backtest_engine.cli.run_batch', lambda *args, **kwargs: analyzed.append(args))
+    with pytest.raises(SystemExit):
+        main([str(tmp_path), '-o', str(tmp_path / 'summary.parquet')])
+    assert not analyzed
+
+
+def test_missing_output_directory(tmp_path):
+    (tmp_path / 'a.csv').write_bytes(make_report_csv())
+    with pytest.raises(SystemExit):
+        main([str(tmp_path), '-o', str(tmp_path / 'missing' / 'summary.csv')])
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_analysis_errors_are_recorded_per_report(tmp_path, workers):
+    (tmp_path / 'a.csv').write_bytes(make_report_csv(seed=1))
+    (tmp_path / 'b.csv').write_bytes(make_report_csv(seed=2))
+    (tmp_path / 'c.csv').write_bytes('商品名稱,商品代碼\n台積電,2330\n'.encode('utf-8'))
+    # 收盤價表的索引不是日期：讀取成功，計算逐日市值權益時才出錯
+    prices = pd.DataFrame({'2000': [1.0]}, index=['not a date'])
+
+    summary = run_batch(sorted(tmp_path.glob('*.csv')), 100000, "整張計算", n_workers=workers, prices=prices)
+    assert summary['檔名'].tolist() == ['a.csv', 'b.csv', 'c.csv']
+    assert summary['錯誤'].notna().all()
+    assert "缺少必要欄位" in summary.loc[2, '錯誤']
+    assert summary.loc[0, '錯誤'].startswith("TypeError")
@@ -0,0 +1,61 @@
+"""台股交易成本 (手算案例)"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_engine import resolve_costs, tick_size, trade_costs
+from backtest_engine.costs import commission, fill_prices, is_day_trade, transaction_tax
+
+COSTS = resolve_costs({'commission_discount': 0.6})
+
+
+@pytest.mark.parametrize('price, tick', [
+    (0.5, 0.01), (9.99, 0.01), (10, 0.05), (49.95, 0.05), (50, 0.1), (99.9, 0.1), (100, 0.5),
+    (499.5, 0.5), (500, 1), (999, 1), (1000, 5), (5000, 5),
+])
+def test_tick_size_at_band_edges(price, tick):
+    assert tick_size(price) == tick
+    assert tick_size(np.array([price]))[0] == tick
+
+
+def test_fill_prices():
+    costs = resolve_costs({'slippage_ticks': 2})
+    buy, sell = fill_prices(np.array([9.99, 10, 499.5, 1000]), np.array([50, 10, 0.01, 1000]), costs)
+    # 跳動單位依原價格的級距：9.99 + 2 × 0.01、50 - 2 × 0.1 (不因滑價跨到下一級距而改變)
+    np.testing.assert_allclose(buy, [10.01, 10.1, 500.5, 1010])
+    np.testing.assert_allclose(sell, [49.8, 9.9, 0, 990])
+
+    entry, exit_ = np.array([10.0]), np.array([11.0])
+    assert fill_prices(entry, exit_, resolve_costs({}))[0] is entry
+
+
+def test_commission():
+    # 100000 × 0.1425% × 6 折 = 85.5 → 85；10000 → 8.55，不足最低 20 元；金額 0 不收
+    np.testing.assert_array_equal(commission(np.array([100000, 10000, 0]), COSTS), [85, 20, 0])
+
+
+def test_transaction_tax():
+    amounts = np.array([100000, 100000, 33333])
+    day_trade = np.array([False, True, False])
+    # 0.3%、當沖 0.15%，無條件捨去至元
+    np.testing.assert_array_equal(transaction_tax(amounts, day_trade, COSTS), [300, 150, 99])
+
+
+def test_is_day_trade():
+    entry = pd.to_datetime(['2024-01-02 09:00', '2024-01-02 23:59', '2024-01-02 09:00'])
+    exit_ = pd.to_datetime(['2024-01-02 13:30', '2024-01-03 00:00', '2024-01-05 13:30'])
+    assert is_day_trade(entry, exit_).tolist() == [True, False, False]
+
+
+def test_trade_costs():
+    costs = resolve_costs({'commission_discount': 0.6, 'slippage_ticks': 1})
+    buy, sell, fees = trade_costs(np.array([100.0]), np.array([110.0]), np.array([1000.0]), np.array([False]), costs)
+    # 買進 100.5 × 1000：手續費 85；賣出 109.5 × 1000：手續費 93、證交稅 328
+    assert buy[0] == 100.5
+    assert sell[0] == 109.5
+    assert fees[0] == 85 + 93 + 328
+
+
+def test_unknown_cost_setting():
+    with pytest.raises(ValueError, match="未知的成本設定"):
+        resolve_costs({'commision_rate': 0.001})
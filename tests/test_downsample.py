@@ -0,0 +1,73 @@
+"""LTTB 降採樣與標準逐區間版本的一致性"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_engine import downsample, lttb_indices
+
+
+def reference_lttb(x, y, threshold):
+    """Steinarsson (2013) 的逐點 LTTB，回傳選出的索引"""
+    n = len(y)
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    prev = 0
+
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        if i == threshold - 3:
+            avg_start, avg_end = n - 1, n
+        avg_x = np.mean(x[avg_start:avg_end])
+        avg_y = np.mean(y[avg_start:avg_end])
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        best_area, best = -1, start
+        for j in range(start, end):
+            area = abs((x[prev] - avg_x) * (y[j] - y[prev]) - (x[prev] - x[j]) * (avg_y - y[prev]))
+            if area > best_area:
+                best_area, best = area, j
+        selected.append(best)
+        prev = best
+
+    selected.append(n - 1)
+    return np.array(selected)
+
+
+@pytest.mark.parametrize('n, threshold', [(1000, 100), (5003, 250), (257, 3), (10000, 2000)])
+def test_lttb_matches_reference(n, threshold):
+    rng = np.random.default_rng(n)
+    x = np.cumsum(rng.uniform(0.5, 2.0, n))
+    y = np.cumsum(rng.normal(size=n))
+
+    indices = lttb_indices(x, y, threshold)
+    np.testing.assert_array_equal(indices, reference_lttb(x, y, threshold))
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert len(indices) == threshold
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_keeps_extremes_of_datetime_series():
+    x = pd.date_range('2020-01-01', periods=5000, freq='h').to_numpy()
+    y = np.zeros(5000)
+    y[1234] = 100
+    y[3210] = -100
+    indices = lttb_indices(x, y, 200)
+    assert 1234 in indices and 3210 in indices
+
+
+@pytest.mark.parametrize('n', [0, 1, 50, 100])
+def test_short_series_pass_through(n):
+    y = np.arange(n, dtype=float)
+    np.testing.assert_array_equal(lttb_indices(np.arange(n), y, 100), np.arange(n))
+
+    df = pd.DataFrame({'x': np.arange(n), 'y': y})
+    assert downsample(df, 'x', 'y', 100) is df
+
+
+def test_downsample_keeps_other_columns():
+    df = pd.DataFrame({'x': np.arange(500), 'y': np.sin(np.arange(500) / 10), 'label': np.arange(500) * 2})
+    result = downsample(df, 'x', 'y', 50)
+    assert len(result) == 50
+    assert (result['label'] == result['x'] * 2).all()
@@ -0,0 +1,80 @@
+"""逐日市值權益 (手算案例)"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_engine import calculate_daily_equity
+
+
+def make_trades(rows):
+    """rows: (商品代碼, 進場日, 出場日, 股數, 進場價格, 損益)"""
+    return pd.DataFrame({
+        '商品代碼': [row[0] for row in rows],
+        '進場時間': pd.to_datetime([row[1] for row in rows]) + pd.Timedelta(hours=9),
+        '出場時間': pd.to_datetime([row[2] for row in rows]) + pd.Timedelta(hours=13),
+        '股數': [float(row[3]) for row in rows],
+        '進場價格': [float(row[4]) for row in rows],
+        '損益': [float(row[5]) for row in rows],
+    })
+
+
+def test_linear_ramp_without_prices():
+    trades_df = make_trades([('2330', '2024-01-01', '2024-01-05', 1000, 100, 400)])
+    equity = calculate_daily_equity(trades_df, freq='D')
+
+    assert equity['日期'].tolist() == list(pd.date_range('2024-01-01', '2024-01-05'))
+    np.testing.assert_allclose(equity['累積損益'], [0, 100, 200, 300, 400])
+    np.testing.assert_allclose(equity['已實現損益'], [0, 0, 0, 0, 400])
+
+
+def test_business_days():
+    """週五進場、下週三出場為 4 個營業日；週六進場的交易歸入下週一"""
+    trades_df = make_trades([
+        ('2330', '2024-01-05', '2024-01-10', 1000, 100, 300),
+        ('2454', '2024-01-06', '2024-01-08', 1000, 100, 50),
+    ])
+    equity = calculate_daily_equity(trades_df, freq='B')
+
+    assert equity['日期'].tolist() == list(pd.to_datetime(['2024-01-05', '2024-01-08', '2024-01-09', '2024-01-10']))
+    np.testing.assert_allclose(equity['累積損益'], [0, 150, 250, 350])
+    np.testing.assert_allclose(equity['已實現損益'], [0, 50, 50, 350])
+
+
+def test_mark_to_market_with_prices():
+    """有收盤價的交易以收盤價計算未實現損益 (缺價日沿用前一日)，其餘交易線性內插"""
+    trades_df = make_trades([
+        ('2330', '2024-01-01', '2024-01-04', 1000, 100, 10000),
+        ('2454', '2024-01-01', '2024-01-03', 1000, 50, 200),
+    ])
+    prices = pd.DataFrame({'2330': [102.0, 98.0, 105.0]},
+                          index=pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-04']))
+    equity = calculate_daily_equity(trades_df, prices, freq='D')
+
+    # 2330: 1000 × (102 - 100)、(98 - 100)、(98 - 100)，出場日認列 10000；2454: 0、100、200
+    np.testing.assert_allclose(equity['累積損益'], [2000, -1900, -1800, 10200])
+    np.testing.assert_allclose(equity['已實現損益'], [0, 0, 200, 10200])
+
+
+def test_mark_to_market_in_batches(monkeypatch):
+    """展開的 (交易 × 持有日) 元素分批計算，結果與一次計算相同"""
+    rng = np.random.default_rng(0)
+    n = 60
+    entry = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 40, n), unit='D')
+    rows = [(str(2000 + i % 3), e, e + pd.Timedelta(days=int(d)), 1000, 50, p)
+            for i, (e, d, p) in enumerate(zip(entry, rng.integers(0, 15, n), rng.normal(0, 1000, n)))]
+    trades_df = make_trades(rows)
+    dates = pd.date_range('2024-01-01', periods=60)
+    prices = pd.DataFrame(rng.uniform(45, 55, (60, 2)), index=dates, columns=['2000', '2001'])
+
+    expected = calculate_daily_equity(trades_df, prices, freq='D')
+    monkeypatch.setattr('backtest_engine.equity.MTM_CHUNK_ELEMENTS', 7)
+    batched = calculate_daily_equity(trades_df, prices, freq='D')
+    np.testing.assert_allclose(batched['累積損益'], expected['累積損益'])
+
+    # 最終權益即全部已實現損益
+    assert expected['累積損益'].iloc[-1] == pytest.approx(trades_df['損益'].sum())
+
+
+def test_unsupported_frequency():
+    with pytest.raises(ValueError, match="不支援的頻率"):
+        calculate_daily_equity(make_trades([('2330', '2024-01-01', '2024-01-02', 1000, 100, 0)]), freq='M')
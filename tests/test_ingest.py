@@ -0,0 +1,36 @@
+"""回測報表的讀取"""
+import io
+
+import pytest
+
+from backtest_engine import ingest, read_report
+
+HEADER = '商品名稱,商品代碼,序號,進場時間,進場方向,進場價格,出場時間,出場方向,出場價格\n'
+ROWS = ('台積電,2330,1,2024/01/02 09:00,買進,580.5,2024/01/05 13:30,賣出,590\n'
+        '聯發科,2454,2,2024/01/03 09:00,買進,900,2024/01/10 13:30,賣出,880.5\n')
+
+
+@pytest.mark.parametrize('encoding', ['utf-8', 'utf-8-sig', 'cp950', 'gbk', 'gb18030'])
+def test_read_report(encoding):
+    df = read_report(io.BytesIO((HEADER + ROWS).encode(encoding)))
+    assert len(df) == 2
+    assert df['商品名稱'].tolist() == ['台積電', '聯發科']
+    assert df['進場價格'].tolist() == [580.5, 900.0]
+    assert str(df['出場時間'].iloc[1]) == '2024-01-10 13:30:00'
+
+
+def test_header_mismatch_tries_next_encoding(monkeypatch):
+    """cp950 檔案也能以 gb18030 解碼 (欄位名稱為亂碼)，應改用下一個候選編碼"""
+    monkeypatch.setattr(ingest, 'CANDIDATE_ENCODINGS', ('gb18030', 'cp950'))
+    df = read_report(io.BytesIO((HEADER + ROWS).encode('cp950')))
+    assert df['商品名稱'].tolist() == ['台積電', '聯發科']
+
+
+def test_header_only_report():
+    with pytest.raises(ValueError, match="沒有任何交易資料"):
+        read_report(io.BytesIO(HEADER.encode('utf-8')))
+
+
+def test_missing_columns():
+    with pytest.raises(ValueError, match="缺少必要欄位"):
+        read_report(io.BytesIO('商品名稱,商品代碼\n台積電,2330\n'.encode('utf-8')))
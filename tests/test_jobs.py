@@ -0,0 +1,69 @@
+"""背景工作執行器"""
+import time
+
+import pytest
+
+from backtest_engine.jobs import JobRunner
+
+
+def wait(job):
+    job.future.exception()
+    return job
+
+
+def test_take_hands_over_result():
+    runner = JobRunner(max_workers=1)
+    job = wait(runner.submit('key', lambda n, progress_callback: list(range(n)), 3))
+    assert job.status == 'done'
+
+    assert runner.take('key') == [0, 1, 2]
+    assert runner.get('key') is None
+
+
+def test_failed_job_keeps_only_status():
+    def fail_with_payload(payload, progress_callback):
+        raise ValueError("壞掉了")
+
+    runner = JobRunner(max_workers=1)
+    job = wait(runner.submit('key', fail_with_payload, bytearray(1024)))
+    assert job.status == 'failed'
+    assert isinstance(job.exception(), ValueError)
+    # 例外的 traceback 不再留住工作函數的區域變數 (例如傳入的報表)
+    tb = job.exception().__traceback__
+    while tb is not None:
+        assert 'payload' not in tb.tb_frame.f_locals
+        tb = tb.tb_next
+    with pytest.raises(ValueError):
+        job.result()
+
+
+def fail(progress_callback):
+    raise ValueError("壞掉了")
+
+
+def test_failed_history_is_bounded():
+    runner = JobRunner(max_workers=1, max_history=2)
+    for i in range(5):
+        wait(runner.submit(i, fail))
+    runner.submit('last', fail)
+    assert len(runner._jobs) <= 3
+
+
+def test_untaken_result_survives_other_submits():
+    """其他 session 送出的工作不會移除尚未取出的結果"""
+    runner = JobRunner(max_workers=1, max_history=1)
+    wait(runner.submit('mine', lambda progress_callback: 'result'))
+    for i in range(10):
+        wait(runner.submit(i, fail))
+    assert runner.take('mine') == 'result'
+
+
+def test_take_missing_job():
+    runner = JobRunner(max_workers=1, result_ttl=0)
+    assert runner.take('missing') is None
+
+    wait(runner.submit('old', lambda progress_callback: 'result'))
+    time.sleep(0.01)
+    # 逾期未取出的結果在下一次送出工作時移除，take 回傳 None 讓呼叫端重新送出
+    wait(runner.submit('new', lambda progress_callback: None))
+    assert runner.take('old') is None
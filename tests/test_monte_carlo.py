@@ -0,0 +1,96 @@
+"""蒙地卡羅統計量"""
+import multiprocessing
+import time
+
+import numpy as np
+import pytest
+
+from backtest_engine import simulate_paths, simulate_summary, simulate_summary_parallel
+from backtest_engine.monte_carlo import longest_run
+
+
+def reference_longest_run(row):
+    longest = current = 0
+    for value in row:
+        current = current + 1 if value else 0
+        longest = max(longest, current)
+    return longest
+
+
+@pytest.mark.parametrize('shape, p', [((40, 200), 0.5), ((10, 1), 0.5), ((5, 30), 0.0), ((5, 30), 1.0),
+                                      ((20, 100), 0.95)])
+def test_longest_run(shape, p):
+    mask = np.random.default_rng(0).random(shape) < p
+    assert longest_run(mask).tolist() == [reference_longest_run(row) for row in mask]
+
+
+@pytest.mark.parametrize('method', ['iid', 'block', 'stationary'])
+def test_summary_matches_paths(method):
+    pnl = np.random.default_rng(1).normal(5, 100, 300)
+    paths = simulate_paths(pnl, 50, seed=7, method=method, chunk_bytes=4096).astype(float)
+    summary = simulate_summary(pnl, 50, seed=7, n_sample_paths=3, method=method, chunk_bytes=4096)
+
+    np.testing.assert_allclose(summary['final_pnl'], paths[:, -1], rtol=1e-5)
+    peak = np.maximum(np.maximum.accumulate(paths, axis=1), 0)
+    np.testing.assert_allclose(summary['max_drawdown'], (paths - peak).min(axis=1), rtol=1e-4, atol=1e-2)
+    np.testing.assert_allclose(summary['sample_paths'], paths[:3], rtol=1e-5)
+    losing = np.diff(paths, axis=1, prepend=0) < 0
+    assert summary['longest_losing_streak'].tolist() == [reference_longest_run(row) for row in losing]
+
+
+def test_sample_paths_on_step_grid():
+    """樣本曲線只記錄 path_steps 的步數，大小與交易筆數無關"""
+    pnl = np.random.default_rng(2).normal(5, 100, 5000)
+    paths = simulate_paths(pnl, 20, seed=3, chunk_bytes=4096 * 64).astype(float)
+    summary = simulate_summary(pnl, 20, seed=3, n_sample_paths=4, chunk_bytes=4096 * 64, n_path_steps=100)
+
+    steps = summary['path_steps']
+    assert len(steps) == 100
+    assert steps[0] == 0 and steps[-1] == len(pnl) - 1
+    assert summary['sample_paths'].shape == (4, 100)
+    np.testing.assert_allclose(summary['sample_paths'], paths[:4, steps], rtol=1e-5)
+
+
+def test_no_trades():
+    summary = simulate_summary([], 20, seed=1, n_sample_paths=5, n_band_steps=10)
+    for key in ('final_pnl', 'max_drawdown', 'longest_losing_streak', 'recovery_trades'):
+        assert summary[key].shape == (20,)
+        assert (summary[key] == 0).all()
+    assert summary['sample_paths'].shape == (5, 0)
+    assert summary['path_steps'].shape == (0,)
+
+    parallel = simulate_summary_parallel([], 20, seed=1, n_workers=2)
+    assert (parallel['final_pnl'] == 0).all()
+    assert simulate_paths([], 5, seed=1).shape == (5, 0)
+
+
+def test_parallel_is_reproducible():
+    pnl = np.random.default_rng(3).normal(5, 100, 400)
+    kwargs = dict(seed=11, n_sample_paths=5, chunk_bytes=400 * 8 * 7, n_workers=2, n_band_steps=20)
+    first = simulate_summary_parallel(pnl, 60, **kwargs)
+    second = simulate_summary_parallel(pnl, 60, **kwargs)
+
+    for key in ('final_pnl', 'max_drawdown', 'longest_losing_streak', 'recovery_trades', 'band_values',
+                'sample_paths'):
+        np.testing.assert_array_equal(first[key], second[key])
+    assert first['sample_paths'].shape == (5, 400)
+    # 每條路徑的最終損益等於其扇形圖最後一步
+    np.testing.assert_allclose(first['final_pnl'], first['band_values'][:, -1], rtol=1e-5)
+
+
+def test_parallel_cancel_stops_remaining_work():
+    class Cancelled(Exception):
+        pass
+
+    def cancel(done, total):
+        raise Cancelled()
+
+    pnl = np.random.default_rng(4).normal(5, 100, 20000)
+    start = time.perf_counter()
+    with pytest.raises(Cancelled):
+        # 全部跑完需十秒以上；取消後只等正在執行的一小批
+        simulate_summary_parallel(pnl, 20000, seed=1, chunk_bytes=20000 * 8 * 4, n_workers=2,
+                                  progress_callback=cancel)
+    assert time.perf_counter() - start < 10
+    # 子程序已結束，不會在背景繼續佔用 CPU
+    assert not multiprocessing.active_children()
@@ -0,0 +1,126 @@
+"""帳戶資金限制模擬"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_engine import calculate_trades, simulate_portfolio
+
+DAY = pd.Timestamp('2024-01-01 09:00')
+
+
+def make_report(rows):
+    """rows: (進場日, 進場價格, 出場日, 出場價格)，日為 DAY 之後的天數"""
+    return pd.DataFrame({
+        '商品名稱': [f"股票{i}" for i in range(len(rows))],
+        '商品代碼': [str(2000 + i) for i in range(len(rows))],
+        '進場時間': [DAY + pd.Timedelta(days=row[0]) for row in rows],
+        '進場價格': [float(row[1]) for row in rows],
+        '出場時間': [DAY + pd.Timedelta(days=row[2]) for row in rows],
+        '出場價格': [float(row[3]) for row in rows],
+    })
+
+
+# A 佔用 60000；B 進場時現金只剩 40000；A 在 C 進場前出場
+REPORT = make_report([(0, 10, 4, 12), (1, 10, 2, 11), (5, 20, 6, 20)])
+
+
+def test_fixed_skip():
+    trades_df, summary = simulate_portfolio(REPORT, 100000, 60000, "股數計算")
+    assert trades_df['商品名稱'].tolist() == ['股票0', '股票2']
+    assert trades_df['股數'].tolist() == [6000, 3000]
+    assert summary['n_skipped'] == 1
+    assert summary['final_equity'] == pytest.approx(112000)
+    assert summary['min_cash'] == pytest.approx(40000)
+
+
+def test_fixed_scale():
+    trades_df, summary = simulate_portfolio(REPORT, 100000, 60000, "股數計算", on_shortfall='scale')
+    # B 以剩餘的 40000 買 4000 股，獲利 4000
+    assert trades_df['股數'].tolist() == [6000, 4000, 3000]
+    assert summary['n_scaled'] == 1
+    assert summary['final_equity'] == pytest.approx(116000)
+    assert summary['min_cash'] == pytest.approx(0)
+
+
+def test_compound():
+    trades_df, summary = simulate_portfolio(REPORT, 100000, 60000, "股數計算", sizing='compound')
+    # C 進場時已實現權益 112000，目標金額 60000 × 1.12
+    assert trades_df['投入金額'].tolist() == pytest.approx([60000, 67200])
+    assert summary['final_equity'] == pytest.approx(112000)
+
+
+def test_exit_at_entry_time_is_not_available():
+    """同一時間點出場的資金不能用於該時間點的進場；晚一天才能使用"""
+    same_time = make_report([(0, 10, 3, 10), (3, 10, 4, 10)])
+    _, summary = simulate_portfolio(same_time, 100000, 60000, "股數計算")
+    assert summary['n_executed'] == 1
+
+    next_day = make_report([(0, 10, 3, 10), (4, 10, 5, 10)])
+    _, summary = simulate_portfolio(next_day, 100000, 60000, "股數計算")
+    assert summary['n_executed'] == 2
+
+
+def test_costs_whole_lots():
+    """整張計算含手續費與證交稅的現金流 (手算)"""
+    report = make_report([(0, 25, 3, 30)])
+    trades_df, summary = simulate_portfolio(report, 100000, 50000, "整張計算", costs={})
+    # 買進 2000 股 = 50000 + 手續費 71；賣出 60000 - 手續費 85 - 證交稅 180
+    assert trades_df['股數'].tolist() == [2000]
+    assert summary['final_equity'] == pytest.approx(100000 + 59735 - 50071)
+    assert trades_df['損益'].tolist() == pytest.approx([59735 - 50071])
+
+
+def test_unaffordable_lot():
+    report = make_report([(0, 600, 1, 610)])
+    trades_df, summary = simulate_portfolio(report, 1000000, 100000, "整張計算")
+    assert len(trades_df) == 0
+    assert summary['n_unaffordable'] == 1
+
+
+def reference_portfolio(df, capital, investment, sizing):
+    """以串列逐一掃描持倉 (不使用堆積) 的版本，不計成本、資金不足時略過"""
+    order = np.argsort(df['進場時間'].to_numpy(), kind='stable')
+    cash = equity = float(capital)
+    open_positions = []
+    executed = []
+    for idx in order:
+        row = df.iloc[idx]
+        for position in [p for p in open_positions if p[0] < row['進場時間']]:
+            open_positions.remove(position)
+            cash += position[1]
+            equity += position[1] - position[2]
+
+        target = investment * equity / capital if sizing == 'compound' else investment
+        shares = target / row['進場價格']
+        cost = shares * row['進場價格']
+        if cost > cash + 1e-6:
+            continue
+        cash -= cost
+        open_positions.append((row['出場時間'], shares * row['出場價格'], cost))
+        executed.append(idx)
+
+    equity += sum(position[1] - position[2] for position in open_positions)
+    return sorted(executed), equity
+
+
+@pytest.mark.parametrize('sizing', ['fixed', 'compound'])
+def test_matches_reference(sizing):
+    rng = np.random.default_rng(5)
+    n = 200
+    entry = rng.integers(0, 300, n)
+    entry_price = np.round(rng.uniform(10, 200, n), 2)
+    report = make_report(list(zip(entry, entry_price, entry + rng.integers(0, 20, n),
+                                  np.round(entry_price * rng.uniform(0.8, 1.25, n), 2))))
+
+    trades_df, summary = simulate_portfolio(report, 1000000, 150000, "股數計算", sizing=sizing)
+    executed, equity = reference_portfolio(report, 1000000, 150000, sizing)
+    assert sorted(trades_df['商品名稱'].tolist()) == sorted(report['商品名稱'].iloc[executed].tolist())
+    assert summary['final_equity'] == pytest.approx(equity)
+    assert 0 < summary['n_skipped'] < n
+
+
+def test_unlimited_capital_matches_calculate_trades():
+    report = make_report([(0, 10, 4, 12), (1, 10, 2, 11), (5, 20, 6, 20)])
+    trades_df, _ = simulate_portfolio(report, 1e12, 60000, "整張計算")
+    expected = calculate_trades(report, 60000, "整張計算")
+    np.testing.assert_allclose(trades_df['損益'], expected['損益'])
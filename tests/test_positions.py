@@ -0,0 +1,120 @@
+"""持倉計算與原本逐日/逐筆版本的一致性"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_engine import build_position_events, calculate_concurrent_holdings, calculate_max_concurrent_positions
+
+
+def reference_concurrent_holdings(trades_df, freq):
+    """差分陣列之前的逐期版本：進場與出場所在的期間都算持有"""
+    if freq == 'W':
+        entry = trades_df['進場時間'].dt.to_period('W')
+        exit_ = trades_df['出場時間'].dt.to_period('W')
+        periods = pd.period_range(entry.min(), exit_.max(), freq='W')
+        labels = periods.to_timestamp()
+    else:
+        entry = trades_df['進場時間'].dt.floor(freq)
+        exit_ = trades_df['出場時間'].dt.floor(freq)
+        periods = labels = pd.date_range(entry.min(), exit_.max(), freq=freq)
+
+    holdings = []
+    for period in periods:
+        holding_positions = trades_df[(entry <= period) & (exit_ >= period)]
+        holdings.append(holding_positions['投入金額'].sum())
+
+    return pd.DataFrame({'日期': labels, '持有金額': holdings})
+
+
+def reference_max_concurrent_positions(trades_df):
+    """排序事件之前的逐筆版本，另外記錄發生時間與部位數"""
+    events = []
+    for idx, row in trades_df.iterrows():
+        events.append((row['進場時間'], row['投入金額'], 'enter'))
+        events.append((row['出場時間'], row['投入金額'], 'exit'))
+    events.sort(key=lambda x: (x[0], 0 if x[2] == 'enter' else 1))
+
+    current_amount = 0
+    current_positions = 0
+    max_amount = 0
+    max_time = None
+    max_positions = 0
+    for time, amount, action in events:
+        if action == 'enter':
+            current_amount += amount
+            current_positions += 1
+            if current_amount > max_amount:
+                max_amount = current_amount
+                max_time = time
+            max_positions = max(max_positions, current_positions)
+        else:
+            current_amount -= amount
+            current_positions -= 1
+
+    return max_amount, max_time, max_positions
+
+
+def make_trades(n=300, seed=0):
+    """隨機交易 (整點進出場，會有同一時間點的進場與出場，也有當期進出)"""
+    rng = np.random.default_rng(seed)
+    entry_time = pd.Timestamp('2023-01-02 09:00') + pd.to_timedelta(rng.integers(0, 200 * 24, n), unit='h')
+    exit_time = entry_time + pd.to_timedelta(rng.integers(0, 20 * 24, n), unit='h')
+    return pd.DataFrame({
+        '進場時間': entry_time,
+        '出場時間': exit_time,
+        '投入金額': np.round(rng.uniform(10000, 500000, n), 0),
+    })
+
+
+@pytest.mark.parametrize('freq', ['D', 'W', 'h'])
+def test_concurrent_holdings(freq):
+    trades_df = make_trades()
+    result = calculate_concurrent_holdings(trades_df, freq)
+    expected = reference_concurrent_holdings(trades_df, freq)
+
+    assert result['日期'].tolist() == expected['日期'].tolist()
+    np.testing.assert_allclose(result['持有金額'], expected['持有金額'], atol=1e-6)
+
+
+def test_concurrent_holdings_skips_invalid_trades():
+    trades_df = make_trades(n=50)
+    invalid = trades_df.copy()
+    invalid.loc[0, '出場時間'] = invalid.loc[0, '進場時間'] - pd.Timedelta(days=1)
+    invalid.loc[1, '進場時間'] = pd.NaT
+
+    result = calculate_concurrent_holdings(invalid)
+    expected = reference_concurrent_holdings(trades_df.drop(index=[0, 1]), 'D')
+    assert result['日期'].tolist() == expected['日期'].tolist()
+    np.testing.assert_allclose(result['持有金額'], expected['持有金額'], atol=1e-6)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_max_concurrent_positions(seed):
+    trades_df = make_trades(seed=seed)
+    max_amount, max_time, max_positions = calculate_max_concurrent_positions(trades_df)
+    expected_amount, expected_time, expected_positions = reference_max_concurrent_positions(trades_df)
+
+    assert max_amount == pytest.approx(expected_amount)
+    assert max_time == expected_time
+    assert max_positions == expected_positions
+
+    # 共用事件陣列的結果相同
+    events = build_position_events(trades_df)
+    assert calculate_max_concurrent_positions(trades_df, events=events) == (max_amount, max_time, max_positions)
+
+
+def test_exit_and_entry_at_same_time():
+    """同一時間點先進場後出場：交棒的兩筆交易短暫同時持有"""
+    t = pd.Timestamp('2024-01-02 09:00')
+    trades_df = pd.DataFrame({
+        '進場時間': [t, t + pd.Timedelta(hours=1)],
+        '出場時間': [t + pd.Timedelta(hours=1), t + pd.Timedelta(hours=2)],
+        '投入金額': [100.0, 200.0],
+    })
+    assert calculate_max_concurrent_positions(trades_df) == (300.0, t + pd.Timedelta(hours=1), 2)
+
+
+def test_no_trades():
+    empty = pd.DataFrame({'進場時間': pd.to_datetime([]), '出場時間': pd.to_datetime([]), '投入金額': []})
+    assert calculate_max_concurrent_positions(empty) == (0, None, 0)
+    assert calculate_concurrent_holdings(empty).empty
@@ -0,0 +1,44 @@
+"""已解析報表的本機快取"""
+import io
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+from backtest_engine import load_cached_report, read_report, read_report_cached
+from backtest_engine.report_cache import cache_path
+
+REPORT = ('商品名稱,商品代碼,序號,進場時間,進場方向,進場價格,出場時間,出場方向,出場價格\n'
+          '台積電,2330,1,2024/01/02 09:00,買進,580.5,2024/01/05 13:30,賣出,590\n'
+          '聯發科,2454,2,2024/01/03 09:00,買進,900,2024/01/10 13:30,賣出,880.5\n').encode('utf-8')
+
+
+def test_round_trip(tmp_path):
+    expected = read_report(io.BytesIO(REPORT))
+    first = read_report_cached(io.BytesIO(REPORT), 'h1', cache_dir=tmp_path)
+    assert cache_path('h1', list(expected.columns), tmp_path).exists()
+
+    cached = load_cached_report('h1', list(expected.columns), tmp_path)
+    pd.testing.assert_frame_equal(cached, expected, check_categorical=False)
+    pd.testing.assert_frame_equal(first, expected)
+
+
+def test_touch_failure_does_not_break_reads(tmp_path, monkeypatch):
+    read_report_cached(io.BytesIO(REPORT), 'h2', cache_dir=tmp_path)
+
+    def utime(path, *args, **kwargs):
+        raise PermissionError(path)
+
+    monkeypatch.setattr(os, 'utime', utime)
+    df = read_report_cached(io.BytesIO(b''), 'h2', cache_dir=tmp_path)
+    assert len(df) == 2
+
+
+def test_missing_pyarrow_warns(tmp_path, monkeypatch):
+    """pyarrow 是必要套件；缺少時快取停用但要發出警告，讀取仍正常"""
+    monkeypatch.setitem(sys.modules, 'pyarrow.feather', None)
+    with pytest.warns(RuntimeWarning, match="pyarrow"):
+        df = read_report_cached(io.BytesIO(REPORT), 'h3', cache_dir=tmp_path)
+    assert len(df) == 2
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,87 @@
+"""串流分析與一次讀取的一致性"""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_engine import STREAM_MIN_BYTES, analyze_trades, read_report, stream_trades, stream_trades_file
+from backtest_engine.cli import analyze_file
+
+COSTS = {'commission_discount': 0.6, 'slippage_ticks': 1}
+
+
+def make_report_csv(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    entry_price = np.round(rng.uniform(5, 300, n), 2)
+    exit_price = np.round(entry_price * rng.uniform(0.85, 1.15, n), 2)
+    entry_time = pd.Timestamp('2023-01-02 09:00') + pd.to_timedelta(rng.integers(0, 400, n), unit='D')
+    exit_time = entry_time + pd.to_timedelta(rng.integers(0, 20, n), unit='D')
+    df = pd.DataFrame({
+        '商品名稱': [f"股票{i % 23}" for i in range(n)],
+        '商品代碼': [str(2000 + i % 23) for i in range(n)],
+        '序號': np.arange(1, n + 1),
+        '進場時間': entry_time.strftime('%Y/%m/%d %H:%M'),
+        '進場方向': '買進',
+        '進場價格': entry_price,
+        '出場時間': exit_time.strftime('%Y/%m/%d %H:%M'),
+        '出場方向': '賣出',
+        '出場價格': exit_price,
+    })
+    return df.to_csv(index=False).encode('utf-8')
+
+
+@pytest.mark.parametrize('mode', ["整張計算", "股數計算"])
+@pytest.mark.parametrize('costs', [None, COSTS])
+def test_stream_summary_matches_full_read(mode, costs):
+    data = make_report_csv()
+    analysis = analyze_trades(read_report(io.BytesIO(data)), 100000, mode, costs=costs)
+    trades_df = analysis['trades_df']
+
+    streamed, summary = stream_trades(io.BytesIO(data), 100000, mode, keep_trades=False, chunk_rows=64, costs=costs)
+    assert streamed is None
+    assert summary['n_trades'] == len(trades_df)
+    assert summary['total_pnl'] == pytest.approx(analysis['total_pnl'])
+    assert summary['total_costs'] == pytest.approx(analysis['total_costs'])
+    assert summary['total_return'] == pytest.approx(analysis['total_return'])
+    assert summary['win_rate'] == pytest.approx(analysis['win_rate'])
+    assert summary['profit_factor'] == pytest.approx(analysis['profit_factor'])
+
+    entry_analysis = trades_df.groupby(trades_df['進場時間'].dt.to_period('M'))['損益'].agg(['sum', 'count'])
+    np.testing.assert_allclose(summary['entry_analysis']['總損益'], entry_analysis['sum'])
+    assert summary['entry_analysis']['交易次數'].tolist() == entry_analysis['count'].tolist()
+
+
+def test_stream_keeps_trades():
+    data = make_report_csv()
+    expected = analyze_trades(read_report(io.BytesIO(data)), 100000, "股數計算")['trades_df']
+    trades_df, _ = stream_trades(io.BytesIO(data), 100000, "股數計算", chunk_rows=64)
+    pd.testing.assert_frame_equal(trades_df, expected, check_categorical=False)
+
+
+def test_cli_metrics_only(tmp_path):
+    path = tmp_path / 'report.csv'
+    path.write_bytes(make_report_csv())
+    full = analyze_file(path, 100000, "整張計算", costs=COSTS)
+    streamed = analyze_file(path, 100000, "整張計算", costs=COSTS, metrics_only=True)
+
+    assert '錯誤' not in streamed
+    assert '夏普值' not in streamed
+    for column, value in streamed.items():
+        if column != '檔名':
+            assert value == pytest.approx(full[column])
+
+
+def test_stream_trades_file(tmp_path):
+    path = tmp_path / 'report.csv'
+    path.write_bytes(make_report_csv())
+    _, expected = stream_trades(io.BytesIO(path.read_bytes()), 100000, "整張計算", keep_trades=False)
+    _, summary = stream_trades_file(path, 100000, "整張計算", keep_trades=False)
+    assert summary['n_trades'] == expected['n_trades']
+    assert summary['total_pnl'] == expected['total_pnl']
+
+
+def test_stream_threshold_below_upload_limit():
+    """超過門檻的上傳檔必須能通過 Streamlit 的上傳上限，串流分支才會執行"""
+    from streamlit import config
+    assert STREAM_MIN_BYTES < config.get_option('server.maxUploadSize') * 1024 ** 2
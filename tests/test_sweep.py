@@ -0,0 +1,46 @@
+"""參數掃描與逐點 analyze_trades 的一致性"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_engine import analyze_trades, sweep_parameters
+
+COSTS = {'commission_discount': 0.6, 'slippage_ticks': 1}
+
+
+def make_daily_report(n=600, seed=0):
+    """只有日期的報表 (XQ 日線回測)：大量交易在同一天出場"""
+    rng = np.random.default_rng(seed)
+    entry_price = np.round(rng.uniform(8, 400, n), 2)
+    exit_price = np.round(entry_price * rng.uniform(0.9, 1.1, n), 2)
+    entry_time = pd.Timestamp('2023-01-02') + pd.to_timedelta(rng.integers(0, 120, n), unit='D')
+    exit_time = entry_time + pd.to_timedelta(rng.integers(0, 10, n), unit='D')
+    return pd.DataFrame({
+        '商品名稱': [f"股票{i % 41}" for i in range(n)],
+        '商品代碼': [str(3000 + i % 41) for i in range(n)],
+        '進場時間': entry_time,
+        '進場價格': entry_price,
+        '出場時間': exit_time,
+        '出場價格': exit_price,
+    })
+
+
+@pytest.mark.parametrize('costs', [None, COSTS])
+def test_sweep_matches_analyze_trades(costs):
+    df = make_daily_report()
+    investments = [20000, 50000, 100000, 150000, 333333, 1000000]
+    sweep_df = sweep_parameters(df, investments, costs=costs)
+
+    for row in sweep_df.to_dict('records'):
+        analysis = analyze_trades(df, row['投入金額'], row['計算模式'], include_charts=False, costs=costs)
+        trades_df = analysis['trades_df']
+        assert row['交易次數'] == len(trades_df)
+        if len(trades_df) == 0:
+            continue
+
+        assert row['勝率%'] == analysis['win_rate']
+        assert row['總損益'] == pytest.approx(analysis['total_pnl'], rel=1e-9)
+        assert row['最大回撤'] == pytest.approx(analysis['max_dd'], rel=1e-9)
+        assert row['報酬率%'] == pytest.approx(analysis['total_return'], rel=1e-9)
+        assert row['夏普值'] == pytest.approx(analysis['sharpe'], rel=1e-6)
+        assert row['獲利因子'] == pytest.approx(analysis['profit_factor'], rel=1e-9)
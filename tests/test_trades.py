@@ -0,0 +1,111 @@
+"""calculate_trades 與原本逐筆 iterrows 版本的一致性"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_engine import calculate_trades
+
+REFERENCE_COLUMNS = ['商品名稱', '商品代碼', '進場時間', '出場時間', '進場價格', '出場價格',
+                     '股數', '投入金額', '損益', '報酬率', '持有天數']
+
+
+def reference_calculate_trades(df, investment, mode):
+    """向量化之前的逐筆版本 (未考慮交易成本)"""
+    trades = []
+
+    for idx, row in df.iterrows():
+        entry_price = row['進場價格']
+        exit_price = row['出場價格']
+
+        if entry_price == 0:
+            continue
+
+        if mode == "整張計算":
+            shares = int(investment / (entry_price * 1000)) * 1000
+            if shares < 1000:
+                continue
+            actual_investment = (shares / 1000) * entry_price * 1000
+        else:
+            shares = investment / entry_price
+            actual_investment = shares * entry_price
+
+        pnl = shares * (exit_price - entry_price)
+        pnl_pct = (exit_price - entry_price) / entry_price
+
+        trades.append({
+            '商品名稱': row['商品名稱'],
+            '商品代碼': row['商品代碼'],
+            '進場時間': row['進場時間'],
+            '出場時間': row['出場時間'],
+            '進場價格': entry_price,
+            '出場價格': exit_price,
+            '股數': shares,
+            '投入金額': actual_investment,
+            '損益': pnl,
+            '報酬率': pnl_pct,
+            '持有天數': (row['出場時間'] - row['進場時間']).days
+        })
+
+    return pd.DataFrame(trades)
+
+
+def make_report(n=400, seed=0):
+    """隨機報表，包含零價格、缺少出場價格與一張上千元的高價股"""
+    rng = np.random.default_rng(seed)
+    entry_price = np.round(rng.uniform(5, 1500, n), 2)
+    exit_price = np.round(entry_price * rng.uniform(0.8, 1.2, n), 2)
+    entry_price[::17] = 0
+    exit_price[::23] = np.nan
+    entry_time = pd.Timestamp('2023-01-02 09:00') + pd.to_timedelta(rng.integers(0, 500 * 24, n), unit='h')
+    exit_time = entry_time + pd.to_timedelta(rng.integers(0, 30 * 24 * 60, n), unit='min')
+
+    return pd.DataFrame({
+        '商品名稱': [f"股票{i % 37}" for i in range(n)],
+        '商品代碼': [str(1000 + i % 37) for i in range(n)],
+        '進場時間': entry_time,
+        '進場價格': entry_price,
+        '出場時間': exit_time,
+        '出場價格': exit_price,
+    })
+
+
+def assert_same_trades(df, investment, mode):
+    expected = reference_calculate_trades(df, investment, mode)
+    result = calculate_trades(df, investment, mode)
+    assert len(result) == len(expected)
+    pd.testing.assert_frame_equal(result[REFERENCE_COLUMNS], expected[REFERENCE_COLUMNS], check_dtype=False)
+
+
+@pytest.mark.parametrize('mode', ["整張計算", "股數計算"])
+@pytest.mark.parametrize('investment', [100000, 33333.33, 1000000])
+def test_matches_iterrows(mode, investment):
+    assert_same_trades(make_report(), investment, mode)
+
+
+def test_whole_lots_skips_unaffordable_trades():
+    df = make_report()
+    result = calculate_trades(df, 100000, "整張計算")
+    # 進場價格超過 100 元時買不起一張
+    assert (result['進場價格'] <= 100).all()
+    assert (result['股數'] % 1000 == 0).all()
+    assert_same_trades(df, 100000, "整張計算")
+
+
+def test_missing_entry_price():
+    df = make_report()
+    df.loc[df.index[5::29], '進場價格'] = np.nan
+
+    # 股數計算與原本相同：保留交易，損益為 NaN
+    assert_same_trades(df, 100000, "股數計算")
+
+    # 整張計算：原本的 int(NaN) 會拋出例外，現在視為買不起而略過
+    result = calculate_trades(df, 100000, "整張計算")
+    assert result['進場價格'].notna().all()
+    assert_same_trades(df.dropna(subset=['進場價格']), 100000, "整張計算")
+
+
+def test_no_valid_trades():
+    df = make_report(20)
+    df['進場價格'] = 0.0
+    for mode in ("整張計算", "股數計算"):
+        assert len(calculate_trades(df, 100000, mode)) == 0